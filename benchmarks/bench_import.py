@@ -0,0 +1,87 @@
+"""Measure pipeline startup: import time of the orchestrator and of each handler/filter plugin
+
+Usage: python -m benchmarks.bench_import [--repeats 5] [--top 10]
+
+Each measurement runs in a fresh interpreter (python -X importtime), so
+nothing is cached between samples. Reports the median seconds, the slowest
+modules by cumulative import time, and which heavy libraries got imported.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES: tuple = ("cv2", "numpy", "PIL", "pyarrow", "roboflow", "requests")
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _targets() -> dict:
+    targets: dict = {"pipeline_orchestrator": "import pipeline_orchestrator"}
+    sys.path.insert(0, str(ROOT))
+    from filters.filter_factory import FILTERS
+    from sources.handler_factory import HANDLERS
+    for name in HANDLERS.names():
+        targets[f"handler.{name}"] = f"from sources.handler_factory import HANDLERS; HANDLERS.load({name!r})"
+    for name in FILTERS.names():
+        targets[f"filter.{name}"] = f"from filters.filter_factory import FILTERS; FILTERS.load({name!r})"
+    return targets
+
+def _sample(statement: str) -> tuple[dict, list[tuple[str, int]]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}, []
+    modules: list[tuple[str, int]] = []
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((name.strip(), int(cumulative)))
+    return json.loads(completed.stdout.strip().splitlines()[-1]), modules
+
+def run(repeats: int, top: int) -> dict:
+    results: dict = {}
+    for target, statement in _targets().items():
+        samples: list[float] = []
+        sample: dict = {}
+        modules: list[tuple[str, int]] = []
+        for _ in range(repeats):
+            sample, modules = _sample(statement)
+            if "error" in sample:
+                break
+            samples.append(sample["seconds"])
+        if "error" in sample:
+            results[target] = {"error": sample["error"]}
+            continue
+        results[target] = {
+            "seconds": round(statistics.median(samples), 4),
+            "min_seconds": round(min(samples), 4),
+            "heavy_modules": sample["heavy"],
+            "slowest_modules": [
+                {"module": name, "cumulative_ms": round(microseconds / 1000, 1)}
+                for name, microseconds in sorted(modules, key=lambda item: -item[1])[:top]
+            ],
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeats, args.top), indent=2))
+
+if __name__ == "__main__":
+    main()
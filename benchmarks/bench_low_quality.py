@@ -0,0 +1,110 @@
+"""Compare the ExcludeLowQuality cascade against the original full decode
+
+Usage: python -m benchmarks.bench_low_quality [--count 300] [--reduction 2 4 8] [--tolerance 0.25]
+       [--formats jpg png] [--repeats 3] [--min-side 128] [--max-side 1600]
+
+Each run also reports how many verdicts were decided on the reduced
+decode and how many were re-measured at full resolution.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import cv2
+from benchmarks.corpus import CorpusSpec, generate_images
+from filters.exclude_low_quality import ExcludeLowQuality
+from models.config import Source
+
+THRESHOLDS: dict = {"min_height": 256, "min_width": 256, "min_contrast": 30, "min_laplacian_sharpness": 50}
+
+def _source(**extra_params) -> Source:
+    return Source(
+        name="benchmark", author="benchmark", type="synthetic", source="local",
+        handler="local", url="file://benchmark", date="2026",
+        filters=["exclude_low_quality"],
+        filters_params={"exclude_low_quality": {**THRESHOLDS, **extra_params}},
+    )
+
+def _legacy_verdicts(images: list[Path]) -> set[Path]:
+    """The pre-cascade implementation: full grayscale decode, then every check"""
+    kept: set[Path] = set()
+    for image_path in images:
+        image = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            continue
+        height, width = image.shape
+        if height < THRESHOLDS["min_height"] or width < THRESHOLDS["min_width"]:
+            continue
+        if image.std() < THRESHOLDS["min_contrast"]:
+            continue
+        if cv2.Laplacian(image, cv2.CV_64F).var() < THRESHOLDS["min_laplacian_sharpness"]:
+            continue
+        kept.add(image_path)
+    return kept
+
+def _timed(repeats: int, fn, *args) -> tuple[float, object]:
+    """Median seconds over repeats (files stay in the page cache after the first) and the last result"""
+    runs: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs), result
+
+def run(count: int, reductions: list[int], seed: int, tolerances: list[float],
+        formats: list[str], repeats: int, min_side: int = 128, max_side: int = 1600) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        spec = CorpusSpec(count=count, seed=seed, min_side=min_side, max_side=max_side)
+        images: list[Path] = generate_images(Path(tmp), spec)
+        images = [image for image in images if image.suffix[1:] in formats]
+        count = len(images)
+        legacy_seconds, legacy_kept = _timed(repeats, _legacy_verdicts, images)
+        results: dict = {
+            "images": count,
+            "formats": formats,
+            "repeats": repeats,
+            "legacy_full_decode": {"seconds": round(legacy_seconds, 3), "kept": len(legacy_kept)},
+        }
+        runs: list[tuple[int, float]] = [(1, 0.0)] + [(r, t) for r in reductions for t in tolerances]
+        for reduction, tolerance in runs:
+            # A fresh filter (and scan cache) per repeat, so every repeat decodes again
+            filters: list[ExcludeLowQuality] = []
+
+            def check() -> list[Path]:
+                filters.append(ExcludeLowQuality(_source(reduced_decode=reduction, reduced_tolerance=tolerance)))
+                return filters[-1].apply(images)
+
+            seconds, kept = _timed(repeats, check)
+            quality_filter: ExcludeLowQuality = filters[-1]
+            kept = set(kept)
+            name: str = f"cascade_reduction_{reduction}" + (f"_tolerance_{tolerance:g}" if reduction != 1 else "")
+            results[name] = {
+                "seconds": round(seconds, 3),
+                "speedup_vs_legacy": round(legacy_seconds / seconds, 2) if seconds else None,
+                "kept": len(kept),
+                "disagreements": len(kept ^ legacy_kept),
+                "disagreement_rate": round(len(kept ^ legacy_kept) / count, 4),
+                "false_accepts": len(kept - legacy_kept),
+                "false_rejects": len(legacy_kept - kept),
+                "stats": quality_filter.stats,
+            }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--reduction", type=int, nargs="*", default=[2, 4, 8])
+    parser.add_argument("--tolerance", type=float, nargs="*", default=[0.25])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="*", default=["jpg", "png"], help="corpus formats to keep")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-side", type=int, default=128)
+    parser.add_argument("--max-side", type=int, default=1600)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.reduction, args.seed, args.tolerance, args.formats, args.repeats,
+                         args.min_side, args.max_side), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Compare building silver metadata as a SilverBatch against one SilverMetadata model per image
+
+Usage: python -m benchmarks.bench_silver_metadata [--count 100000] [--repeats 3]
+
+Images are synthetic (no files are read), so only metadata building is
+measured. Memory is what tracemalloc sees still allocated once every
+record is built, scaled to 100k images; hash and path strings come from
+the input in both paths, so neither is charged for them.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+from models.config import Source
+from models.metadata import SilverMetadata
+from models.silver_batch import SilverBatch
+
+def _source() -> Source:
+    return Source(
+        name="benchmark", author="benchmark", type="synthetic", source="local",
+        handler="local", url="file://benchmark", date="2026", license="CC BY 4.0",
+        filters=["extract", "dedup_near", "exclude_low_quality"],
+        filters_params={
+            "extract": {"keep_archive": False},
+            "exclude_low_quality": {"min_height": 256, "min_width": 256, "min_contrast": 30, "min_laplacian_sharpness": 50},
+        },
+    )
+
+def _images(count: int) -> list[dict]:
+    """What image_info_from_scan returns, plus the content hash"""
+    return [
+        {
+            "sha256": hashlib.sha256(str(n).encode()).hexdigest(),
+            "suffix": ".jpg",
+            "size_bytes": 50_000 + n,
+            "source_image_name": f"img_{n:07d}.jpg",
+            "source_image_path": os.path.join("benchmark", "train", "real", f"img_{n:07d}.jpg"),
+            "height": 512,
+            "width": 768,
+            "format": "JPG",
+        }
+        for n in range(count)
+    ]
+
+def _legacy(config: Source, images: list[dict]) -> list[SilverMetadata]:
+    """The per-image path: a config dump merged into a full Pydantic model for every image"""
+    models: list[SilverMetadata] = []
+    for image in images:
+        metadata: dict = config.model_dump()
+        metadata.update({
+            "size_bytes": image["size_bytes"], "source_image_name": image["source_image_name"],
+            "source_image_path": image["source_image_path"], "height": image["height"],
+            "width": image["width"], "format": image["format"],
+            "name": image["sha256"] + image["suffix"], "id": image["sha256"],
+            "source_id": config.id, "source_name": "benchmark"})
+        models.append(SilverMetadata(**metadata))
+    return models
+
+def _compact(config: Source, images: list[dict]) -> SilverBatch:
+    batch = SilverBatch(config.id, "benchmark", config.filters, config.filters_params)
+    for image in images:
+        batch.append(image["sha256"], image["suffix"], image["source_image_path"], image["format"],
+                     image["width"], image["height"], image["size_bytes"])
+    return batch
+
+def _seconds(fn: Callable[[], object], repeats: int) -> float:
+    runs: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+def _retained_bytes(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def run(count: int, repeats: int) -> dict:
+    config: Source = _source()
+    images: list[dict] = _images(count)
+    legacy_models: list[SilverMetadata] = _legacy(config, images)
+    batch: SilverBatch = _compact(config, images)
+    if [meta.model_dump() for meta in legacy_models[:100]] != list(batch[:100].records()):
+        raise RuntimeError("SilverBatch records differ from SilverMetadata.model_dump()")
+    del legacy_models
+
+    results: dict = {"images": count, "repeats": repeats}
+    for name, build, dump in (
+        ("legacy_models", lambda: _legacy(config, images), lambda built: [meta.model_dump() for meta in built]),
+        ("silver_batch", lambda: _compact(config, images), lambda built: list(built.records())),
+    ):
+        build_seconds = _seconds(build, repeats)
+        built = build()
+        dump_seconds = _seconds(lambda: dump(built), repeats)
+        del built
+        retained = _retained_bytes(build)
+        results[name] = {
+            "build_seconds": round(build_seconds, 4),
+            "build_images_per_second": round(count / build_seconds) if build_seconds else None,
+            "records_seconds": round(dump_seconds, 4),
+            "memory_mb_per_100k": round(retained * 100_000 / count / (1 << 20), 2),
+        }
+    legacy, compact = results["legacy_models"], results["silver_batch"]
+    results["build_speedup"] = round(legacy["build_seconds"] / compact["build_seconds"], 2)
+    results["memory_ratio"] = round(legacy["memory_mb_per_100k"] / compact["memory_mb_per_100k"], 2)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.repeats), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import random
+import zipfile
+import cv2
+import numpy as np
+
+@dataclass
+class CorpusSpec:
+    count: int = 200
+    seed: int = 0
+    min_side: int = 128
+    max_side: int = 1600
+    blurry_ratio: float = 0.2
+    low_contrast_ratio: float = 0.15
+    corrupt_ratio: float = 0.0
+    archives: int = 0
+
+@dataclass
+class BronzeCorpus:
+    """What generate_bronze_corpus wrote
+
+    `inputs` is what a handler would hand to the filters: the zip archives
+    when the spec asks for any, otherwise the loose files. `images` and
+    `corrupt` are the loose originals, which stay on disk either way.
+    """
+    inputs: list[Path] = field(default_factory=list)
+    images: list[Path] = field(default_factory=list)
+    corrupt: list[Path] = field(default_factory=list)
+    archives: list[Path] = field(default_factory=list)
+
+def _textured_image(rng: np.random.Generator, height: int, width: int) -> np.ndarray:
+    """Random shapes over a noise field, so Laplacian variance behaves like a real photo"""
+    image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (0, 0), sigmaX=1.5)
+    for _ in range(12):
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(4, max(5, min(height, width) // 3)))
+        cv2.circle(image, center, radius, color, thickness=-1)
+    return image
+
+def generate_images(root: Path, spec: CorpusSpec) -> list[Path]:
+    """Write a reproducible mix of sharp, blurry, low-contrast and small JPEG/PNG images"""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(spec.seed)
+    choice = random.Random(spec.seed)
+    paths: list[Path] = []
+    for index in range(spec.count):
+        height = int(rng.integers(spec.min_side, spec.max_side))
+        width = int(rng.integers(spec.min_side, spec.max_side))
+        image = _textured_image(rng, height, width)
+        kind = choice.random()
+        if kind < spec.blurry_ratio:
+            image = cv2.GaussianBlur(image, (0, 0), sigmaX=choice.uniform(2.0, 8.0))
+        elif kind < spec.blurry_ratio + spec.low_contrast_ratio:
+            image = (image.astype(np.float32) * choice.uniform(0.05, 0.2) + 110).astype(np.uint8)
+        suffix = ".jpg" if index % 2 == 0 else ".png"
+        path = root / f"img_{index:06d}{suffix}"
+        cv2.imwrite(str(path), image)
+        paths.append(path)
+    return paths
+
+def _write_corrupt(path: Path, rng: np.random.Generator, valid_image: np.ndarray) -> None:
+    """Either a truncated JPEG (the header parses, decoding fails) or plain noise"""
+    if path.suffix == ".jpg":
+        ok, encoded = cv2.imencode(".jpg", valid_image)
+        data = encoded.tobytes()[:max(64, len(encoded) // 8)] if ok else b""
+    else:
+        data = rng.integers(0, 256, size=int(rng.integers(256, 4096)), dtype=np.uint8).tobytes()
+    path.write_bytes(data)
+
+def generate_bronze_corpus(root: Path, spec: CorpusSpec) -> BronzeCorpus:
+    """Images from generate_images plus corrupt files, optionally packed Kaggle-style
+
+    Each archive sits in its own folder as dataset.zip, with members under
+    nested class folders, the way the Kaggle handler leaves a download.
+    """
+    root = Path(root)
+    corpus = BronzeCorpus(images=generate_images(root / "images", spec))
+    rng = np.random.default_rng(spec.seed + 1)
+    corrupt_count = int(round(spec.count * spec.corrupt_ratio))
+    if corrupt_count:
+        valid_image = _textured_image(rng, 256, 256)
+        for index in range(corrupt_count):
+            suffix = ".jpg" if index % 2 == 0 else ".png"
+            path = root / "images" / f"corrupt_{index:06d}{suffix}"
+            _write_corrupt(path, rng, valid_image)
+            corpus.corrupt.append(path)
+    files: list[Path] = corpus.images + corpus.corrupt
+    if spec.archives <= 0:
+        corpus.inputs = list(files)
+        return corpus
+    for archive_index in range(spec.archives):
+        archive_dir = root / "archives" / f"archive_{archive_index:03d}"
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        archive_path = archive_dir / "dataset.zip"
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for position, path in enumerate(files[archive_index::spec.archives]):
+                split = "train" if position % 5 else "test"
+                label = "real" if position % 2 else "fake"
+                archive.write(path, f"dataset/{split}/{label}/{path.name}")
+        corpus.archives.append(archive_path)
+    corpus.inputs = list(corpus.archives)
+    return corpus
@@ -0,0 +1,30 @@
+import os
+import shutil
+from pathlib import Path
+from typing import List, Tuple
+from models.config import Source
+from models.metadata import Metadata
+from sources.base_handler import BaseHandler
+
+class LocalCorpusHandler(BaseHandler):
+    """Handler whose "download" copies a generated corpus into bronze
+
+    Stands in for Kaggle/Roboflow so full runs can be timed offline. Archives
+    keep their parent folder name, so several dataset.zip files don't collide.
+    """
+    def __init__(self, source_name: str, config: Source, inputs: List[Path]):
+        super().__init__(source_name, config)
+        self.inputs = inputs
+
+    def download_images(self) -> Tuple[List[Path], Metadata]:
+        bronze_dir = Path(os.getenv("BRONZE_DIR", "./bronze")) / self.config.id
+        bronze_dir.mkdir(parents=True, exist_ok=True)
+        images: list[Path] = []
+        for path in self.inputs:
+            destination = bronze_dir / path.name
+            if path.suffix.lower() == ".zip":
+                destination = bronze_dir / path.parent.name / path.name
+                destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, destination)
+            images.append(destination)
+        return images, self._build_metadata("bronze")
@@ -0,0 +1,252 @@
+"""Time the pipeline's hot paths on a synthetic bronze corpus and compare against a baseline
+
+Usage:
+  python -m benchmarks.suite run [--count 200] [--archives 2] [--corrupt-ratio 0.05]
+                                 [--repeats 3] [--output FILE] [--baseline FILE]
+  python -m benchmarks.suite compare BASELINE CURRENT [--threshold 0.10]
+
+Every benchmark runs in a throwaway working directory with its own bronze,
+silver and .checkpoints, and the fingerprint index disabled, so numbers are
+cold-cache and reproducible for a given --seed. Timings are the median of
+--repeats runs; compare exits with status 1 when any benchmark regressed.
+"""
+import argparse
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from benchmarks.corpus import BronzeCorpus, CorpusSpec, generate_bronze_corpus
+from benchmarks.stub_handler import LocalCorpusHandler
+from filters.exclude_low_quality import ExcludeLowQuality
+from filters.extract import Extract
+from models.config import Source
+from models.silver_batch import SilverBatch
+from utils.hash import sha256_of_file
+from utils.image import image_info
+from utils.scan import ScanCache
+
+THRESHOLDS: dict = {"min_height": 256, "min_width": 256, "min_contrast": 30, "min_laplacian_sharpness": 50}
+# Below this absolute change a benchmark is never flagged, whatever the ratio
+MIN_DELTA_SECONDS: float = 0.005
+
+def _source(**extract_params) -> Source:
+    return Source(
+        name="benchmark", author="benchmark", type="synthetic", source="local",
+        handler="local", url="file://benchmark", date="2026",
+        filters=["extract", "exclude_low_quality"],
+        filters_params={"exclude_low_quality": dict(THRESHOLDS), "extract": extract_params},
+    )
+
+@contextmanager
+def _workspace(root: Path) -> Iterator[Path]:
+    """chdir into root with bronze/silver/checkpoints pointed inside it, restoring everything after"""
+    previous_cwd = os.getcwd()
+    overrides = {
+        "BRONZE_DIR": str(root / "bronze"),
+        "SILVER_DIR": str(root / "silver"),
+        "FINGERPRINT_INDEX_PATH": "",
+        # Outside silver/, which benchmarks delete between repeats
+        "SILVER_CATALOG_PATH": str(root / "catalog.sqlite"),
+    }
+    previous_env = {key: os.environ.get(key) for key in overrides}
+    root.mkdir(parents=True, exist_ok=True)
+    os.environ.update(overrides)
+    os.chdir(root)
+    try:
+        yield root
+    finally:
+        os.chdir(previous_cwd)
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def _reset(*paths: Path) -> None:
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _measure(fn: Callable[[], object], repeats: int, items: int, setup: Optional[Callable[[], None]] = None) -> dict:
+    runs: list[float] = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    seconds = statistics.median(runs)
+    return {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "min_seconds": round(min(runs), 4),
+        "runs": [round(run, 4) for run in runs],
+        "items_per_second": round(items / seconds, 2) if seconds else None,
+    }
+
+def _prepare_bronze(corpus: BronzeCorpus, workspace: Path) -> tuple[LocalCorpusHandler, list[Path]]:
+    """Load the corpus into bronze once and return the extracted image paths"""
+    handler = LocalCorpusHandler("benchmark", _source(keep_archive=True), corpus.inputs)
+    inputs, _ = handler.download_images()
+    images: list[Path] = Extract(handler.config).apply(inputs)
+    return handler, images
+
+def _bench_extract(corpus: BronzeCorpus, workspace: Path, repeats: int) -> Optional[dict]:
+    if not corpus.archives:
+        return None
+    scratch = workspace / "scratch" / "extract"
+    copies: list[Path] = []
+
+    def setup() -> None:
+        _reset(scratch)
+        copies.clear()
+        for archive in corpus.archives:
+            destination = scratch / archive.parent.name / archive.name
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(archive, destination)
+            copies.append(destination)
+
+    extract = Extract(_source())
+    result = _measure(lambda: extract.apply(list(copies)), repeats, len(corpus.images) + len(corpus.corrupt), setup)
+    _reset(scratch)
+    return result
+
+def run(spec: CorpusSpec, repeats: int) -> dict:
+    logging.getLogger("pipeline").setLevel(logging.WARNING)
+    results: dict = {}
+    with tempfile.TemporaryDirectory(prefix="pipeline-bench-") as tmp, _workspace(Path(tmp)) as workspace:
+        corpus: BronzeCorpus = generate_bronze_corpus(workspace / "corpus", spec)
+        handler, bronze_images = _prepare_bronze(corpus, workspace)
+        corrupt_names = {path.name for path in corpus.corrupt}
+        valid_images: list[Path] = [image for image in bronze_images if image.name not in corrupt_names]
+        silver_dir = workspace / "silver"
+
+        extract_result = _bench_extract(corpus, workspace, repeats)
+        if extract_result is not None:
+            results["extract"] = extract_result
+        results["exclude_low_quality"] = _measure(
+            lambda: ExcludeLowQuality(handler.config, ScanCache()).apply(bronze_images), repeats, len(bronze_images)
+        )
+        results["sha256_of_file"] = _measure(
+            lambda: [sha256_of_file(image) for image in valid_images], repeats, len(valid_images)
+        )
+        results["image_info"] = _measure(
+            lambda: [image_info(image) for image in valid_images], repeats, len(valid_images)
+        )
+        metadata: SilverBatch = handler._build_silver_batch(valid_images)
+        results["save_metadata_silver"] = _measure(
+            lambda: handler.save_metadata_silver(metadata), repeats, len(metadata), lambda: _reset(silver_dir)
+        )
+        results["copy_to_silver"] = _measure(
+            lambda: handler.copy_to_silver(metadata), repeats, len(metadata), lambda: _reset(silver_dir)
+        )
+
+        def fresh_run() -> None:
+            LocalCorpusHandler("benchmark", _source(), corpus.inputs).run()
+
+        results["base_handler_run"] = _measure(
+            fresh_run, repeats, spec.count,
+            lambda: _reset(workspace / "bronze", silver_dir, workspace / ".checkpoints"),
+        )
+    return {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": asdict(spec),
+        "repeats": repeats,
+        "benchmarks": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list[dict]:
+    """One row per benchmark; status is regression, improvement, ok, new or missing"""
+    rows: list[dict] = []
+    before: dict = baseline.get("benchmarks", {})
+    after: dict = current.get("benchmarks", {})
+    for name in sorted(set(before) | set(after)):
+        if name not in after:
+            rows.append({"name": name, "status": "missing"})
+            continue
+        if name not in before:
+            rows.append({"name": name, "status": "new", "current_seconds": after[name]["seconds"]})
+            continue
+        old, new = before[name]["seconds"], after[name]["seconds"]
+        change = (new - old) / old if old else 0.0
+        status = "ok"
+        if abs(new - old) >= MIN_DELTA_SECONDS:
+            if change > threshold:
+                status = "regression"
+            elif change < -threshold:
+                status = "improvement"
+        rows.append({
+            "name": name, "status": status,
+            "baseline_seconds": old, "current_seconds": new, "change": round(change, 4),
+        })
+    return rows
+
+def _print_comparison(baseline: dict, current: dict, rows: list[dict]) -> None:
+    if baseline.get("corpus") != current.get("corpus"):
+        print("warning: baseline and current were measured on different corpora", file=sys.stderr)
+    for row in rows:
+        if "change" in row:
+            print(f"{row['name']:<24} {row['baseline_seconds']:>9.4f}s -> {row['current_seconds']:>9.4f}s "
+                  f"{row['change']:+8.1%}  {row['status']}")
+        else:
+            print(f"{row['name']:<24} {row['status']}")
+
+def _load(path: str) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="generate a corpus and time every benchmark")
+    run_parser.add_argument("--count", type=int, default=200)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--max-side", type=int, default=1600)
+    run_parser.add_argument("--corrupt-ratio", type=float, default=0.05)
+    run_parser.add_argument("--archives", type=int, default=2)
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--output", help="JSON results file (default reports/benchmarks/benchmark_<timestamp>.json)")
+    run_parser.add_argument("--baseline", help="compare against this results file after running")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        baseline, current = _load(args.baseline), _load(args.current)
+    else:
+        spec = CorpusSpec(
+            count=args.count, seed=args.seed, max_side=args.max_side,
+            corrupt_ratio=args.corrupt_ratio, archives=args.archives,
+        )
+        current = run(spec, args.repeats)
+        output = Path(args.output or f"reports/benchmarks/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {output}")
+        if not args.baseline:
+            for name, result in current["benchmarks"].items():
+                print(f"{name:<24} {result['seconds']:>9.4f}s  {result['items_per_second']} items/s")
+            return 0
+        baseline = _load(args.baseline)
+    rows = compare(baseline, current, args.threshold)
+    _print_comparison(baseline, current, rows)
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
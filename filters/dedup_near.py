@@ -0,0 +1,86 @@
+from itertools import batched
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from filters.filter_base import Filter
+from models.config import Source
+from utils.near_dup_index import NearDuplicateIndex
+from utils.perceptual_hash import hash_images
+from utils.scan import ScanCache
+
+class DedupNear(Filter):
+    """Drop images that are perceptual near-duplicates of something already in silver
+
+    Params (all optional, under filters_params.dedup_near):
+      hash: "dhash" (default) or "phash"
+      max_distance: Hamming distance still counted as a duplicate (default 6)
+      segments: MIH substrings, must divide 64 (default 4)
+      batch_size: images hashed per NumPy batch (default 256)
+      report_clusters: clusters listed in the report (default 100)
+
+    Hashes persist in .checkpoints/near_dup_<hash>.sqlite (NEAR_DUP_INDEX_DIR),
+    so duplicates are caught across sources and runs. Images whose content
+    hash is already indexed count as themselves, not as duplicates. Every
+    image that passes is indexed, so put this filter last in the chain.
+    """
+    def __init__(self, config: Source, scan_cache: Optional[ScanCache] = None) -> None:
+        super().__init__(config, scan_cache)
+        params: dict = config.filters_params.get("dedup_near", {})
+        self.method: str = params.get("hash", "dhash")
+        self.max_distance: int = int(params.get("max_distance", 6))
+        self.batch_size: int = int(params.get("batch_size", 256))
+        self.report_clusters: int = int(params.get("report_clusters", 100))
+        index_dir: str = os.getenv("NEAR_DUP_INDEX_DIR", ".checkpoints")
+        self.index = NearDuplicateIndex.shared(
+            os.path.join(index_dir, f"near_dup_{self.method}.sqlite"), int(params.get("segments", 4))
+        )
+
+    def _record_duplicate(self, clusters: dict, content_id: str, representative: str, path: Path, distance: int) -> None:
+        cluster = clusters.setdefault(content_id, {"representative_id": content_id, "representative": representative, "duplicates": []})
+        cluster["duplicates"].append({"path": str(path), "distance": distance})
+
+    def iter_apply(self, images: Iterable[Path]) -> Iterator[Path]:
+        clusters: dict = {}
+        duplicates, undecodable = 0, 0
+        for batch in batched(images, self.batch_size):
+            batch = list(batch)
+            with self.stage("hash") as stage:
+                hashes, valid = hash_images(batch, self.method)
+                stage.items = len(batch)
+            survivors: list[Path] = []
+            rejected: list[Path] = []
+            with self.stage("lookup") as stage:
+                for image_path, value, ok in zip(batch, hashes, valid):
+                    if not ok:
+                        # Not this filter's call; exclude_low_quality handles corrupt files
+                        undecodable += 1
+                        survivors.append(image_path)
+                        continue
+                    content_id: str = self.scan_cache.get(image_path).sha256
+                    match = self.index.query(int(value), self.max_distance)
+                    if match is not None and match[0] != content_id:
+                        duplicates += 1
+                        self._record_duplicate(clusters, match[0], match[1], image_path, match[2])
+                        rejected.append(image_path)
+                        continue
+                    self.index.add(content_id, int(value), self.config.id, str(image_path))
+                    survivors.append(image_path)
+                stage.items = len(batch)
+            self._reject(rejected)
+            yield from survivors
+        self.index.flush()
+        ordered = sorted(clusters.values(), key=lambda cluster: -len(cluster["duplicates"]))
+        self.stats.update({
+            "hash": self.method,
+            "max_distance": self.max_distance,
+            "duplicates": duplicates,
+            "undecodable": undecodable,
+            "cluster_count": len(ordered),
+            "clusters": ordered[:self.report_clusters],
+        })
+
+    def apply(self, images: list[Path]) -> list[Path]:
+        self.logger.info("DedupNear filter: starting")
+        kept: list[Path] = list(self.iter_apply(images))
+        self.logger.info(f"DedupNear filter: removed {len(images) - len(kept)} near-duplicates")
+        return kept
@@ -1,40 +1,341 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+import os
+from contextlib import nullcontext
+from dataclasses import replace
+from itertools import batched
+import multiprocessing
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 from filters.filter_base import Filter
-import cv2
-import numpy as np
 from models.config import Source
+from utils.fingerprint_index import params_fingerprint
+from utils.resources import MemoryBudget, cpu_limit, decode_bytes, default_memory_budget, default_workers, memory_limit
+from utils.scan import LAPLACIAN_REDUCTION_SCALE, ImageScan, QualityPlan, ScanCache, header_size, read_header_size, scan_images_safe
+
+if TYPE_CHECKING:
+    from utils.quality_store import QualityMetricStore
 
 class ExcludeLowQuality(Filter):
-    def __init__(self, config: Source) -> None:
-        super().__init__(config)
+    def __init__(self, config: Source, scan_cache: Optional[ScanCache] = None) -> None:
+        super().__init__(config, scan_cache)
+        self.params: dict = config.filters_params["exclude_low_quality"]
+        workers = self.params.get("workers", 1)
+        # "auto" sizes the pool from the CPUs the affinity mask and cgroup quota allow
+        self.workers: int = default_workers() if workers == "auto" else max(1, int(workers))
+        self.chunk_size: int = max(1, int(self.params.get("chunk_size", 64)))
+        self.batch_size: int = max(self.workers * self.chunk_size, int(self.params.get("stream_batch_size", 256)))
+        self.plan = QualityPlan(
+            min_height=self.params["min_height"],
+            min_width=self.params["min_width"],
+            min_contrast=self.params["min_contrast"],
+            min_laplacian_sharpness=self.params["min_laplacian_sharpness"],
+            reduction=int(self.params.get("reduced_decode", 1)),
+            tolerance=float(self.params.get("reduced_tolerance", 0.25)),
+        )
+        self.params_fingerprint: str = params_fingerprint(
+            self.params if self.plan.reduction == 1 else {**self.params, "laplacian_scale": LAPLACIAN_REDUCTION_SCALE[self.plan.reduction]}
+        )
+        # record_metrics: measure every metric at full resolution, even past the first failing
+        # check, and keep them in the metric store so new thresholds can be tried without decoding
+        self.metrics_store: Optional["QualityMetricStore"] = None
+        self.scan_plan: QualityPlan = self.plan
+        if self.params.get("record_metrics", False):
+            from utils import quality_store
+            self.metrics_store = quality_store.QualityMetricStore.shared(
+                self.params.get("metrics_path") or quality_store.default_store_path()
+            )
+            self.scan_plan = QualityPlan()
+        # Opt-in: decodes are admitted against memory_budget_mb ("auto": half the available memory,
+        # see utils.resources), or PIPELINE_MEMORY_BUDGET_MB when the param is unset. Admission
+        # needs each header's pixel count before decoding, which costs the process pool an extra
+        # open per image. An image that alone is over budget is decoded at 1/2, 1/4 or 1/8
+        # ("downsample") or run with nothing else in flight ("defer")
+        budget_mb = self.params.get("memory_budget_mb", os.getenv("PIPELINE_MEMORY_BUDGET_MB", 0))
+        budget_bytes: Optional[int] = default_memory_budget() if budget_mb == "auto" else int(float(budget_mb) * (1 << 20))
+        self.memory_budget: Optional[MemoryBudget] = MemoryBudget.shared(budget_bytes) if budget_bytes else None
+        self.oversized: str = self.params.get("oversized", "downsample")
+        if self.oversized not in ("downsample", "defer"):
+            raise ValueError(f"oversized must be 'downsample' or 'defer', got {self.oversized!r}")
 
-    def _has_min_size(self, image: np.ndarray) -> bool:
+    def _has_min_size(self, scan: ImageScan) -> bool:
         min_height: int = self.config.filters_params["exclude_low_quality"]["min_height"]
         min_width: int = self.config.filters_params["exclude_low_quality"]["min_width"]
-        height, width = image.shape
-        return height >= min_height and width >= min_width
+        return scan.height >= min_height and scan.width >= min_width
     
-    def _has_min_contrast(self, image: np.ndarray) -> bool:
-        contrast = image.std()
+    def _has_min_contrast(self, scan: ImageScan) -> bool:
         min_contrast: int = self.config.filters_params["exclude_low_quality"]["min_contrast"]
-        return contrast >= min_contrast
+        return scan.contrast is not None and scan.contrast >= min_contrast
 
-    def _has_min_laplacian_sharpness(self, image: np.ndarray) -> bool:
-        laplacian = cv2.Laplacian(image, cv2.CV_64F)
-        variance = laplacian.var()
+    def _has_min_laplacian_sharpness(self, scan: ImageScan) -> bool:
         min_laplacian_sharpness: int = self.config.filters_params["exclude_low_quality"]["min_laplacian_sharpness"]
-        return variance >= min_laplacian_sharpness
+        return scan.laplacian_variance is not None and scan.laplacian_variance >= min_laplacian_sharpness
     
-    def _is_corruped(self, image: np.ndarray) -> bool:
-        return image is None
+    def _is_corruped(self, scan: ImageScan) -> bool:
+        return scan.corrupted
     
-    def apply(self, images: list[Path]) -> list[Path]:
-        filtered_images: list[Path] = []
+    def _admission(self, image_path: Path, data: Optional[bytes] = None) -> tuple[QualityPlan, int, bool]:
+        """(plan, estimated bytes, deferred) for decoding one image, from its header's pixel count
+
+        data, the file's bytes if already read, saves opening it for the header.
+        """
+        if self.memory_budget is None:
+            return self.scan_plan, 0, False
+        cached: Optional[ImageScan] = self.scan_cache.peek(image_path)
+        if cached is not None and cached.width is not None:
+            width, height, size_bytes = cached.width, cached.height, cached.size_bytes
+        elif data is not None:
+            width, height = header_size(data)
+            size_bytes = len(data)
+        else:
+            width, height = read_header_size(image_path)
+            size_bytes = self.scan_cache.stat(image_path).st_size
+        # A reduced decode with a tolerance may still re-decode at full resolution
+        reduction: int = self.scan_plan.reduction if self.scan_plan.tolerance == 0 else 1
+        estimate: int = decode_bytes(width, height, size_bytes, reduction)
+        if estimate <= self.memory_budget.budget_bytes:
+            return self.scan_plan, estimate, False
+        if self.oversized == "defer":
+            self._deferred += 1
+            return self.scan_plan, estimate, True
+        for reduction in (2, 4, 8):
+            estimate = decode_bytes(width, height, size_bytes, reduction)
+            if estimate <= self.memory_budget.budget_bytes or reduction == 8:
+                break
+        self._downsampled += 1
+        self._downsampled_paths.add(image_path)
+        # No tolerance: a borderline value must not trigger the full-resolution decode we are avoiding
+        return replace(self.scan_plan, reduction=max(reduction, self.scan_plan.reduction), tolerance=0.0), estimate, False
+
+    def _scan(self, image_path: Path) -> Optional[ImageScan]:
+        try:
+            cached: Optional[ImageScan] = self.scan_cache.peek(image_path)
+            if cached is not None and cached.decoded:
+                return cached
+            if self.memory_budget is None:
+                return self.scan_cache.get(image_path, self.scan_plan)
+            # One read: the header for admission and the decode both come from these bytes
+            data: Optional[bytes] = None if cached is not None and cached.width is not None else Path(image_path).read_bytes()
+            plan, estimate, _ = self._admission(image_path, data)
+            self._admitted(*self.memory_budget.acquire(estimate))
+            try:
+                return self.scan_cache.get(image_path, plan, data)
+            finally:
+                self.memory_budget.release(estimate)
+        except OSError as e:
+            self.logger.warning(f"ExcludeLowQuality: could not read {image_path}: {e}")
+            return None
+
+    def _admitted(self, seconds: float, reserved: int) -> None:
+        # Reserved bytes are process-wide: they include sources filtered concurrently
+        self._peak_reserved = max(self._peak_reserved, reserved)
+        if seconds > 0.001:
+            self._waits += 1
+            self._wait_seconds += seconds
+            self._max_wait_seconds = max(self._max_wait_seconds, seconds)
+    
+    def _rejection_reason(self, scan: Optional[ImageScan]) -> Optional[str]:
+        """First failing check, in the same order as the cascade in utils.scan"""
+        if scan is None or self._is_corruped(scan):
+            return "corrupted"
+        if not self._has_min_size(scan):
+            return "size"
+        if not self._has_min_contrast(scan):
+            return "contrast"
+        if not self._has_min_laplacian_sharpness(scan):
+            return "sharpness"
+        return None
+    
+    def _executor(self):
+        if self.workers <= 1:
+            return nullcontext(None)
+        start_method: str = self.params.get("start_method", "spawn")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(start_method))
+    
+    def _scan_parallel(self, images: list[Path], executor: Executor) -> None:
+        """Decode images in a process pool and store the results in the scan cache"""
+        pending: list[Path] = []
         for image_path in images:
-            image: np.ndarray = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE) 
-            if self._is_corruped(image):
+            cached: Optional[ImageScan] = self.scan_cache.peek(image_path)
+            if cached is None or not cached.decoded:
+                pending.append(image_path)
+        if len(pending) < 2:
+            return
+        self.logger.debug(f"ExcludeLowQuality: scanning {len(pending)} images with {self.workers} workers")
+        jobs: list[tuple[Path, QualityPlan, int, bool]] = []
+        for image_path in pending:
+            try:
+                jobs.append((image_path, *self._admission(image_path)))
+            except OSError:
+                # Left to the sequential pass, which reports the unreadable file
                 continue
-            if not self._has_min_size(image) or not self._has_min_contrast(image) or not self._has_min_laplacian_sharpness(image):
+        regular = [job for job in jobs if not job[3]]
+        # Each deferred image is over budget by itself, so it is only admitted with nothing else in flight
+        chunks = [list(chunk) for chunk in batched(regular, self.chunk_size)] + [[job] for job in jobs if job[3]]
+        futures: list[Future] = [self._submit(executor, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            for (_, plan, _, _), (scan, pid, seconds, peak_rss_mb) in zip(chunk, future.result()):
+                self.scan_cache.put(scan, plan)
+                worker = self._per_worker.setdefault(pid, {"pid": pid, "images": 0, "corrupted": 0, "seconds": 0.0, "peak_rss_mb": 0.0})
+                worker["images"] += 1
+                worker["corrupted"] += int(scan.corrupted)
+                worker["seconds"] += seconds
+                worker["peak_rss_mb"] = max(worker["peak_rss_mb"], round(peak_rss_mb, 1))
+
+    def _submit(self, executor: Executor, chunk: list[tuple[Path, QualityPlan, int, bool]]) -> Future:
+        """Submit one chunk once its memory is admitted; a worker decodes one image at a time, so it needs its largest"""
+        need: int = max(estimate for _, _, estimate, _ in chunk)
+        if self.memory_budget is not None:
+            self._admitted(*self.memory_budget.acquire(need))
+        future: Future = executor.submit(scan_images_safe, [(image_path, plan) for image_path, plan, _, _ in chunk])
+        if self.memory_budget is not None:
+            budget: MemoryBudget = self.memory_budget
+            future.add_done_callback(lambda _: budget.release(need))
+        return future
+    
+    def _verdicts_from_store(self, images: list[Path], known: dict[Path, bool]) -> None:
+        """Decide images whose metrics are already stored with one mask, reading each file only to hash it"""
+        rows: list[int] = []
+        paths: list[Path] = []
+        for image_path in images:
+            if image_path in known:
                 continue
-            filtered_images.append(image_path)
-        return filtered_images
\ No newline at end of file
+            try:
+                scan: ImageScan = self.scan_cache.get(image_path)
+            except OSError:
+                continue
+            row: Optional[int] = self.metrics_store.lookup(scan.sha256)
+            if row is not None:
+                rows.append(row)
+                paths.append(image_path)
+        if not rows:
+            return
+        from utils.quality_store import REASONS
+        codes = self.metrics_store.reasons(self.params, rows)
+        for image_path, code in zip(paths, codes.tolist()):
+            known[image_path] = code == 0
+            self.scan_cache.record_verdict(image_path, "exclude_low_quality", self.params_fingerprint, code == 0)
+            if code != 0:
+                self._rejected[REASONS[code]] += 1
+                self.scan_cache.discard(image_path)
+        self._from_store += len(rows)
+
+    def _record_metrics(self, scan: ImageScan) -> None:
+        if self.metrics_store is not None and scan.sha256:
+            self.metrics_store.add(scan.sha256, self.config.id, scan.height, scan.width,
+                                   scan.contrast, scan.laplacian_variance, scan.corrupted)
+            self._recorded += 1
+
+    def _apply_batch(self, images: list[Path], executor: Optional[Executor]) -> list[Path]:
+        known: dict[Path, bool] = {}
+        for image_path in images:
+            verdict: Optional[bool] = self.scan_cache.verdict(image_path, "exclude_low_quality", self.params_fingerprint)
+            if verdict is not None:
+                known[image_path] = verdict
+        self._from_index += len(known)
+        if self.metrics_store is not None:
+            self._verdicts_from_store(images, known)
+        if executor is not None:
+            with self.stage("scan_parallel") as stage:
+                self._scan_parallel([image_path for image_path in images if image_path not in known], executor)
+                stage.items = len(images) - len(known)
+        filtered_images: list[Path] = []
+        rejected: list[Path] = []
+        for image_path in images:
+            if image_path in known:
+                if known[image_path]:
+                    filtered_images.append(image_path)
+                else:
+                    rejected.append(image_path)
+                continue
+            scan: Optional[ImageScan] = self._scan(image_path)
+            # Measured at a resolution the thresholds weren't set for: use it for this run only,
+            # never as a cached verdict or as full-resolution metrics in the store
+            persist: bool = image_path not in self._downsampled_paths
+            self._downsampled_paths.discard(image_path)
+            if scan is not None and persist:
+                self._record_metrics(scan)
+            reason: Optional[str] = self._rejection_reason(scan)
+            if reason is None:
+                filtered_images.append(image_path)
+            else:
+                self._rejected[reason] += 1
+                rejected.append(image_path)
+            if scan is not None and persist:
+                self.scan_cache.record_verdict(image_path, "exclude_low_quality", self.params_fingerprint, reason is None)
+                if scan.reduction != 1:
+                    self._reduced_verdicts += 1
+            if reason is not None:
+                # Nothing downstream needs a rejected image's scan
+                self.scan_cache.discard(image_path)
+        self._reject(rejected)
+        return filtered_images
+    
+    def _update_stats(self) -> None:
+        self.stats["rejected"] = dict(self._rejected)
+        self.stats["verdicts_from_index"] = self._from_index
+        if self.metrics_store is not None:
+            self.stats["metrics_store"] = {
+                "path": str(self.metrics_store.path),
+                "verdicts_from_store": self._from_store,
+                "recorded": self._recorded,
+            }
+        if self._per_worker:
+            self.stats["parallel"] = {
+                "workers": self.workers,
+                "chunk_size": self.chunk_size,
+                "per_worker": [
+                    {**worker, "seconds": round(worker["seconds"], 3)}
+                    for _, worker in sorted(self._per_worker.items())
+                ],
+            }
+        if self.memory_budget is not None:
+            limit: Optional[int] = memory_limit()
+            self.stats["resources"] = {
+                "cpu_limit": round(cpu_limit(), 2),
+                "cgroup_memory_limit_mb": round(limit / (1 << 20), 1) if limit else None,
+                "memory_budget_mb": round(self.memory_budget.budget_bytes / (1 << 20), 1),
+                "peak_reserved_mb": round(self._peak_reserved / (1 << 20), 1),
+                "admission_waits": self._waits,
+                "admission_wait_seconds": round(self._wait_seconds, 3),
+                "max_admission_wait_seconds": round(self._max_wait_seconds, 3),
+                "downsampled": self._downsampled,
+                "deferred": self._deferred,
+            }
+        if self.plan.reduction != 1:
+            self.stats["reduced_decode"] = {
+                "reduction": self.plan.reduction,
+                "tolerance": self.plan.tolerance,
+                "verdicts_at_reduced_resolution": self._reduced_verdicts,
+            }
+    
+    def iter_apply(self, images: Iterable[Path]) -> Iterator[Path]:
+        """Check images in batches of stream_batch_size, keeping one worker pool for the whole stream"""
+        self._rejected: dict[str, int] = {"corrupted": 0, "size": 0, "contrast": 0, "sharpness": 0}
+        self._reduced_verdicts: int = 0
+        self._from_index: int = 0
+        self._from_store: int = 0
+        self._recorded: int = 0
+        self._per_worker: dict[int, dict] = {}
+        self._waits: int = 0
+        self._peak_reserved: int = 0
+        self._wait_seconds: float = 0.0
+        self._max_wait_seconds: float = 0.0
+        self._downsampled: int = 0
+        self._downsampled_paths: set[Path] = set()
+        self._deferred: int = 0
+        try:
+            with self._executor() as executor:
+                for batch in batched(images, self.batch_size):
+                    filtered: list[Path] = self._apply_batch(list(batch), executor)
+                    # One small segment per batch, so a crash or an abandoned stream loses at most a batch
+                    if self.metrics_store is not None:
+                        self.metrics_store.save()
+                    self._update_stats()
+                    yield from filtered
+        finally:
+            if self.metrics_store is not None:
+                self.metrics_store.save()
+        self._update_stats()
+    
+    def apply(self, images: list[Path]) -> list[Path]:
+        return list(self.iter_apply(images))
@@ -1,22 +1,37 @@
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 from filters.filter_base import Filter
 from models.config import Source
+from utils.scan import ScanCache
 
 class ExcludeSubFolder(Filter):
-    def __init__(self, config: Source) -> None:
-        super().__init__(config)
+    def __init__(self, config: Source, scan_cache: Optional[ScanCache] = None) -> None:
+        super().__init__(config, scan_cache)
         self.subfolders_name = config.filters_params["exclude_subfolder"]["subfolders"]
         if not self.subfolders_name:
             self.logger.warning('ExcludeSubFolder initialized without a subfolders name; it will no-op')
         else:
             self.logger.info(f"ExcludeSubFolder initialized for '{self.subfolders_name}'")
         
+    def _is_excluded(self, img: Path) -> bool:
+        return any(subfolder in Path(str(img)).parts for subfolder in self.subfolders_name)
+
+    def iter_apply(self, images: Iterable[Path]) -> Iterator[Path]:
+        if not self.subfolders_name:
+            yield from images
+            return
+        for img in images:
+            if self._is_excluded(img):
+                self._reject([img])
+            else:
+                yield img
+
     def apply(self, images: list) -> list:
         if not self.subfolders_name:
             return images
         self.logger.info(f"ExcludeSubFolder: excluding subfolders {self.subfolders_name}")
         filtered_images = [
-            img for img in images if not any(subfolder in Path(str(img)).parts for subfolder in self.subfolders_name)
+            img for img in images if not self._is_excluded(img)
         ]
         self.logger.info(f"ExcludeSubFolder: excluded {len(images) - len(filtered_images)} images")
         return filtered_images
\ No newline at end of file
@@ -1,32 +1,181 @@
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 from filters.filter_base import Filter
+from utils.scan import ImageScan, header_scan
+import hashlib
+import json
 import zipfile
 import os
 import re
 
+IMAGE_PATTERN = re.compile(r"\.(jpe?g|png|bmp|gif|tiff?)$", re.IGNORECASE)
+
 class Extract(Filter):
+    """Extract image files from zip archives
+
+    Params (all optional, under filters_params.extract):
+      mode: "extractall" (default) or "stream"
+      keep_archive: keep the zip after a successful extraction (default false)
+      chunk_size: bytes per read when streaming members (default 1 MiB)
+
+    Streaming writes only image members, so peak disk use is the archive
+    plus its images; it is not bounded any further, since a zip can only
+    be deleted as a whole once every member has been read. Each member is
+    hashed while it is written and its header read from the first chunk,
+    and that record seeds the scan cache, so later filters and silver
+    metadata don't read the file again just to hash it.
+    """
+
+    def _params(self) -> dict:
+        return self.config.filters_params.get("extract", {})
+
+    def _finish_archive(self, zip_path: str, succeeded: bool) -> None:
+        """Delete the archive only once extraction worked and the config doesn't ask to keep it"""
+        if not succeeded:
+            self.logger.warning(f"Extract filter: keeping {zip_path} because extraction failed")
+            return
+        if not self._params().get("keep_archive", False):
+            os.remove(zip_path)
 
     def _extract_zip(self, zip_path: str, extract_to: str) -> list[Path]:
         extracted_files: list[Path] = []
+        succeeded: bool = False
         try:
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
                 zip_ref.extractall(extract_to)
                 for root, _, files in os.walk(extract_to):
                     for file in files:
                         # Only include image files
-                        if re.search(r"\.(jpe?g|png|bmp|gif|tiff?)$", file, re.IGNORECASE):
+                        if IMAGE_PATTERN.search(file):
                             extracted_files.append(Path(os.path.join(root, file)))
+            succeeded = True
         except Exception as e:
             self.logger.exception(f"Extract filter: failed to extract {zip_path}: {e}")
         finally:
-            os.remove(zip_path)
+            self._finish_archive(zip_path, succeeded)
         return extracted_files
+
+    def _manifest_path(self, zip_path: str, extract_to: str) -> Path:
+        return Path(extract_to) / f".{Path(zip_path).name}.manifest.json"
+
+    def _load_manifest(self, manifest_path: Path) -> dict:
+        if manifest_path.exists():
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _save_manifest(self, manifest_path: Path, manifest: dict) -> None:
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def _member_destination(self, extract_to: str, member_name: str) -> Optional[Path]:
+        """Target path of a member, or None if it would escape extract_to"""
+        root = Path(extract_to).resolve()
+        resolved = (root / member_name).resolve()
+        if resolved == root or root not in resolved.parents:
+            return None
+        return Path(extract_to) / member_name
+
+    def _is_unchanged(self, info: zipfile.ZipInfo, destination: Path, entry: Optional[dict]) -> bool:
+        return (
+            entry is not None
+            and entry.get("crc") == info.CRC
+            and entry.get("size") == info.file_size
+            and destination.exists()
+            and destination.stat().st_size == info.file_size
+        )
+
+    def _stream_member(self, zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, destination: Path) -> ImageScan:
+        """Copy one member to disk through a .part file, hashing it and reading its header on the way"""
+        chunk_size: int = int(self._params().get("chunk_size", 1 << 20))
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        part_path = destination.with_name(destination.name + ".part")
+        h = hashlib.sha256()
+        head: bytes = b''
+        with zip_ref.open(info) as src, open(part_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(chunk_size), b''):
+                if not head:
+                    head = chunk
+                h.update(chunk)
+                dst.write(chunk)
+        os.replace(part_path, destination)
+        return header_scan(destination, h.hexdigest(), info.file_size, head)
+
+    def _seed_scan(self, scan: ImageScan) -> None:
+        # A header beyond the first chunk can't be read here; the cache then reads the file itself
+        if scan.width is not None:
+            self.scan_cache.put(scan)
+
+    def _iter_extract_zip(self, zip_path: str, extract_to: str) -> Iterator[Path]:
+        """Extract only image members, yielding each path as soon as it is on disk
+
+        Members whose CRC and size match the manifest left by a previous run
+        are not written again.
+        """
+        manifest_path = self._manifest_path(zip_path, extract_to)
+        manifest: dict = self._load_manifest(manifest_path)
+        extracted, skipped = 0, 0
+        succeeded: bool = False
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                for info in zip_ref.infolist():
+                    if info.is_dir() or not IMAGE_PATTERN.search(info.filename):
+                        continue
+                    destination: Optional[Path] = self._member_destination(extract_to, info.filename)
+                    if destination is None:
+                        self.logger.warning(f"Extract filter: skipping unsafe member path {info.filename}")
+                        continue
+                    entry: Optional[dict] = manifest.get(info.filename)
+                    if self._is_unchanged(info, destination, entry):
+                        skipped += 1
+                        self._seed_scan(ImageScan(
+                            path=str(destination), sha256=entry["sha256"], size_bytes=info.file_size,
+                            format=destination.suffix.replace('.', '').upper(),
+                            width=entry.get("width"), height=entry.get("height"),
+                        ))
+                    else:
+                        scan: ImageScan = self._stream_member(zip_ref, info, destination)
+                        manifest[info.filename] = {
+                            "crc": info.CRC,
+                            "size": info.file_size,
+                            "sha256": scan.sha256,
+                            "width": scan.width,
+                            "height": scan.height,
+                        }
+                        self._seed_scan(scan)
+                        extracted += 1
+                    yield destination
+            succeeded = True
+        except Exception as e:
+            self.logger.exception(f"Extract filter: failed to extract {zip_path}: {e}")
+        finally:
+            self._save_manifest(manifest_path, manifest)
+            self._finish_archive(zip_path, succeeded)
+            self.logger.info(f"Extract filter: {extracted} members extracted, {skipped} unchanged from {zip_path}")
+
+    def iter_extract(self, images: Iterable[Path]) -> Iterator[Path]:
+        """Streaming counterpart of apply(): yields extracted images while archives are still being read"""
+        for img in images:
+            zip_path = str(img)
+            if zip_path.lower().endswith('.zip'):
+                yield from self._iter_extract_zip(zip_path, os.path.dirname(zip_path))
+            else:
+                # Already-extracted images (e.g. reloaded from bronze on resume) pass through
+                yield img
     
+    def iter_apply(self, images: Iterable[Path]) -> Iterator[Path]:
+        # extractall cannot hand out paths before it finishes, so the lazy chain always streams
+        yield from self.iter_extract(images)
+
     def apply(self, images: list[Path]) -> list[Path]:
         self.logger.info("Extract filter: starting")
+        if self._params().get("mode", "extractall") == "stream":
+            return list(self.iter_extract(images))
         zip_paths = [str(img) for img in images if str(img).lower().endswith('.zip')]
-        extracted_paths: list[Path] = []
+        extracted_paths: list[Path] = [img for img in images if not str(img).lower().endswith('.zip')]
         for zip_path in zip_paths:
             extracted_files: list[Path] = self._extract_zip(zip_path, os.path.dirname(zip_path))
             extracted_paths.extend(extracted_files)
-        return extracted_paths
\ No newline at end of file
+        return extracted_paths
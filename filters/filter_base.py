@@ -1,14 +1,68 @@
 from abc import ABC, abstractmethod
 import logging
+import time
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
 from models.config import Source
+from utils.instrumentation import StageTimer, merge_stage
+from utils.scan import ScanCache
 
 
 class Filter(ABC):
-    def __init__(self, config: Source) -> None:
+    def __init__(self, config: Source, scan_cache: Optional[ScanCache] = None) -> None:
         self.config = config
+        self.scan_cache = scan_cache if scan_cache is not None else ScanCache()
+        # Extra per-run figures a filter wants in SourceMetrics.filters_applied
+        self.stats: dict = {}
         self.logger = logging.getLogger(f"pipeline.filter.{self.__class__.__name__}")
+        # Set by BaseHandler.iter_filter so rejections are journaled as soon as they are decided
+        self.on_reject: Optional[Callable[[list[Path]], None]] = None
 
     @abstractmethod
     def apply(self, images: list[Path]) -> list[Path]:
-        pass
\ No newline at end of file
+        pass
+
+    def iter_apply(self, images: Iterable[Path]) -> Iterator[Path]:
+        """Streaming form of apply(): consume paths lazily and yield the survivors
+
+        The default materializes the input and delegates to apply(); filters
+        that can work one path (or one batch) at a time override it.
+        """
+        yield from self.apply(list(images))
+
+    def _reject(self, images: list[Path]) -> None:
+        if images and self.on_reject is not None:
+            self.on_reject(images)
+
+    def stage(self, name: str) -> StageTimer:
+        """Time a phase of this filter; totals land in stats["stages"][name]
+
+        Don't hold one open across a yield, or it will time the consumer too.
+        """
+        return StageTimer(name, on_exit=lambda stage_name, result: merge_stage(self.stats.setdefault("stages", {}), stage_name, result))
+
+
+class CountingIterator:
+    """Iterator wrapper that counts the items pulled through it
+
+    `seconds`/`cpu_seconds` are the time spent producing them, which
+    includes the time of every upstream stage in a lazy chain.
+    """
+    def __init__(self, iterable: Iterable[Path]) -> None:
+        self._iterator = iter(iterable)
+        self.count: int = 0
+        self.seconds: float = 0.0
+        self.cpu_seconds: float = 0.0
+
+    def __iter__(self) -> "CountingIterator":
+        return self
+
+    def __next__(self) -> Path:
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            item = next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.cpu_seconds += time.thread_time() - cpu_start
+        self.count += 1
+        return item
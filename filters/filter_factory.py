@@ -1,19 +1,19 @@
+from typing import Optional
 from filters.filter_base import Filter
 from models.config import Source
+from utils.plugins import PluginRegistry
+from utils.scan import ScanCache
+
+# Modules are imported on first use; more filters can come from "pipeline.filters" entry points
+FILTERS = PluginRegistry("pipeline.filters", "filter", {
+    'flatten': "filters.flatten_dataset:FlattenDataset",
+    'extract': "filters.extract:Extract",
+    'exclude_subfolder': "filters.exclude_subfolder:ExcludeSubFolder",
+    'exclude_low_quality': "filters.exclude_low_quality:ExcludeLowQuality",
+    'dedup_near': "filters.dedup_near:DedupNear",
+})
 
 class FilterFactory():
     @staticmethod
-    def get_filter(filter_name: str, config: Source) -> Filter:
-        if filter_name == 'flatten':
-            from filters.flatten_dataset import FlattenDataset
-            return FlattenDataset(config)
-        if filter_name == 'extract':
-            from filters.extract import Extract
-            return Extract(config)
-        if filter_name == 'exclude_subfolder':
-            from filters.exclude_subfolder import ExcludeSubFolder
-            return ExcludeSubFolder(config)
-        if filter_name == 'exclude_low_quality':
-            from filters.exclude_low_quality import ExcludeLowQuality
-            return ExcludeLowQuality(config)
-        raise ValueError(f"Unknown filter: {filter_name}")
\ No newline at end of file
+    def get_filter(filter_name: str, config: Source, scan_cache: Optional[ScanCache] = None) -> Filter:
+        return FILTERS.load(filter_name)(config, scan_cache)
@@ -1,17 +1,21 @@
 from filters.filter_base import Filter
 from pathlib import Path
+from typing import Iterable, Iterator
+from utils.inventory import walk_files
 
 class FlattenDataset(Filter):
-    def apply(self, images: list[Path]) -> list[Path]:
-        self.logger.info("FlattenDataset filter: starting")
-        flattened_paths: list[Path] = []
+    def iter_apply(self, images: Iterable[Path]) -> Iterator[Path]:
         for path in images:
             path = Path(path)
             if path.is_dir():
-                for sub_path in path.rglob('*'):
-                    if sub_path.is_file():
-                        flattened_paths.append(sub_path)
+                for entry in walk_files(path):
+                    self.scan_cache.prime_stat(entry.path, entry.stat)
+                    yield entry.path
             else:
-                flattened_paths.append(path)
+                yield path
+
+    def apply(self, images: list[Path]) -> list[Path]:
+        self.logger.info("FlattenDataset filter: starting")
+        flattened_paths: list[Path] = list(self.iter_apply(images))
         self.logger.info(f"FlattenDataset filter: finished ({len(flattened_paths)} paths)")
-        return flattened_paths
\ No newline at end of file
+        return flattened_paths
@@ -9,6 +9,8 @@ class Remote(BaseModel):
     bucket_name: str
     path: Optional[str] = None
     profile: Optional[str] = None
+    # S3-compatible servers such as MinIO; None means AWS
+    endpoint_url: Optional[str] = None
 
 class Source(BaseModel):
     id: Optional[str] = None
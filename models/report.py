@@ -1,9 +1,11 @@
 import json
 import os
+import shutil
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+from utils.instrumentation import StageTimer, merge_stage
 
 @dataclass
 class SourceMetrics:
@@ -14,16 +16,42 @@ class SourceMetrics:
     images_downloaded: int = 0
     images_after_filters: int = 0
     images_to_silver: int = 0
+    images_resumed: int = 0
+    images_fresh: int = 0
     filters_applied: Dict[str, dict] = field(default_factory=dict)
     errors: List[str] = field(default_factory=list)
+    fingerprint_index: Dict[str, int] = field(default_factory=dict)
+    materialization: Dict[str, dict] = field(default_factory=dict)
+    download: dict = field(default_factory=dict)
+    download_cache: dict = field(default_factory=dict)
+    stages: Dict[str, dict] = field(default_factory=dict)
+    profiles: Dict[str, str] = field(default_factory=dict)
+    scheduling: dict = field(default_factory=dict)
+    incremental: dict = field(default_factory=lambda: {
+        "skipped": False, "bronze_reused": False, "filters_reused": [], "estimated_seconds_saved": 0.0,
+    })
     
-    def record_filter(self, filter_name: str, before: int, after: int):
+    def record_filter(self, filter_name: str, before: int, after: int, extra: Optional[dict] = None):
         self.filters_applied[filter_name] = {
             "before": before,
             "after": after,
-            "removed": before - after
+            "removed": before - after,
+            **(extra or {})
         }
     
+    def stage(self, name: str) -> StageTimer:
+        """Context manager that times a stage and accumulates it under stages[name]"""
+        return StageTimer(name, on_exit=self.record_stage)
+    
+    def record_stage(self, name: str, result: dict):
+        merge_stage(self.stages, name, result)
+    
+    def record_materialization(self, strategy: str, bytes_copied: int, bytes_saved: int):
+        totals = self.materialization.setdefault(strategy, {"files": 0, "bytes_copied": 0, "bytes_saved": 0})
+        totals["files"] += 1
+        totals["bytes_copied"] += bytes_copied
+        totals["bytes_saved"] += bytes_saved
+    
     def finish(self):
         self.end_time = datetime.now()
     
@@ -37,19 +65,57 @@ class SourceMetrics:
 class PipelineReport:
     run_id: str = field(default_factory=lambda: datetime.now().strftime("%Y%m%d_%H%M%S"))
     sources_metrics: List[SourceMetrics] = field(default_factory=list)
+    start_time: datetime = field(default_factory=datetime.now)
+    end_time: datetime = None
+    gold: Optional[dict] = None
+    remote_sync: Optional[dict] = None
     
     def add_source_metrics(self, metrics: SourceMetrics):
         self.sources_metrics.append(metrics)
     
+    def finish(self):
+        self.end_time = datetime.now()
+    
+    @property
+    def wall_clock_seconds(self) -> float:
+        end_time = self.end_time or datetime.now()
+        return (end_time - self.start_time).total_seconds()
+    
+    def _collect_profiles(self, output_dir: str):
+        """Move per-source profile dumps next to the report"""
+        for metrics in self.sources_metrics:
+            for kind, path in list(metrics.profiles.items()):
+                if not os.path.exists(path):
+                    continue
+                destination = Path(output_dir) / f"pipeline_report_{self.run_id}.{Path(path).name}"
+                shutil.move(path, destination)
+                metrics.profiles[kind] = str(destination)
+    
     def save(self, output_dir: str = "./reports"):
         os.makedirs(output_dir, exist_ok=True)
         report_path = Path(output_dir) / f"pipeline_report_{self.run_id}.json"
+        self._collect_profiles(output_dir)
         
         report_data = {
             "run_id": self.run_id,
             "total_sources": len(self.sources_metrics),
             "total_images_processed": sum(m.images_to_silver for m in self.sources_metrics),
-            "total_duration_seconds": sum(m.duration_seconds for m in self.sources_metrics),
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "total_duration_seconds": self.wall_clock_seconds,
+            "sum_source_duration_seconds": sum(m.duration_seconds for m in self.sources_metrics),
+            "incremental": {
+                "sources_skipped": [m.source_id for m in self.sources_metrics if m.incremental["skipped"]],
+                "estimated_seconds_saved": sum(m.incremental["estimated_seconds_saved"] for m in self.sources_metrics),
+            },
+            "download_cache": {
+                "hits": sum(1 for m in self.sources_metrics if m.download_cache.get("hit") is True),
+                "misses": sum(1 for m in self.sources_metrics if m.download_cache.get("hit") is False),
+                "bytes_from_cache": sum(m.download_cache["bytes"] for m in self.sources_metrics if m.download_cache.get("hit")),
+                "estimated_seconds_saved": sum(m.download_cache.get("estimated_seconds_saved", 0.0) for m in self.sources_metrics),
+            },
+            "gold": self.gold,
+            "remote_sync": self.remote_sync,
             "sources": [asdict(m) for m in self.sources_metrics]
         }
         
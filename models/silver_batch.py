@@ -0,0 +1,140 @@
+from array import array
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from models.metadata import SilverMetadata
+
+# array('q') can't hold None; image sizes are never negative
+_MISSING: int = -1
+_COLUMNS: tuple = ("ids", "extensions", "paths", "formats", "widths", "heights", "sizes")
+
+class SilverBatch:
+    """Silver metadata for many images of one source, stored column by column
+
+    Source-level fields (source id/name, filters, filters_params and the
+    processed date) are kept once for the whole batch; per-image fields
+    live in parallel columns, the integers in arrays. The silver name and
+    the source image name are derived from the id, extension and bronze
+    path instead of being stored. records() yields the same dicts as
+    SilverMetadata.model_dump(), and Pydantic models are only built by
+    model()/models() for callers that want them.
+    """
+    __slots__ = ("source_fields", "ids", "extensions", "paths", "formats", "widths", "heights", "sizes", "_interned")
+
+    def __init__(self, source_id: Optional[str], source_name: Optional[str],
+                 filters: Optional[List[str]] = None, filters_params: Optional[Dict[str, Dict[str, Any]]] = None,
+                 processed_date: Optional[str] = None):
+        self.source_fields: dict = {
+            "source_id": source_id,
+            "source_name": source_name,
+            "processed_date": processed_date or SilverMetadata.model_fields["processed_date"].default,
+            "filters": list(filters or []),
+            "filters_params": dict(filters_params or {}),
+        }
+        self.ids: List[str] = []
+        self.extensions: List[str] = []
+        self.paths: List[str] = []
+        self.formats: List[str] = []
+        self.widths: array = array('q')
+        self.heights: array = array('q')
+        self.sizes: array = array('q')
+        # A source has a handful of extensions and formats; keep one string of each
+        self._interned: Dict[str, str] = {}
+
+    def _intern(self, value: str) -> str:
+        return self._interned.setdefault(value, value)
+
+    def append(self, image_id: str, extension: str, source_image_path: str, format: Optional[str],
+               width: Optional[int], height: Optional[int], size_bytes: Optional[int]) -> None:
+        """Add one image; source_image_path is relative to BRONZE_DIR"""
+        self.ids.append(image_id)
+        self.extensions.append(self._intern(extension))
+        self.paths.append(source_image_path)
+        self.formats.append(self._intern(format) if format is not None else None)
+        self.widths.append(_MISSING if width is None else width)
+        self.heights.append(_MISSING if height is None else height)
+        self.sizes.append(_MISSING if size_bytes is None else size_bytes)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def name(self, index: int) -> str:
+        """Silver file name: the content hash plus the original extension"""
+        return self.ids[index] + self.extensions[index]
+
+    def _slice(self, start: int, stop: int) -> "SilverBatch":
+        batch = SilverBatch.__new__(SilverBatch)
+        batch.source_fields = self.source_fields
+        batch._interned = self._interned
+        for column in _COLUMNS:
+            setattr(batch, column, getattr(self, column)[start:stop])
+        return batch
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[dict, "SilverBatch"]:
+        """A record dict for an int index, a batch sharing the source fields for a slice"""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("SilverBatch slices must be contiguous")
+            return self._slice(start, stop)
+        return self.record(index)
+
+    def record(self, index: int) -> dict:
+        """Same keys, order and values as SilverMetadata.model_dump() for this image
+
+        filters and filters_params are the batch's own objects, shared by
+        every record; copy them before changing them.
+        """
+        def optional(column: array) -> Optional[int]:
+            value: int = column[index]
+            return None if value == _MISSING else value
+        source: dict = self.source_fields
+        return {
+            "name": self.name(index),
+            "id": self.ids[index],
+            "source_image_name": os.path.basename(self.paths[index]),
+            "source_image_path": self.paths[index],
+            "source_id": source["source_id"],
+            "source_name": source["source_name"],
+            "width": optional(self.widths),
+            "height": optional(self.heights),
+            "format": self.formats[index],
+            "size_bytes": optional(self.sizes),
+            "processed_date": source["processed_date"],
+            "filters": source["filters"],
+            "filters_params": source["filters_params"],
+        }
+
+    def files(self) -> Iterator[Tuple[str, str]]:
+        """(silver name, source_image_path) of every image, without building records"""
+        for index, path in enumerate(self.paths):
+            yield self.name(index), path
+
+    def records(self) -> Iterator[dict]:
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def model(self, index: int) -> SilverMetadata:
+        return SilverMetadata(**self.record(index))
+
+    def models(self) -> List[SilverMetadata]:
+        return [self.model(index) for index in range(len(self))]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the per-image columns"""
+        total: int = sum(sys.getsizeof(getattr(self, column)) for column in _COLUMNS)
+        total += sum(sys.getsizeof(value) for value in self.ids)
+        total += sum(sys.getsizeof(value) for value in self.paths)
+        return total
+
+def silver_records(metadata: Union[SilverBatch, List[SilverMetadata]]) -> Iterator[dict]:
+    """Record dicts from a SilverBatch or from a list of SilverMetadata models"""
+    if isinstance(metadata, SilverBatch):
+        return metadata.records()
+    return (meta.model_dump() for meta in metadata)
+
+def silver_files(metadata: Union[SilverBatch, List[SilverMetadata]]) -> Iterator[Tuple[str, str]]:
+    """(silver name, source_image_path) pairs from a SilverBatch or a list of SilverMetadata models"""
+    if isinstance(metadata, SilverBatch):
+        return metadata.files()
+    return ((meta.name, meta.source_image_path) for meta in metadata)
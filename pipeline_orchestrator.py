@@ -1,11 +1,16 @@
 import os
 import logging
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from models.config import Source
+from typing import Optional
+from models.config import Remote, Source
 from models.report import PipelineReport, SourceMetrics
 from sources.base_handler import BaseHandler
 from sources.handler_factory import HandlerFactory
+from utils.gold_export import GoldExporter
+from utils.remote_sync import RemoteSync
+from utils.scheduler import PipelinedScheduler
 
 LOG_LEVEL = os.getenv("PIPELINE_LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -17,6 +22,32 @@ def load_config() -> dict:
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def get_max_concurrent_sources(config: dict) -> int:
+    """Resolve how many sources may run at once (env var wins over the YAML setting)"""
+    value = os.getenv("PIPELINE_MAX_CONCURRENT_SOURCES")
+    if value is None:
+        value = (config.get('pipeline') or {}).get('max_concurrent_sources', 1)
+    return max(1, int(value))
+
+def get_scheduler_settings(config: dict) -> dict:
+    """Scheduler settings from the pipeline section; PIPELINE_<KEY> env vars win"""
+    pipeline: dict = config.get('pipeline') or {}
+    defaults: dict = {
+        "scheduler": "sequential",
+        "bronze_workers": 2,
+        "silver_workers": 1,
+        "bronze_queue_size": 2,
+        "per_host_limit": 1,
+        "bandwidth_limit_mbps": 0.0,
+    }
+    settings: dict = {}
+    for key, default in defaults.items():
+        value = os.getenv(f"PIPELINE_{key.upper()}")
+        if value is None:
+            value = pipeline.get(key, default)
+        settings[key] = type(default)(value or default)
+    return settings
+
 def create_handler(source_dict: dict) -> BaseHandler:
     """Create a handler instance for a source"""
     handler_type = source_dict['handler']
@@ -28,21 +59,102 @@ def process_source(source_dict: dict) -> SourceMetrics:
     handler = create_handler(source_dict)
     return handler.run()
 
-def process_all_sources(sources: list[dict]) -> PipelineReport:
+def _safe_process_source(source_dict: dict) -> Optional[SourceMetrics]:
+    """Process a source, isolating its failure from the other sources"""
+    source_name: str = source_dict.get('name', 'unknown')
+    try:
+        metrics: SourceMetrics = process_source(source_dict)
+        if metrics.incremental["skipped"]:
+            logger.info(f"↷ {source_name}: unchanged, skipped")
+        else:
+            logger.info(f"✓ {source_name}: {metrics.images_to_silver} images processed")
+        return metrics
+    except Exception as e:
+        logger.error(f"✗ {source_name}: {e}")
+        return None
+
+def process_all_sources(sources: list[dict], max_concurrent_sources: int = 1) -> PipelineReport:
     """Process all data sources and collect metrics"""
     report = PipelineReport()
     
+    if max_concurrent_sources <= 1 or len(sources) <= 1:
+        results = [_safe_process_source(source_dict) for source_dict in sources]
+    else:
+        logger.info(f"Processing {len(sources)} sources with up to {max_concurrent_sources} running concurrently")
+        with ThreadPoolExecutor(max_workers=max_concurrent_sources, thread_name_prefix="source") as executor:
+            # map() yields in submission order, so the report keeps the config order
+            results = list(executor.map(_safe_process_source, sources))
+    
+    for metrics in results:
+        if metrics is not None:
+            report.add_source_metrics(metrics)
+    
+    report.finish()
+    return report
+
+def process_all_sources_pipelined(sources: list[dict], settings: dict) -> PipelineReport:
+    """Overlap downloads of some sources with silver processing of others"""
+    # utils.download pulls in requests; only pipelined runs need it before a handler does
+    from utils.download import set_bandwidth_limit
+    report = PipelineReport()
+    set_bandwidth_limit(settings["bandwidth_limit_mbps"] * 1e6 / 8)
+    scheduler = PipelinedScheduler(
+        bronze_workers=settings["bronze_workers"],
+        silver_workers=settings["silver_workers"],
+        queue_size=settings["bronze_queue_size"],
+        per_host_limit=settings["per_host_limit"],
+    )
+    handlers: list[BaseHandler] = []
     for source_dict in sources:
-        source_name: str = source_dict.get('name', 'unknown')
         try:
-            metrics: SourceMetrics = process_source(source_dict)
-            report.add_source_metrics(metrics)
-            logger.info(f"✓ {source_name}: {metrics.images_to_silver} images processed")
+            handlers.append(create_handler(source_dict))
         except Exception as e:
-            logger.error(f"✗ {source_name}: {e}")
-    
+            logger.error(f"✗ {source_dict.get('name', 'unknown')}: {e}")
+    logger.info(f"Pipelined scheduling of {len(handlers)} sources: {settings}")
+    for metrics in scheduler.run(handlers):
+        if metrics is not None:
+            report.add_source_metrics(metrics)
+    report.finish()
     return report
 
+def export_gold(config: dict) -> Optional[dict]:
+    """Pack silver into training shards when the gold section enables it (GOLD_EXPORT=1 forces it on)"""
+    gold: dict = config.get('gold') or {}
+    if os.getenv("GOLD_EXPORT", str(gold.get('enabled', False))).lower() not in ("1", "true", "yes"):
+        return None
+    exporter = GoldExporter(
+        os.getenv("SILVER_DIR", "./silver"),
+        os.getenv("GOLD_DIR", gold.get('dir', "./gold")),
+        os.getenv("METADATA_SUBFOLDER", "metadata"),
+        shard_max_bytes=int(gold.get('shard_max_mb', 1024)) << 20,
+        shard_max_count=int(gold.get('shard_max_count', 10000)),
+        val_fraction=float(gold.get('val_fraction', 0.1)),
+        seed=int(gold.get('seed', 0)),
+    )
+    try:
+        return exporter.export()
+    except Exception as e:
+        logger.error(f"✗ gold export: {e}")
+        return {"error": str(e)}
+
+def sync_remote(config: dict) -> Optional[dict]:
+    """Upload new silver images to the remote when its section enables sync (REMOTE_SYNC=1 forces it on)"""
+    remote: dict = config.get('remote') or {}
+    if os.getenv("REMOTE_SYNC", str(remote.get('sync', False))).lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        sync = RemoteSync(
+            Remote(**remote),
+            os.getenv("SILVER_DIR", "./silver"),
+            workers=int(remote.get('workers', 8)),
+            multipart_threshold=int(remote.get('multipart_threshold_mb', 8)) << 20,
+            multipart_chunksize=int(remote.get('multipart_chunksize_mb', 8)) << 20,
+        )
+        return sync.sync()
+    except Exception as e:
+        logger.error(f"✗ remote sync: {e}")
+        return {"error": str(e)}
+
 def save_report(report: PipelineReport) -> Path:
     """Save pipeline report to disk"""
     report_path: Path = report.save()
@@ -53,8 +165,15 @@ def main():
     """Main pipeline orchestrator"""
     config: dict = load_config()
     sources: list[dict] = config.get('sources', [])
-    report: PipelineReport = process_all_sources(sources)
+    settings: dict = get_scheduler_settings(config)
+    if settings["scheduler"] == "pipelined":
+        report: PipelineReport = process_all_sources_pipelined(sources, settings)
+    else:
+        report = process_all_sources(sources, get_max_concurrent_sources(config))
+    report.gold = export_gold(config)
+    report.remote_sync = sync_remote(config)
+    report.finish()
     save_report(report)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,18 +1,37 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import batched
 import logging
 from pathlib import Path
-import shutil
-from typing import List, Optional, Tuple
-from filters.filter_base import Filter
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from filters.filter_base import CountingIterator, Filter
 from filters.filter_factory import FilterFactory
 import json
 import os
 from models.config import Source
 from models.metadata import BronzeMetadata, Metadata, SilverMetadata
 from models.report import SourceMetrics
+from models.silver_batch import SilverBatch, silver_files, silver_records
+from utils.catalog import SilverCatalog, default_catalog_path
 from utils.checkpoint import CheckpointManager
-from utils.hash import sha256_of_file
-from utils.image import image_info
+from utils.download_cache import DownloadCache, cache_key, default_cache_dir, default_max_bytes
+from utils.fingerprint_index import FingerprintIndex
+from utils.journal import JournalEntry, ProgressJournal
+from utils.image import image_info_from_scan
+from utils.instrumentation import Profiler
+from utils.inventory import IMAGE_EXTENSIONS, Inventory, InventoryEntry
+from utils.manifest import SilverManifestWriter
+from utils.materialize import MaterializeResult, materialize
+from utils.run_state import (
+    FilterOutputCache, RunState, bronze_fingerprint, chain_keys, download_fingerprint,
+    filter_fingerprints, source_fingerprint,
+)
+from utils.scan import ImageScan, ScanCache
+
+# How many silver files a successful run records for _silver_output_present to check
+SILVER_SAMPLE_SIZE: int = 32
 
 class BaseHandler(ABC):
     def __init__(self, source_name: str, config: Source):
@@ -21,18 +40,69 @@ class BaseHandler(ABC):
         self.logger = logging.getLogger(f"pipeline.{source_name}")
         self.metrics = SourceMetrics(source_id=config.id, source_name=source_name)
         self.checkpoint_mgr = CheckpointManager()
+        self.scan_cache = ScanCache(self._open_fingerprint_index())
+        self._manifest_writer: Optional[SilverManifestWriter] = None
+        # (path, silver id) written to silver but not journaled yet, see _journal_commits
+        self._pending_commits: list[Tuple[str, str]] = []
+        self.journal = ProgressJournal(config.id, batch_size=int(os.getenv("JOURNAL_BATCH_SIZE", "500")))
+        self._bronze_skipped: bool = False
+        checkpoint_dir = Path(self.checkpoint_mgr.checkpoint_dir)
+        self.run_state = RunState(str(checkpoint_dir / "run_state.json"))
+        self.filter_cache = FilterOutputCache(config.id, str(checkpoint_dir / "filter_cache"))
+        # Last successful run, set only while bronze on disk still matches it
+        self._previous_run: Optional[dict] = None
+        self._filter_outputs: list[dict] = []
+        # A few silver file names of this run, checked before a later run skips the source
+        self._silver_sample: list[str] = []
+        self.catalog: Optional[SilverCatalog] = self._open_catalog()
+
+    def _open_fingerprint_index(self) -> Optional[FingerprintIndex]:
+        """Persistent scan/verdict index; set FINGERPRINT_INDEX_PATH to an empty string to disable"""
+        index_path: str = os.getenv("FINGERPRINT_INDEX_PATH", ".checkpoints/fingerprints.sqlite")
+        if not index_path:
+            return None
+        return FingerprintIndex.shared(index_path)
+
+    def _open_catalog(self) -> Optional[SilverCatalog]:
+        """Queryable metadata catalog; set SILVER_CATALOG_PATH to an empty string to disable"""
+        catalog_path: str = default_catalog_path()
+        if not catalog_path:
+            return None
+        return SilverCatalog.shared(catalog_path)
+
+    def _open_download_cache(self) -> Optional[DownloadCache]:
+        """Machine-wide dataset cache; set DOWNLOAD_CACHE_DIR to an empty string to disable"""
+        cache_dir: str = default_cache_dir()
+        if not cache_dir:
+            return None
+        return DownloadCache.shared(cache_dir, default_max_bytes())
+
+    def _cached_download(self, identity: tuple, destination: Path, download: Callable[[Path], None]) -> None:
+        """Fill destination from the download cache, running download(directory) only on a miss
+
+        identity names the dataset version (e.g. owner/dataset and version);
+        it is combined with the handler name into the cache key.
+        """
+        cache: Optional[DownloadCache] = self._open_download_cache()
+        if cache is None:
+            destination.mkdir(parents=True, exist_ok=True)
+            download(destination)
+            return
+        self.metrics.download_cache = cache.fetch(cache_key(self.config.handler, *identity), destination, download)
+
+    def _build_silver_batch(self, images: Iterable[Path]) -> SilverBatch:
+        """Compact silver metadata for images; source fields are stored once, not per image"""
+        batch = SilverBatch(self.config.id, self.source_name, self.config.filters, self.config.filters_params)
+        for image in images:
+            # Reuses the record left by exclude_low_quality, so the file is read only once
+            scan: ImageScan = self.scan_cache.get(image)
+            info: dict = image_info_from_scan(image, scan)
+            batch.append(scan.sha256, image.suffix, info["source_image_path"], info["format"],
+                         info["width"], info["height"], info["size_bytes"])
+        return batch
 
     def _build_silver_metadata(self, image: Path) -> SilverMetadata:
-        metadata: dict = self.config.model_dump()
-        image_info_data: dict = image_info(image)
-        hash_image: str = sha256_of_file(str(image))
-        metadata.update({
-            **image_info_data,
-            "name": hash_image + image.suffix,
-            "id": hash_image,
-            "source_id": self.config.id,
-            "source_name": self.source_name})
-        return SilverMetadata(**metadata)
+        return self._build_silver_batch([image]).model(0)
     
     def _build_metadata(self, layer: str = "bronze", image_path: Optional[Path] = None) -> Metadata:
         if layer == "bronze":
@@ -42,22 +112,76 @@ class BaseHandler(ABC):
         return metadata
     
 
-    def filter(self, images: list[Path]) -> Tuple[list[Path], List[SilverMetadata]]:
+    def filter(self, images: list[Path]) -> Tuple[list[Path], SilverBatch]:
         filters: list[str] = self.config.filters
         filtered_images: list[Path] = images
-        silver_metadata: list[SilverMetadata] = []
-        for filter_name in filters:
-            filter_handler: Filter = FilterFactory.get_filter(filter_name, self.config)
+        reused: int = self._reuse_filter_outputs()
+        if reused:
+            filtered_images = [Path(path) for path in self._filter_outputs[-1]["paths"]]
+        for filter_name in filters[reused:]:
+            filter_handler: Filter = FilterFactory.get_filter(filter_name, self.config, self.scan_cache)
             count_before_filter = len(filtered_images) if filtered_images else 0
-            filtered_images: list[Path] = filter_handler.apply(filtered_images)
+            with self.metrics.stage(f"filter.{filter_name}") as stage:
+                filtered_images: list[Path] = filter_handler.apply(filtered_images)
+                stage.items = count_before_filter
             count_after_filter = len(filtered_images) if filtered_images else 0
-            self.metrics.record_filter(filter_name, count_before_filter, count_after_filter)
+            self.metrics.record_filter(filter_name, count_before_filter, count_after_filter, filter_handler.stats)
+            self._filter_outputs.append({
+                "filter": filter_name, "before": count_before_filter, "after": count_after_filter,
+                "stats": filter_handler.stats, "seconds": stage.result["wall_seconds"],
+                "paths": [str(image) for image in filtered_images],
+            })
             self.logger.info(f"Applied filter {filter_name}: {count_before_filter} -> {count_after_filter}")
-        for image in filtered_images:
-            silver_metadata.append(self._build_silver_metadata(image))
+        with self.metrics.stage("silver.metadata") as stage:
+            silver_metadata: SilverBatch = self._build_silver_batch(filtered_images)
+            stage.items = len(filtered_images)
         self.metrics.images_after_filters = len(filtered_images)
         return filtered_images, silver_metadata
     
+    def _reuse_filter_outputs(self) -> int:
+        """Replay the cached outputs of the leading filters that are unchanged since the last run
+
+        Only possible when bronze was reused, since the cache is keyed by the
+        bronze fingerprint. Returns how many filters were replayed.
+        """
+        if self._previous_run is None or not self.metrics.incremental["bronze_reused"]:
+            return 0
+        keys: list[str] = chain_keys(self._previous_run["bronze_fingerprint"], filter_fingerprints(self.config))
+        for filter_name, key in zip(self.config.filters, keys):
+            cached: Optional[dict] = self.filter_cache.load(key)
+            if cached is None:
+                break
+            self.metrics.record_filter(filter_name, cached["before"], cached["after"], {**cached["stats"], "reused": True})
+            self.metrics.incremental["filters_reused"].append(filter_name)
+            self.metrics.incremental["estimated_seconds_saved"] += cached["seconds"]
+            self._filter_outputs.append(cached)
+            self.logger.info(f"Reused cached output of filter {filter_name}: {cached['before']} -> {cached['after']}")
+        return len(self._filter_outputs)
+
+    def iter_filter(self, images: Iterable[Path]) -> Iterator[Path]:
+        """Lazy filter chain: each filter pulls from the previous one, one path at a time
+
+        Per-filter counts are recorded once the chain is exhausted. Filter time is
+        exclusive: what a filter's output took to produce minus what its input took.
+        """
+        stream: Iterator[Path] = CountingIterator(images)
+        stages: list[tuple[str, Filter, CountingIterator, CountingIterator]] = []
+        for filter_name in self.config.filters:
+            filter_handler: Filter = FilterFactory.get_filter(filter_name, self.config, self.scan_cache)
+            filter_handler.on_reject = self._journal_rejections
+            filtered: CountingIterator = CountingIterator(filter_handler.iter_apply(stream))
+            stages.append((filter_name, filter_handler, stream, filtered))
+            stream = filtered
+        yield from stream
+        for filter_name, filter_handler, before, after in stages:
+            self.metrics.record_filter(filter_name, before.count, after.count, filter_handler.stats)
+            self.metrics.record_stage(f"filter.{filter_name}", {
+                "wall_seconds": max(after.seconds - before.seconds, 0.0),
+                "cpu_seconds": max(after.cpu_seconds - before.cpu_seconds, 0.0),
+                "items": before.count,
+            })
+            self.logger.info(f"Applied filter {filter_name}: {before.count} -> {after.count}")
+
     @abstractmethod
     def download_images(self) -> Tuple[list[Path], Metadata]:
         """Download the selected images"""
@@ -75,14 +199,42 @@ class BaseHandler(ABC):
         os.makedirs(f"{metadata_dir}/{metadata_subfolder}", exist_ok=True)
         with open(f"{metadata_dir}/{metadata_subfolder}/{metadata.id}.json", 'w') as f:
             json.dump(metadata.model_dump(), f, indent=4)
+        if self.catalog is not None:
+            self.catalog.upsert_bronze(metadata.model_dump())
+
+    def _get_manifest_writer(self, manifest_format: str) -> SilverManifestWriter:
+        if self._manifest_writer is None:
+            metadata_dir: str = os.getenv("SILVER_DIR", "./silver")
+            metadata_subfolder: str = os.getenv("METADATA_SUBFOLDER", "metadata")
+            self._manifest_writer = SilverManifestWriter(
+                f"{metadata_dir}/{metadata_subfolder}/manifest",
+                self.config.id,
+                shard_size=int(os.getenv("SILVER_MANIFEST_SHARD_SIZE", "10000")),
+                format=manifest_format,
+            )
+        return self._manifest_writer
+
+    def _close_manifest_writer(self) -> None:
+        if self._manifest_writer is not None:
+            self._manifest_writer.close()
+            self._manifest_writer = None
+        self._journal_commits()
 
-    def save_metadata_silver(self, metadata: List[SilverMetadata]) -> None:
+    def save_metadata_silver(self, metadata: Union[SilverBatch, List[SilverMetadata]]) -> None:
+        # "files" keeps one JSON per image; "jsonl"/"parquet" append to a sharded manifest
+        metadata_format: str = os.getenv("SILVER_METADATA_FORMAT", "files")
+        records: list[dict] = list(silver_records(metadata))
+        if self.catalog is not None:
+            self.catalog.upsert_silver(records)
+        if metadata_format != "files":
+            self._get_manifest_writer(metadata_format).write(records)
+            return
         metadata_dir: str = self.get_metadata_dir(metadata)
         metadata_subfolder: str = os.getenv("METADATA_SUBFOLDER", "metadata")
         os.makedirs(f"{metadata_dir}/{metadata_subfolder}", exist_ok=True)
-        for meta in metadata:
-            with open(f"{metadata_dir}/{metadata_subfolder}/{meta.id}.json", 'w') as f:
-                json.dump(meta.model_dump(), f, indent=4)
+        for record in records:
+            with open(f"{metadata_dir}/{metadata_subfolder}/{record['id']}.json", 'w') as f:
+                json.dump(record, f, indent=4)
     
     def bronze(self) -> Tuple[list[Path], Metadata]:
         """Download images and save bronze metadata"""
@@ -90,41 +242,166 @@ class BaseHandler(ABC):
         self.save_metadata_bronze(bronze_metadata)
         return images, bronze_metadata
     
-    def copy_to_silver(self, metadata: List[SilverMetadata]) -> None:
-        for meta in metadata:
-            src_image_path = os.path.join(os.getenv("BRONZE_DIR", "./bronze"), meta.source_image_path)
-            dest_image_path = Path(os.getenv("SILVER_DIR", "./silver")) / meta.name
-            if not dest_image_path.exists():
-                os.makedirs(dest_image_path.parent, exist_ok=True)
-                shutil.copy2(src_image_path, dest_image_path)
+    def copy_to_silver(self, metadata: Union[SilverBatch, List[SilverMetadata]]) -> None:
+        """Materialize images into silver (SILVER_MATERIALIZE: copy, hardlink, reflink, symlink or auto)"""
+        strategy: str = os.getenv("SILVER_MATERIALIZE", "copy")
+        workers: int = int(os.getenv("SILVER_COPY_WORKERS", "1"))
+        silver_dir = Path(os.getenv("SILVER_DIR", "./silver"))
+        os.makedirs(silver_dir, exist_ok=True)
+        jobs: dict[Path, str] = {}
+        for name, source_image_path in silver_files(metadata):
+            src_image_path = os.path.join(os.getenv("BRONZE_DIR", "./bronze"), source_image_path)
+            dest_image_path = silver_dir / name
+            # Names are content hashes, so an existing file already holds these bytes
+            if dest_image_path not in jobs and not dest_image_path.exists():
+                jobs[dest_image_path] = src_image_path
+        if workers > 1 and len(jobs) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="silver-copy") as executor:
+                results: list[MaterializeResult] = list(executor.map(
+                    lambda job: materialize(job[1], job[0], strategy), jobs.items()
+                ))
+        else:
+            results = [materialize(src, dest, strategy) for dest, src in jobs.items()]
+        for result in results:
+            self.metrics.record_materialization(result.strategy, result.bytes_copied, result.bytes_saved)
 
     def _load_bronze_images(self) -> list[Path]:
         """Load existing images from the bronze layer"""
-        bronze_dir = Path(os.getenv("BRONZE_DIR", "./bronze"))
-        source_dir = bronze_dir / self.config.id
-        
-        if not source_dir.exists():
-            self.logger.warning(f"Bronze directory not found: {source_dir}")
+        entries: Optional[list[InventoryEntry]] = self._bronze_inventory()
+        if entries is None:
+            self.logger.warning(f"Bronze directory not found for {self.config.id}")
             return []
-        
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff'}
-        images = []
-        for ext in image_extensions:
-            images.extend(source_dir.rglob(f"*{ext}"))
-            images.extend(source_dir.rglob(f"*{ext.upper()}"))
-        
+        images: list[Path] = []
+        for entry in entries:
+            if entry.stat is not None:
+                self.scan_cache.prime_stat(entry.path, entry.stat)
+            images.append(entry.path)
         self.logger.info(f"Loaded {len(images)} images from bronze")
         return images
 
+    def _bronze_inventory(self) -> Optional[list[InventoryEntry]]:
+        """Image files of this source in bronze, or None when nothing was downloaded yet"""
+        source_dir = Path(os.getenv("BRONZE_DIR", "./bronze")) / self.config.id
+        if not source_dir.exists():
+            return None
+        inventory = Inventory(
+            source_dir,
+            Path(self.checkpoint_mgr.checkpoint_dir) / "inventory" / f"{self.config.id}.json",
+            IMAGE_EXTENSIONS,
+        )
+        entries: list[InventoryEntry] = inventory.scan()
+        self.logger.debug(f"Inventory: {inventory.rescanned_dirs} directories listed, {inventory.reused_dirs} reused")
+        return entries
+
+    def _is_incremental(self) -> bool:
+        return os.getenv("PIPELINE_INCREMENTAL", "1").lower() in ("1", "true", "yes")
+
+    def _check_incremental(self) -> bool:
+        """Compare against the last successful run; True when the whole source can be skipped
+
+        Bronze is reusable when the download fingerprint (handler, url,
+        version) and the bronze files on disk are unchanged. The source is
+        skipped when, in addition, no filter or filter param changed.
+        """
+        if not self._is_incremental() or self._should_skip_bronze():
+            # A pending checkpoint means the last run crashed; let the journal resume it
+            return False
+        previous: Optional[dict] = self.run_state.get(self.config.id)
+        if previous is None or previous.get("download_fingerprint") != download_fingerprint(self.config):
+            return False
+        entries: Optional[list[InventoryEntry]] = self._bronze_inventory()
+        if entries is None or bronze_fingerprint(entries) != previous.get("bronze_fingerprint"):
+            self.logger.info("Bronze changed since the last successful run")
+            return False
+        self._previous_run = previous
+        if previous.get("source_fingerprint") != source_fingerprint(self.config):
+            return False
+        if not self._silver_output_present(previous):
+            self.logger.info("Silver output of the last successful run is missing")
+            return False
+        return True
+
+    def _silver_output_present(self, previous: dict) -> bool:
+        """Whether the sampled images and metadata of the last successful run are still in silver"""
+        sample: Optional[list[str]] = previous.get("silver_sample")
+        if sample is None:
+            # Run state from before samples were recorded: nothing to check against
+            return previous.get("images_to_silver", 0) == 0
+        silver_dir = Path(os.getenv("SILVER_DIR", "./silver"))
+        metadata_dir: Path = silver_dir / os.getenv("METADATA_SUBFOLDER", "metadata")
+        if not all((silver_dir / name).exists() for name in sample):
+            return False
+        if os.getenv("SILVER_METADATA_FORMAT", "files") == "files":
+            return all((metadata_dir / f"{Path(name).stem}.json").exists() for name in sample)
+        return not sample or (metadata_dir / "manifest" / f"{self.config.id}.index.jsonl").exists()
+
+    def _sample_silver(self, names: Iterable[str]) -> None:
+        for name in names:
+            if len(self._silver_sample) >= SILVER_SAMPLE_SIZE:
+                return
+            self._silver_sample.append(name)
+
+    def _skip_unchanged(self) -> None:
+        previous: dict = self._previous_run
+        self.metrics.incremental.update({
+            "skipped": True,
+            "reason": "source and bronze unchanged since the last successful run",
+            "previous_run": previous.get("completed_at"),
+            "previous_images_to_silver": previous.get("images_to_silver"),
+            "estimated_seconds_saved": previous.get("full_duration_seconds", 0.0),
+        })
+        self.logger.info(f"Skipping {self.config.id}: unchanged since {previous.get('completed_at')}")
+
+    def _record_run_state(self) -> None:
+        """Store this run's fingerprints and filter outputs for the next incremental run"""
+        if not self._is_incremental():
+            return
+        bronze: str = bronze_fingerprint(self._bronze_inventory() or [])
+        keys: list[str] = chain_keys(bronze, filter_fingerprints(self.config))
+        if len(self._filter_outputs) == len(keys):
+            for key, output in zip(keys, self._filter_outputs):
+                self.filter_cache.store(key, output)
+            self.filter_cache.prune(keys)
+        else:
+            # Streaming runs don't materialize per-filter outputs
+            self.filter_cache.prune([])
+        previous: dict = self._previous_run or {}
+        bronze_seconds: float = self.metrics.stages.get("bronze", {}).get("wall_seconds", previous.get("bronze_seconds", 0.0))
+        duration: float = (datetime.now() - self.metrics.start_time).total_seconds()
+        self.run_state.record(self.config.id, {
+            "source_fingerprint": source_fingerprint(self.config),
+            "download_fingerprint": download_fingerprint(self.config),
+            "bronze_fingerprint": bronze,
+            "bronze_seconds": bronze_seconds,
+            "full_duration_seconds": duration + self.metrics.incremental["estimated_seconds_saved"],
+            "images_downloaded": self.metrics.images_downloaded,
+            "images_to_silver": self.metrics.images_to_silver,
+            "silver_sample": self._silver_sample,
+        })
+
     def _should_skip_bronze(self) -> bool:
         """Check whether the bronze stage should be skipped"""
         return self.checkpoint_mgr.should_skip_stage(self.config.id, "bronze")
 
     def _execute_bronze(self) -> list[Path]:
         """Run the bronze stage or load existing images"""
-        if not self._should_skip_bronze():
+        if self._previous_run is not None and not self._should_skip_bronze():
+            self.logger.info("Reusing bronze from the last successful run")
+            with self.metrics.stage("bronze.inventory") as stage:
+                images = self._load_bronze_images()
+                stage.items = len(images)
+            self.checkpoint_mgr.save_checkpoint(
+                self.config.id, "bronze",
+                {"count": len(images), "timestamp": self.metrics.start_time.isoformat()}
+            )
+            self._bronze_skipped = True
+            self.metrics.incremental["bronze_reused"] = True
+            self.metrics.incremental["estimated_seconds_saved"] += self._previous_run.get("bronze_seconds", 0.0)
+        elif not self._should_skip_bronze():
             self.logger.info("Starting bronze stage (download)")
-            images, _ = self.bronze()
+            with self.metrics.stage("bronze") as stage:
+                images, _ = self.bronze()
+                stage.items = len(images)
             self.checkpoint_mgr.save_checkpoint(
                 self.config.id, "bronze",
                 {"count": len(images), "timestamp": self.metrics.start_time.isoformat()}
@@ -132,23 +409,127 @@ class BaseHandler(ABC):
             self.logger.info(f"Bronze completed: {len(images)} images")
         else:
             self.logger.info("Skipping bronze (using checkpoint)")
-            images = self._load_bronze_images()
+            with self.metrics.stage("bronze.inventory") as stage:
+                images = self._load_bronze_images()
+                stage.items = len(images)
+            self._bronze_skipped = True
         
         self.metrics.images_downloaded = len(images)
         return images
 
+    def _is_streaming(self) -> bool:
+        return os.getenv("SILVER_STREAMING", "0").lower() in ("1", "true", "yes")
+
+    def _silver_batch_size(self) -> int:
+        return int(os.getenv("SILVER_BATCH_SIZE", "500"))
+
+    def _write_silver_batch(self, images: list[Path], silver_metadata: SilverBatch) -> None:
+        """Save metadata and images for one batch, then journal them as committed"""
+        with self.metrics.stage("silver.save_metadata") as stage:
+            self.save_metadata_silver(silver_metadata)
+            stage.items = len(silver_metadata)
+        with self.metrics.stage("silver.copy") as stage:
+            self.copy_to_silver(silver_metadata)
+            stage.items = len(silver_metadata)
+        self._pending_commits.extend((str(image), image_id) for image, image_id in zip(images, silver_metadata.ids))
+        self._sample_silver(name for name, _ in silver_files(silver_metadata))
+        self._journal_commits()
+
+    def _journal_commits(self) -> None:
+        """Journal written images as committed, holding back those whose records a Parquet manifest still buffers
+
+        Otherwise a crash would leave images journaled as committed with no
+        metadata, and the resumed run would never write it.
+        """
+        buffered: set[str] = self._manifest_writer.buffered_ids() if self._manifest_writer is not None else set()
+        self.journal.record_commits(commit for commit in self._pending_commits if commit[1] not in buffered)
+        self._pending_commits = [commit for commit in self._pending_commits if commit[1] in buffered]
+
+    def _journal_rejections(self, images: list[Path]) -> None:
+        self.journal.record_verdicts((str(image) for image in images), False)
+
+    def _resume_from_journal(self, images: list[Path]) -> Tuple[list[Path], list[Path], int]:
+        """Split images into (fresh, accepted but not yet written, already written count)"""
+        state: dict[str, JournalEntry] = self.journal.load()
+        if not state:
+            return images, [], 0
+        fresh: list[Path] = []
+        accepted: list[Path] = []
+        committed: int = 0
+        for image in images:
+            entry: Optional[JournalEntry] = state.get(str(image))
+            if entry is None:
+                fresh.append(image)
+            elif entry.committed:
+                committed += 1
+                self._sample_silver([entry.silver_id + image.suffix])
+            elif entry.verdict:
+                accepted.append(image)
+        self.metrics.images_resumed = len(images) - len(fresh)
+        self.logger.info(f"Resuming silver from journal: {self.metrics.images_resumed} images already decided")
+        return fresh, accepted, committed
+
+    def _stream_silver(self, images: list[Path]) -> int:
+        """Run the lazy filter chain and write silver in batches as images come out of it"""
+        written: int = 0
+        for batch in batched(self.iter_filter(images), self._silver_batch_size()):
+            with self.metrics.stage("silver.metadata") as stage:
+                silver_metadata: SilverBatch = self._build_silver_batch(batch)
+                stage.items = len(batch)
+            self._write_silver_batch(list(batch), silver_metadata)
+            for image in batch:
+                self.scan_cache.discard(image)
+            written += len(silver_metadata)
+        return written
+
+    def _batch_silver(self, images: list[Path]) -> int:
+        """Filter everything first, then write silver in journaled batches"""
+        fresh: list[Path] = images
+        images, silver_metadata = self.filter(images)
+        self.journal.record_verdicts((str(image) for image in images), True)
+        # Journal every verdict before writing, so a crash while copying doesn't re-filter the rejects
+        self._journal_rejections(sorted(set(fresh) - set(images)))
+        self.journal.flush()
+        batch_size: int = self._silver_batch_size()
+        for start in range(0, len(images), batch_size):
+            self._write_silver_batch(images[start:start + batch_size], silver_metadata[start:start + batch_size])
+        return len(silver_metadata)
+
     def _execute_silver(self, images: list[Path]) -> None:
-        """Execute silver stage (filters and copy)"""
+        """Execute silver stage (filters and copy), skipping work a previous crashed run finished"""
         self.logger.info("Starting silver stage (filters)")
-        images, silver_metadata = self.filter(images)
-        self.save_metadata_silver(silver_metadata)
-        self.copy_to_silver(silver_metadata)
-        self.metrics.images_to_silver = len(silver_metadata)
-        self.logger.info(f"Silver completed: {len(silver_metadata)} images")
+        if not self._bronze_skipped:
+            self.journal.reset()
+        if self.journal.bind(source_fingerprint(self.config)):
+            self.logger.info("Filter or output config changed since the interrupted run; deciding every image again")
+        fresh, accepted, committed = self._resume_from_journal(images)
+        written: int = 0
+        for batch in batched(accepted, self._silver_batch_size()):
+            self._write_silver_batch(list(batch), self._build_silver_batch(batch))
+            written += len(batch)
+        if self._is_streaming():
+            written_fresh: int = self._stream_silver(fresh)
+        else:
+            written_fresh = self._batch_silver(fresh)
+        written += written_fresh
+        # Whatever went into the chain and didn't come out was rejected
+        decided = {str(image) for image in fresh}
+        accepted_now = {path for path, entry in self.journal.load().items() if entry.committed}
+        self.journal.record_verdicts(decided - accepted_now, False)
+        self.journal.flush()
+        self.metrics.images_fresh = len(fresh)
+        self.metrics.images_after_filters = committed + written
+        self.metrics.images_to_silver = committed + written
+        self._close_manifest_writer()
+        self.scan_cache.flush()
+        if self.scan_cache.index is not None:
+            self.metrics.fingerprint_index = dict(self.scan_cache.counters)
+        self.logger.info(f"Silver completed: {self.metrics.images_to_silver} images")
 
     def _cleanup_checkpoint(self) -> None:
-        """Remove checkpoint after successful run"""
+        """Remove checkpoint and compact the progress journal after a successful run"""
         self.checkpoint_mgr.clear_checkpoint(self.config.id)
+        self.journal.compact()
 
     def silver(self, images: list[Path]) -> None:
         """Filter images and save silver metadata"""
@@ -157,15 +538,46 @@ class BaseHandler(ABC):
         self.copy_to_silver(silver_metadata)
         self.metrics.images_to_silver = len(silver_metadata)
 
-    def run(self) -> SourceMetrics:
+    @contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        """Profiling, error recording and flushing shared by run_bronze() and run_silver()"""
+        profiler: Profiler = Profiler(f"{self.config.id}.{name}")
+        profiler.start()
         try:
-            images: List[Path] = self._execute_bronze()
-            self._execute_silver(images)
-            self._cleanup_checkpoint()
+            yield
         except Exception as e:
             self.metrics.errors.append(str(e))
             self.logger.error(f"Pipeline error: {e}")
             raise
         finally:
+            # Keep what was decided so far, even when the run failed
+            self.scan_cache.flush()
+            # Writes buffered manifest rows first, so their images can be journaled as committed
+            self._close_manifest_writer()
+            self.journal.flush()
+            self.metrics.profiles.update({f"{name}.{kind}": path for kind, path in profiler.stop().items()})
             self.metrics.finish()
-        return self.metrics
\ No newline at end of file
+
+    def run_bronze(self) -> Optional[List[Path]]:
+        """Network-bound half of run(): the bronze images, or None when the source is skipped as unchanged"""
+        with self._phase("bronze"):
+            if self._check_incremental():
+                self._skip_unchanged()
+                return None
+            return self._execute_bronze()
+
+    def run_silver(self, images: List[Path]) -> SourceMetrics:
+        """CPU-bound half of run(): filter, write silver and record the run"""
+        with self._phase("silver"):
+            with self.metrics.stage("silver") as stage:
+                self._execute_silver(images)
+                stage.items = len(images)
+            self._cleanup_checkpoint()
+            self._record_run_state()
+        return self.metrics
+
+    def run(self) -> SourceMetrics:
+        images: Optional[List[Path]] = self.run_bronze()
+        if images is not None:
+            self.run_silver(images)
+        return self.metrics
@@ -1,13 +1,14 @@
 from models.config import Source
 from sources.base_handler import BaseHandler
+from utils.plugins import PluginRegistry
+
+# Modules are imported on first use; more handlers can come from "pipeline.handlers" entry points
+HANDLERS = PluginRegistry("pipeline.handlers", "handler", {
+    'roboflow': "sources.roboflow_handler:RoboflowHandler",
+    'kaggle': "sources.kaggle_handler:KaggleHandler",
+})
 
 class HandlerFactory():
     @staticmethod
     def get_handler(handler_name: str, config: Source) -> BaseHandler:
-        if handler_name == 'roboflow':
-            from sources.roboflow_handler import RoboflowHandler
-            return RoboflowHandler(handler_name, config)
-        if handler_name == 'kaggle':
-            from sources.kaggle_handler import KaggleHandler
-            return KaggleHandler(handler_name, config)
-        raise ValueError(f"Unknown handler: {handler_name}")
\ No newline at end of file
+        return HANDLERS.load(handler_name)(handler_name, config)
@@ -1,22 +1,33 @@
 import os
 from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
+from dotenv import load_dotenv
 from models.metadata import BronzeMetadata, Metadata
 from sources.base_handler import BaseHandler
-from roboflow import Roboflow
-from roboflow.core.project import Project
-from roboflow.core.version import Version
-from dotenv import load_dotenv
-import re
+from utils.inventory import walk_files
 from utils.stout import _suppress_output
-load_dotenv()
+
+if TYPE_CHECKING:
+    from roboflow import Roboflow
+    from roboflow.core.project import Project
+    from roboflow.core.version import Version
 
 class RoboflowHandler(BaseHandler):
 
     def __init__(self, source_name, config):
+        # Before BaseHandler reads its settings, which may come from .env too
+        load_dotenv()
         super().__init__(source_name, config)
-        with _suppress_output():
-            self.rf = Roboflow(api_key=os.getenv("API_KEY_ROBOFLOW"))
+        self._rf: Optional["Roboflow"] = None
+
+    @property
+    def rf(self) -> "Roboflow":
+        """Roboflow client, created on first download (checkpoint-resumed runs never need it)"""
+        if self._rf is None:
+            from roboflow import Roboflow
+            with _suppress_output():
+                self._rf = Roboflow(api_key=os.getenv("API_KEY_ROBOFLOW"))
+        return self._rf
     
     def _get_workspace(self) -> str:
         url: str = self.config.url
@@ -29,16 +40,19 @@ class RoboflowHandler(BaseHandler):
         return project_id
     
     def _get_path_of_images(self, directory: Path) -> list[Path]:
-        return [
-            p for p in directory.rglob("*")
-            if p.is_file() and re.search(r"\.(jpe?g|png)$", p.name, re.IGNORECASE)
-        ]
+        return [entry.path for entry in walk_files(directory, {'.jpg', '.jpeg', '.png'})]
     
     def _dowload_from_roboflow(self, workspace: str, project_id: str) -> list[Path]:
-        project: Project = self.rf.workspace(workspace).project(project_id=project_id)
-        version: Version = project.version(self.config.version)
         bronze_path: Path = Path(os.path.join(os.getenv("BRONZE_DIR", "./bronze"), f"{self.config.id}"))
-        version.download("yolov12", location=str(bronze_path))
+
+        def download(directory: Path) -> None:
+            project: "Project" = self.rf.workspace(workspace).project(project_id=project_id)
+            version: "Version" = project.version(self.config.version)
+            # The directory already exists (cache tmp or bronze), and without overwrite
+            # roboflow treats an existing location as downloaded and returns early
+            version.download("yolov12", location=str(directory), overwrite=True)
+
+        self._cached_download((workspace, project_id, self.config.version), bronze_path, download)
         return self._get_path_of_images(bronze_path)
 
     def download_images(self) -> Tuple[list[Path], Metadata]:
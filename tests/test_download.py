@@ -0,0 +1,162 @@
+"""Run with: python -m unittest discover tests"""
+import http.server
+import json
+import os
+import re
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+import requests
+from utils.download import DownloadEngine
+
+DATA: bytes = os.urandom(1 << 20)
+
+class SignedRangeHandler(http.server.BaseHTTPRequestHandler):
+    """/dataset.zip redirects to /blob?sig=<token>, which serves DATA with byte ranges
+
+    Only the server's current token is accepted (403 otherwise), like an
+    expiring signed storage URL. `failures` is a list of planned responses
+    for the next blob GETs: "drop" sends part of the body and closes,
+    an int is sent as that status code. The body is `server.data`, tagged
+    with `server.etag`; If-Range is honoured unless `server.if_range` is False.
+    """
+    def log_message(self, *args):
+        pass
+
+    def _redirect(self) -> bool:
+        if self.path != "/dataset.zip":
+            return False
+        self.send_response(302)
+        self.send_header("Location", f"/blob?sig={self.server.token}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    def _signed(self) -> bool:
+        if self.path == f"/blob?sig={self.server.token}":
+            return True
+        self.send_response(403)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return False
+
+    def do_HEAD(self):
+        if self._redirect() or not self._signed():
+            return
+        self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(self.server.data)))
+        self.end_headers()
+
+    def do_GET(self):
+        if self._redirect() or not self._signed():
+            return
+        self.server.gets += 1
+        failure = self.server.failures.pop(0) if self.server.failures else None
+        if isinstance(failure, int):
+            self.send_response(failure)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data: bytes = self.server.data
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match and self.server.if_range and self.headers.get("If-Range", self.server.etag) != self.server.etag:
+            match = None
+        start, end = (int(match[1]), int(match[2]) if match[2] else len(data) - 1) if match else (0, len(data) - 1)
+        body = data[start:end + 1]
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        if failure == "drop":
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            self.connection.close()
+            return
+        self.wfile.write(body)
+
+class DownloadEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SignedRangeHandler)
+        self.server.token, self.server.failures, self.server.gets = "1", [], 0
+        self.server.data, self.server.etag, self.server.if_range = DATA, '"v1"', True
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/dataset.zip"
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dest = str(Path(tmp.name) / "dataset.zip")
+
+    def _engine(self, segments: int, retries: int = 3) -> DownloadEngine:
+        engine = DownloadEngine(chunk_size=16 << 10, segments=segments, retries=retries)
+        engine.min_segment_size = 64 << 10
+        self.addCleanup(engine.session.close)
+        return engine
+
+    def test_single_retries_dropped_connections_and_5xx(self):
+        self.server.failures = ["drop", 503, "drop"]
+        stats = self._engine(segments=1).download(self.url, self.dest)
+        self.assertEqual(Path(self.dest).read_bytes(), DATA)
+        self.assertEqual(stats["segments"], 1)
+
+    def _interrupted_single(self) -> None:
+        self.server.failures = ["drop"]
+        with self.assertRaises(requests.RequestException):
+            self._engine(segments=1, retries=0).download(self.url, self.dest)
+        self.assertGreater(Path(f"{self.dest}.part").stat().st_size, 0)
+        self.assertEqual(json.loads(Path(f"{self.dest}.part.validator.json").read_text())["etag"], '"v1"')
+
+    def test_single_resume_sends_if_range(self):
+        self._interrupted_single()
+        stats = self._engine(segments=1).download(self.url, self.dest)
+        self.assertEqual(Path(self.dest).read_bytes(), DATA)
+        self.assertGreater(stats["bytes_resumed"], 0)
+        self.assertFalse(Path(f"{self.dest}.part.validator.json").exists())
+
+    def test_single_resume_starts_over_when_the_object_changed(self):
+        self._interrupted_single()
+        self.server.data, self.server.etag = os.urandom(len(DATA)), '"v2"'
+        self._engine(segments=1).download(self.url, self.dest)
+        self.assertEqual(Path(self.dest).read_bytes(), self.server.data)
+
+    def test_single_resume_checks_content_range_without_if_range(self):
+        self._interrupted_single()
+        self.server.data, self.server.etag, self.server.if_range = os.urandom(len(DATA) + 1000), '"v2"', False
+        self._engine(segments=1).download(self.url, self.dest)
+        self.assertEqual(Path(self.dest).read_bytes(), self.server.data)
+
+    def test_segmented_retries_5xx(self):
+        self.server.failures = [503, "drop", 502]
+        stats = self._engine(segments=4).download(self.url, self.dest)
+        self.assertEqual(Path(self.dest).read_bytes(), DATA)
+        self.assertEqual(stats["segments"], 4)
+
+    def test_segmented_resume_after_signature_expired(self):
+        self.server.failures = ["drop"] * 4
+        with self.assertRaises(requests.RequestException):
+            self._engine(segments=4, retries=0).download(self.url, self.dest)
+        self.assertTrue(Path(f"{self.dest}.part.json").exists())
+        self.assertNotIn("sig=", Path(f"{self.dest}.part.json").read_text())
+
+        self.server.token = "2"
+        stats = self._engine(segments=4).download(self.url, self.dest)
+        self.assertEqual(Path(self.dest).read_bytes(), DATA)
+        self.assertGreater(stats["bytes_resumed"], 0)
+        self.assertEqual(stats["bytes_downloaded"] + stats["bytes_resumed"], len(DATA))
+        self.assertFalse(Path(f"{self.dest}.part.json").exists())
+
+    def test_signature_expiring_mid_download_is_resolved_again(self):
+        engine = self._engine(segments=4)
+        plan = engine._segment_plan(self.url, Path(f"{self.dest}.part"), Path(f"{self.dest}.part.json"))
+        self.server.token = "2"
+        engine._download_segmented(plan, Path(f"{self.dest}.part"), Path(f"{self.dest}.part.json"))
+        self.assertEqual(Path(f"{self.dest}.part").read_bytes(), DATA)
+        self.assertIn("sig=2", plan["url"])
+
+if __name__ == "__main__":
+    unittest.main()
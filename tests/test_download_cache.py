@@ -0,0 +1,87 @@
+"""Run with: python -m unittest discover tests"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from models.config import Source
+from utils.download_cache import DownloadCache
+
+class StubVersion:
+    """Mimics roboflow's Version.download: an existing location counts as downloaded unless overwrite"""
+    def __init__(self):
+        self.calls = 0
+
+    def download(self, model_format, location=None, overwrite=False):
+        self.calls += 1
+        if os.path.exists(location) and not overwrite:
+            return
+        images = Path(location) / "train" / "images"
+        images.mkdir(parents=True, exist_ok=True)
+        for n in range(3):
+            (images / f"img_{n}.jpg").write_bytes(b"\xff\xd8" + bytes([n]) * 64)
+
+class StubRoboflow:
+    def __init__(self):
+        self.version_ = StubVersion()
+
+    def workspace(self, name):
+        return self
+
+    def project(self, project_id):
+        return self
+
+    def version(self, number):
+        return self.version_
+
+class DownloadCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+        patcher = mock.patch.dict(os.environ, {
+            "DOWNLOAD_CACHE_DIR": str(self.root / "cache"),
+            "BRONZE_DIR": str(self.root / "bronze"),
+            "FINGERPRINT_INDEX_PATH": "",
+            "SILVER_CATALOG_PATH": "",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(DownloadCache._shared.clear)
+
+    def _handler(self):
+        from sources.roboflow_handler import RoboflowHandler
+        config = Source(name="stub", author="a", type="real", source="roboflow", handler="roboflow",
+                        url="https://universe.roboflow.com/workspace/project", date="2026")
+        handler = RoboflowHandler("stub", config)
+        handler._rf = StubRoboflow()
+        return handler
+
+    def test_roboflow_miss_then_hit(self):
+        first = self._handler()
+        self.assertEqual(len(first._dowload_from_roboflow("workspace", "project")), 3)
+        self.assertFalse(first.metrics.download_cache["hit"])
+        self.assertEqual(first.metrics.download_cache["files"], 3)
+
+        second = self._handler()
+        self.assertEqual(len(second._dowload_from_roboflow("workspace", "project")), 3)
+        self.assertTrue(second.metrics.download_cache["hit"])
+        self.assertEqual(second._rf.version_.calls, 0)
+
+    def test_empty_download_is_not_cached(self):
+        cache = DownloadCache(str(self.root / "cache"), 1 << 30)
+        with self.assertRaises(RuntimeError):
+            cache.fetch("empty", self.root / "bronze" / "empty", lambda directory: None)
+        self.assertFalse((self.root / "cache" / "entries" / "empty").exists())
+        self.assertEqual(cache.usage()["entries"], 0)
+
+        stats = cache.fetch("empty", self.root / "bronze" / "empty",
+                            lambda directory: (directory / "a.jpg").write_bytes(b"x"))
+        self.assertFalse(stats["hit"])
+        self.assertEqual(stats["files"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Run with: python -m unittest discover tests"""
+import hashlib
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+from PIL import Image
+from filters.extract import Extract
+from models.config import Source
+from utils.scan import ScanCache
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("L", (width, height), 128).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class StreamingExtractTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.members = {"images/a.png": _png(40, 30), "images/b.png": _png(64, 48)}
+        self.zip_path = self.root / "archive.zip"
+        with zipfile.ZipFile(self.zip_path, "w") as zip_ref:
+            for name, data in self.members.items():
+                zip_ref.writestr(name, data)
+
+    def _extract(self) -> tuple[Extract, list[Path]]:
+        config = Source(
+            name="local", author="a", type="t", source="s", handler="local", url="file://x", date="d",
+            filters=["extract"], filters_params={"extract": {"mode": "stream", "keep_archive": True}},
+        )
+        extract = Extract(config, ScanCache())
+        return extract, extract.apply([self.zip_path])
+
+    def _assert_seeded(self, extract: Extract, paths: list[Path]) -> None:
+        self.assertEqual(len(paths), 2)
+        expected = {
+            path: (hashlib.sha256(data).hexdigest(), Image.open(io.BytesIO(data)).size, len(data))
+            for path, data in ((path, self.members[path.relative_to(self.root).as_posix()]) for path in paths)
+        }
+        # Every record comes from the cache: hashing again would fail here
+        with mock.patch("utils.scan.hashlib.sha256", side_effect=AssertionError("re-hashed")):
+            for path in paths:
+                scan = extract.scan_cache.get(path)
+                self.assertEqual((scan.sha256, (scan.width, scan.height), scan.size_bytes), expected[path])
+
+    def test_streamed_members_seed_the_scan_cache(self):
+        extract, paths = self._extract()
+        self._assert_seeded(extract, paths)
+
+    def test_unchanged_members_seed_from_the_manifest(self):
+        self._extract()
+        extract, paths = self._extract()
+        self._assert_seeded(extract, paths)
+
+if __name__ == "__main__":
+    unittest.main()
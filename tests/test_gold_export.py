@@ -0,0 +1,65 @@
+"""Run with: python -m unittest discover tests"""
+import json
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from utils.gold_export import GoldExporter, _ShardWriter, read_sample
+
+class GoldExportFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.silver = Path(self.tmp.name) / "silver"
+        self.gold = Path(self.tmp.name) / "gold"
+        (self.silver / "metadata").mkdir(parents=True)
+        self.images = {}
+        for n in range(20):
+            image_id = f"img{n:02d}"
+            self.images[image_id] = bytes([n]) * (100 + n)
+            (self.silver / f"{image_id}.jpg").write_bytes(self.images[image_id])
+            with open(self.silver / "metadata" / f"{image_id}.json", "w") as f:
+                json.dump({"id": image_id, "name": f"{image_id}.jpg"}, f)
+
+    def _exporter(self) -> GoldExporter:
+        return GoldExporter(str(self.silver), str(self.gold), shard_max_count=3, val_fraction=0.3)
+
+    def _ids_on_disk(self) -> list[str]:
+        ids: list[str] = []
+        for shard in sorted(self.gold.glob("*/*.tar")):
+            with tarfile.open(shard) as tar:
+                ids.extend(Path(name).stem for name in tar.getnames() if name.endswith(".jpg"))
+        return ids
+
+    def test_failed_write_leaves_no_unindexed_shard(self):
+        write = _ShardWriter.write
+        calls = {"n": 0}
+
+        def failing_write(writer, record, image_path):
+            calls["n"] += 1
+            if calls["n"] == 11:
+                raise FileNotFoundError(image_path)
+            return write(writer, record, image_path)
+
+        with mock.patch.object(_ShardWriter, "write", failing_write):
+            with self.assertRaises(FileNotFoundError):
+                self._exporter().export()
+        self.assertEqual(list(self.gold.glob("*/*.tmp")), [])
+        manifest = json.loads((self.gold / "manifest.json").read_text())
+        listed = sorted(shard["shard"] for shard in manifest["shards"])
+        self.assertEqual(listed, sorted(f"{path.parent.name}/{path.name}" for path in self.gold.glob("*/*.tar")))
+        with open(self.gold / "index.jsonl") as f:
+            indexed = [json.loads(line) for line in f]
+        self.assertEqual(sorted(entry["id"] for entry in indexed), sorted(self._ids_on_disk()))
+        self.assertLess(len(indexed), 10)
+
+        stats = self._exporter().export()
+        self.assertEqual(stats["samples_total"], 20)
+        self.assertEqual(sorted(self._ids_on_disk()), sorted(self.images))
+        with open(self.gold / "index.jsonl") as f:
+            for entry in map(json.loads, f):
+                self.assertEqual(read_sample(str(self.gold), entry), self.images[entry["id"]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+"""Run with: python -m unittest discover tests"""
+import tempfile
+import unittest
+from utils.journal import ProgressJournal
+
+class ProgressJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _journal(self) -> ProgressJournal:
+        return ProgressJournal("source", checkpoint_dir=self.tmp.name)
+
+    def test_progress_survives_only_under_the_same_fingerprint(self):
+        journal = self._journal()
+        self.assertFalse(journal.bind("config-a"))
+        journal.record_verdicts(["a.jpg"], False)
+        journal.record_commits([("b.jpg", "id-b")])
+        journal.flush()
+
+        journal = self._journal()
+        self.assertFalse(journal.bind("config-a"))
+        self.assertEqual(set(journal.load()), {"a.jpg", "b.jpg"})
+
+        journal = self._journal()
+        self.assertTrue(journal.bind("config-b"))
+        self.assertEqual(journal.load(), {})
+        self.assertFalse(self._journal().bind("config-b"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Run with: python -m unittest discover tests"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from utils.manifest import SilverManifest, SilverManifestWriter
+
+def _records(count: int) -> list[dict]:
+    return [{"id": f"img{n:03d}", "name": f"img{n:03d}.jpg", "filters_params": {}} for n in range(count)]
+
+class ManifestCrashTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = self.tmp.name
+
+    def _crash_on_second_index_append(self, format: str) -> None:
+        writer = SilverManifestWriter(self.dir, "source", shard_size=4, format=format)
+        append = SilverManifestWriter._append_index
+        calls = {"n": 0}
+
+        def failing_append(self, index_lines):
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise OSError("crash before the index write")
+            append(self, index_lines)
+
+        with mock.patch.object(SilverManifestWriter, "_append_index", failing_append):
+            writer.write(_records(3))
+            with self.assertRaises(OSError):
+                writer.write(_records(7))
+                writer.close()
+
+    def _assert_resumed(self, format: str) -> None:
+        with open(Path(self.dir) / "source.index.jsonl") as f:
+            indexed = sorted(json.loads(line)["id"] for line in f)
+        self.assertEqual(sorted(record["id"] for record in SilverManifest(self.dir)), indexed)
+        self.assertLess(len(indexed), 10)
+        writer = SilverManifestWriter(self.dir, "source", shard_size=4, format=format)
+        writer.write(_records(10))
+        writer.close()
+        manifest = SilverManifest(self.dir)
+        ids = [record["id"] for record in manifest]
+        self.assertEqual(sorted(ids), [record["id"] for record in _records(10)])
+        self.assertEqual(manifest.get("img009")["name"], "img009.jpg")
+        with open(Path(self.dir) / "source.index.jsonl") as f:
+            shards = [json.loads(line)["shard"] for line in f]
+        self.assertLessEqual(max(shards.count(shard) for shard in shards), 4)
+        self.assertEqual(sorted(path.name for path in Path(self.dir).glob(f"source-*.{format}")), sorted(set(shards)))
+
+    def test_jsonl_rows_without_index_entries_are_dropped(self):
+        self._crash_on_second_index_append("jsonl")
+        self._assert_resumed("jsonl")
+
+    def test_parquet_shards_without_index_entries_are_dropped(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        self._crash_on_second_index_append("parquet")
+        self._assert_resumed("parquet")
+
+if __name__ == "__main__":
+    unittest.main()
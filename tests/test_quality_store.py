@@ -0,0 +1,52 @@
+"""Run with: python -m unittest discover tests"""
+import math
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from utils import quality_store
+from utils.quality_store import QualityMetricStore
+
+class QualityMetricStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "metrics.npz"
+
+    def _add(self, store: QualityMetricStore, n: int, contrast: float = 10.0, source: str = "a") -> None:
+        store.add(f"{n:064x}", source, 100 + n, None, contrast, None, False)
+
+    def test_saves_append_segments_that_reload(self):
+        store = QualityMetricStore(str(self.path))
+        self._add(store, 1)
+        store.save()
+        self._add(store, 2, source="b")
+        self._add(store, 1, contrast=20.0)
+        store.save()
+        self.assertFalse(self.path.exists())
+        self.assertEqual(len(list(store._segment_dir().glob("*.npz"))), 2)
+
+        reloaded = QualityMetricStore(str(self.path))
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.sources, ["a", "b"])
+        row = reloaded.lookup(f"{1:064x}")
+        self.assertEqual((reloaded.height[row], reloaded.width[row], reloaded.contrast[row]), (101, -1, 20.0))
+        self.assertTrue(math.isnan(reloaded.laplacian_variance[row]))
+
+    def test_compaction_folds_segments_into_the_main_file(self):
+        store = QualityMetricStore(str(self.path))
+        with mock.patch.object(quality_store, "COMPACT_AFTER_SEGMENTS", 3):
+            for n in range(4):
+                self._add(store, n)
+                store.save()
+        self.assertTrue(self.path.exists())
+        self.assertEqual([segment.name for segment in store._segments()], ["000000.npz"])
+        store.compact()
+        self.assertEqual(store._segments(), [])
+
+        reloaded = QualityMetricStore(str(self.path))
+        self.assertEqual(len(reloaded), 4)
+        self.assertEqual(sorted(reloaded.height.tolist()), [100, 101, 102, 103])
+
+if __name__ == "__main__":
+    unittest.main()
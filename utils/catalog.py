@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from utils.manifest import iter_silver_records
+
+_SILVER_COLUMNS: tuple = (
+    "id", "name", "source_id", "source_name", "source_image_name", "source_image_path",
+    "width", "height", "format", "size_bytes", "processed_date",
+)
+_BRONZE_COLUMNS: tuple = (
+    "id", "name", "author", "type", "source", "handler", "url", "license",
+    "date", "version", "model", "creation_date",
+)
+
+class SilverCatalog:
+    """Embedded SQLite catalog of silver (and bronze) metadata
+
+    The queryable fields are real columns with indexes; the full record is
+    kept as JSON next to them, so get() returns exactly what was saved.
+    save_metadata_silver/save_metadata_bronze write into it, so membership
+    checks and per-source stats no longer need a scan of silver/metadata/.
+    """
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS silver (
+                id TEXT PRIMARY KEY,
+                name TEXT, source_id TEXT, source_name TEXT, source_image_name TEXT, source_image_path TEXT,
+                width INTEGER, height INTEGER, format TEXT, size_bytes INTEGER, processed_date TEXT,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS silver_source_id ON silver (source_id);
+            CREATE INDEX IF NOT EXISTS silver_format ON silver (format);
+            CREATE INDEX IF NOT EXISTS silver_size ON silver (width, height);
+            CREATE INDEX IF NOT EXISTS silver_processed_date ON silver (processed_date);
+            CREATE TABLE IF NOT EXISTS bronze (
+                id TEXT PRIMARY KEY,
+                name TEXT, author TEXT, type TEXT, source TEXT, handler TEXT, url TEXT, license TEXT,
+                date TEXT, version INTEGER, model TEXT, creation_date TEXT,
+                record TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    _shared: Dict[str, "SilverCatalog"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, db_path: str) -> "SilverCatalog":
+        """Process-wide instance for db_path"""
+        key = os.path.abspath(db_path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(db_path)
+            return cls._shared[key]
+
+    def _upsert(self, table: str, columns: tuple, records: Iterable[dict]) -> int:
+        rows = [
+            (*(record.get(column) for column in columns), json.dumps(record, default=str))
+            for record in records
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, record) "
+                f"VALUES ({', '.join('?' * (len(columns) + 1))})",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def upsert_silver(self, records: Iterable[dict]) -> int:
+        return self._upsert("silver", _SILVER_COLUMNS, records)
+
+    def upsert_bronze(self, record: dict) -> int:
+        return self._upsert("bronze", _BRONZE_COLUMNS, [record])
+
+    def contains(self, image_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM silver WHERE id = ?", (image_id,)).fetchone() is not None
+
+    def existing(self, image_ids: Iterable[str]) -> set[str]:
+        """The subset of image_ids already in silver"""
+        ids = list(image_ids)
+        found: set[str] = set()
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 900):
+                chunk = ids[start:start + 900]
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT id FROM silver WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+        return found
+
+    def get(self, image_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM silver WHERE id = ?", (image_id,)).fetchone()
+        return None if row is None else json.loads(row["record"])
+
+    def _where(self, source_id: Optional[str], format: Optional[str], min_width: Optional[int],
+               min_height: Optional[int], since: Optional[str]) -> tuple[str, list]:
+        clauses: List[str] = []
+        params: list = []
+        for clause, value in (
+            ("source_id = ?", source_id),
+            ("format = ?", format.upper() if format else None),
+            ("width >= ?", min_width),
+            ("height >= ?", min_height),
+            ("processed_date >= ?", since),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, source_id: Optional[str] = None, format: Optional[str] = None, min_width: Optional[int] = None,
+              min_height: Optional[int] = None, since: Optional[str] = None) -> int:
+        where, params = self._where(source_id, format, min_width, min_height, since)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM silver{where}", params).fetchone()[0]
+
+    def query(self, source_id: Optional[str] = None, format: Optional[str] = None, min_width: Optional[int] = None,
+              min_height: Optional[int] = None, since: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Full records matching every given condition, newest first"""
+        where, params = self._where(source_id, format, min_width, min_height, since)
+        sql = f"SELECT record FROM silver{where} ORDER BY processed_date DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [json.loads(row["record"]) for row in self._conn.execute(sql, params)]
+
+    def source_stats(self) -> List[dict]:
+        """Per-source image count, bytes, mean size and formats"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT source_id, COUNT(*) AS images, SUM(size_bytes) AS bytes,
+                       AVG(width) AS mean_width, AVG(height) AS mean_height,
+                       MAX(processed_date) AS last_processed
+                FROM silver GROUP BY source_id ORDER BY source_id
+            """).fetchall()
+            formats = self._conn.execute(
+                "SELECT source_id, format, COUNT(*) FROM silver GROUP BY source_id, format"
+            ).fetchall()
+        per_source: Dict[str, dict] = {row["source_id"]: dict(row) for row in rows}
+        for source_id, image_format, count in formats:
+            per_source[source_id].setdefault("formats", {})[image_format] = count
+        return list(per_source.values())
+
+    def rebuild(self, metadata_dir: str) -> int:
+        """Load every existing silver record (per-image files and manifest) into the catalog"""
+        batch: List[dict] = []
+        total = 0
+        for record in iter_silver_records(metadata_dir):
+            batch.append(record)
+            if len(batch) >= 1000:
+                total += self.upsert_silver(batch)
+                batch = []
+        return total + self.upsert_silver(batch)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def default_catalog_path() -> str:
+    return os.getenv("SILVER_CATALOG_PATH", os.path.join(os.getenv("SILVER_DIR", "./silver"), "catalog.sqlite"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the silver metadata catalog")
+    parser.add_argument("--db", default=default_catalog_path())
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="per-source counts, bytes and formats")
+    has = subparsers.add_parser("has", help="exit 0 if the image id is in silver, 1 otherwise")
+    has.add_argument("image_id")
+    show = subparsers.add_parser("get", help="print the record of one image id")
+    show.add_argument("image_id")
+    for name in ("count", "query"):
+        sub = subparsers.add_parser(name, help=f"{name} images matching the filters")
+        sub.add_argument("--source-id")
+        sub.add_argument("--format")
+        sub.add_argument("--min-width", type=int)
+        sub.add_argument("--min-height", type=int)
+        sub.add_argument("--since", help="ISO date, compared with processed_date")
+        if name == "query":
+            sub.add_argument("--limit", type=int, default=20)
+    rebuild = subparsers.add_parser("rebuild", help="load existing silver metadata into the catalog")
+    rebuild.add_argument("--metadata-dir", default=os.path.join(
+        os.getenv("SILVER_DIR", "./silver"), os.getenv("METADATA_SUBFOLDER", "metadata")
+    ))
+    args = parser.parse_args()
+
+    catalog = SilverCatalog(args.db)
+    if args.command == "stats":
+        print(json.dumps(catalog.source_stats(), indent=4))
+    elif args.command == "has":
+        found = catalog.contains(args.image_id)
+        print("yes" if found else "no")
+        raise SystemExit(0 if found else 1)
+    elif args.command == "get":
+        record = catalog.get(args.image_id)
+        if record is None:
+            raise SystemExit(f"{args.image_id} not found")
+        print(json.dumps(record, indent=4))
+    elif args.command == "rebuild":
+        print(f"Loaded {catalog.rebuild(args.metadata_dir)} records into {args.db}")
+    else:
+        filters = dict(source_id=args.source_id, format=args.format, min_width=args.min_width,
+                       min_height=args.min_height, since=args.since)
+        if args.command == "count":
+            print(catalog.count(**filters))
+        else:
+            for record in catalog.query(limit=args.limit, **filters):
+                print(json.dumps(record))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("pipeline.download")
+
+_RETRYABLE = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+# What an expired signed redirect target (e.g. Kaggle -> storage) answers
+_EXPIRED_STATUS = (401, 403)
+
+def _status(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+def _is_retryable(error: Exception) -> bool:
+    """Dropped connections and server-side failures (5xx, 429) are worth another attempt"""
+    status: Optional[int] = _status(error)
+    return isinstance(error, _RETRYABLE) or (status is not None and (status >= 500 or status == 429))
+
+class TokenBucket:
+    """Thread-safe byte-rate limiter: consume() blocks until the bytes fit under the rate
+
+    burst defaults to one second's worth, so short stalls are caught up quickly
+    without letting the average exceed bytes_per_second.
+    """
+    def __init__(self, bytes_per_second: float, burst: Optional[float] = None):
+        self.rate = float(bytes_per_second)
+        self.capacity = float(burst or bytes_per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds: float = 0.0
+
+    def consume(self, size: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Go into debt rather than splitting chunks larger than the bucket
+            self._tokens -= size
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited_seconds += wait
+        if wait:
+            time.sleep(wait)
+
+_bandwidth_limit: Optional[TokenBucket] = None
+
+def set_bandwidth_limit(bytes_per_second: Optional[float]) -> None:
+    """Cap the combined rate of every DownloadEngine in this process; None or 0 removes the cap"""
+    global _bandwidth_limit
+    _bandwidth_limit = TokenBucket(bytes_per_second) if bytes_per_second else None
+
+class DownloadEngine:
+    """HTTP downloader with a pooled session, Range resume and optional segmented transfers
+
+    Data is written to <dest>.part and renamed on completion. A restart
+    continues from the bytes already in the .part file, sending If-Range
+    with the ETag or Last-Modified saved in <dest>.part.validator.json and
+    starting over if the object changed. When segments > 1
+    and the server advertises Accept-Ranges, the file is fetched as that many
+    parallel byte ranges; their progress is kept in <dest>.part.json so an
+    interrupted segmented download resumes too. Only the requested URL is
+    saved: its redirect target is resolved again on every run, and again
+    whenever it answers 401/403, so an expired signature doesn't break
+    the resume.
+    """
+    def __init__(self, session: Optional[requests.Session] = None, chunk_size: Optional[int] = None,
+                 segments: Optional[int] = None, retries: int = 3, timeout: float = 60.0,
+                 throttle: Optional[TokenBucket] = None):
+        self.chunk_size: int = chunk_size or int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1 << 20)))
+        self.segments: int = max(1, segments or int(os.getenv("DOWNLOAD_SEGMENTS", "1")))
+        self.min_segment_size: int = int(os.getenv("DOWNLOAD_MIN_SEGMENT_SIZE", str(8 << 20)))
+        self.retries = retries
+        self.timeout = timeout
+        self.session = session or self._build_session()
+        # None falls back to the process-wide cap from set_bandwidth_limit()
+        self.throttle = throttle
+        self._lock = threading.Lock()
+        self._bytes_transferred: int = 0
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, self.segments))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _count(self, size: int) -> None:
+        with self._lock:
+            self._bytes_transferred += size
+        throttle: Optional[TokenBucket] = self.throttle or _bandwidth_limit
+        if throttle is not None:
+            throttle.consume(size)
+
+    def download(self, url: str, dest_path: str) -> dict:
+        """Download url to dest_path and return transfer stats for SourceMetrics"""
+        start: float = time.perf_counter()
+        self._bytes_transferred = 0
+        part_path = Path(f"{dest_path}.part")
+        state_path = Path(f"{dest_path}.part.json")
+        resumed_bytes: int = (
+            part_path.stat().st_size
+            if part_path.exists() and not state_path.exists() and self._validator_path(part_path).exists() else 0
+        )
+        segments_used: int = 1
+
+        plan = self._segment_plan(url, part_path, state_path)
+        if plan is not None:
+            segments_used = len(plan["segments"])
+            resumed_bytes = sum(done for _, _, done in plan["segments"])
+            self._download_segmented(plan, part_path, state_path)
+        else:
+            self._download_single(url, part_path)
+        os.replace(part_path, dest_path)
+
+        seconds: float = time.perf_counter() - start
+        stats = {
+            "bytes_downloaded": self._bytes_transferred,
+            "bytes_resumed": resumed_bytes,
+            "seconds": round(seconds, 3),
+            "throughput_mb_s": round(self._bytes_transferred / seconds / 1e6, 3) if seconds else None,
+            "segments": segments_used,
+            "chunk_size": self.chunk_size,
+        }
+        logger.info(f"Downloaded {dest_path}: {stats}")
+        return stats
+
+    def _validator_path(self, part_path: Path) -> Path:
+        return Path(f"{part_path}.validator.json")
+
+    def _load_validator(self, part_path: Path) -> dict:
+        """What the .part file was started from; a .part without one can't be trusted and is dropped"""
+        validator_path = self._validator_path(part_path)
+        if part_path.exists() and validator_path.exists():
+            with open(validator_path, 'r') as f:
+                return json.load(f)
+        part_path.unlink(missing_ok=True)
+        validator_path.unlink(missing_ok=True)
+        return {}
+
+    def _save_validator(self, response: requests.Response, part_path: Path) -> dict:
+        etag: Optional[str] = response.headers.get("ETag")
+        size: Optional[str] = response.headers.get("Content-Length")
+        validator = {
+            # If-Range only accepts a strong ETag; otherwise fall back to Last-Modified
+            "etag": etag if etag and not etag.startswith("W/") else None,
+            "last_modified": response.headers.get("Last-Modified"),
+            "size": int(size) if size is not None else None,
+        }
+        tmp_path = self._validator_path(part_path).with_name(self._validator_path(part_path).name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(validator, f)
+        os.replace(tmp_path, self._validator_path(part_path))
+        return validator
+
+    def _continues(self, response: requests.Response, offset: int, validator: dict) -> bool:
+        """Whether a 206 is the rest of the same object the .part file holds the start of"""
+        match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", response.headers.get("Content-Range", ""))
+        if match is None or int(match.group(1)) != offset:
+            return False
+        if match.group(3) != "*" and validator.get("size") is not None and int(match.group(3)) != validator["size"]:
+            return False
+        etag: Optional[str] = response.headers.get("ETag")
+        return not (etag and validator.get("etag") and etag != validator["etag"])
+
+    def _download_single(self, url: str, part_path: Path) -> None:
+        """GET url into part_path, resuming with Range + If-Range from the validator saved next to it"""
+        attempt: int = 0
+        while True:
+            validator: dict = self._load_validator(part_path)
+            offset: int = part_path.stat().st_size if part_path.exists() else 0
+            headers: dict = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if validator.get("etag") or validator.get("last_modified"):
+                    headers["If-Range"] = validator.get("etag") or validator["last_modified"]
+            try:
+                with self.session.get(url, headers=headers, stream=True, allow_redirects=True, timeout=self.timeout) as response:
+                    if response.status_code == 416 and offset:
+                        if offset == validator.get("size"):
+                            break  # the .part file already holds the whole body
+                        logger.warning(f"{url}: range {offset}- not satisfiable for the saved download; starting over")
+                        part_path.unlink()
+                        continue
+                    response.raise_for_status()
+                    if response.status_code == 206 and not self._continues(response, offset, validator):
+                        logger.warning(f"{url} changed since the interrupted download; starting over")
+                        part_path.unlink()
+                        continue
+                    # A 200 to a Range request means the server ignored it or If-Range didn't match: start over
+                    mode = 'ab' if response.status_code == 206 else 'wb'
+                    if mode == 'wb':
+                        self._save_validator(response, part_path)
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                self._count(len(chunk))
+                break
+            except requests.RequestException as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    raise
+                attempt += 1
+                logger.warning(f"Download interrupted ({e}); resuming (attempt {attempt}/{self.retries})")
+                time.sleep(min(2 ** (attempt - 1), 30))
+        self._validator_path(part_path).unlink(missing_ok=True)
+
+    def _head(self, url: str) -> requests.Response:
+        """HEAD url, following redirects; response.url is where the bytes are served from"""
+        return self.session.head(url, allow_redirects=True, timeout=self.timeout)
+
+    def _resolve(self, plan: dict) -> None:
+        """Point plan["url"] at a fresh redirect target of plan["source_url"]"""
+        response: requests.Response = self._head(plan["source_url"])
+        response.raise_for_status()
+        plan["url"] = response.url
+
+    def _segment_plan(self, url: str, part_path: Path, state_path: Path) -> Optional[dict]:
+        """Load a saved segment plan, or build one if the server supports byte ranges"""
+        if state_path.exists():
+            with open(state_path, 'r') as f:
+                plan = json.load(f)
+            if part_path.exists() and plan.get("source_url") == url:
+                # Raises on a failed HEAD, keeping the progress for the next run
+                response: requests.Response = self._head(url)
+                response.raise_for_status()
+                if int(response.headers.get("Content-Length", -1)) == plan["size"]:
+                    plan["url"] = response.url
+                    return plan
+                logger.warning(f"{url} changed size since the interrupted download; starting over")
+            # The .part file was laid out for that plan and can't be resumed any other way
+            part_path.unlink(missing_ok=True)
+            state_path.unlink()
+        if self.segments <= 1 or part_path.exists():
+            return None
+        response = self._head(url)
+        if not response.ok or response.headers.get("Accept-Ranges", "").lower() != "bytes":
+            return None
+        size = int(response.headers.get("Content-Length", 0))
+        if size < self.min_segment_size * 2:
+            return None
+        count = min(self.segments, size // self.min_segment_size)
+        bounds = [size * i // count for i in range(count + 1)]
+        plan = {
+            "source_url": url,
+            # Signed redirect targets (e.g. Kaggle -> storage) are fetched directly; never saved
+            "url": response.url,
+            "size": size,
+            "segments": [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)],
+        }
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+        self._save_plan(plan, state_path)
+        return plan
+
+    def _save_plan(self, plan: dict, state_path: Path) -> None:
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                json.dump({key: value for key, value in plan.items() if key != "url"}, f)
+            os.replace(tmp_path, state_path)
+
+    def _download_segment(self, plan: dict, index: int, part_path: Path, state_path: Path) -> None:
+        segment = plan["segments"][index]
+        for attempt in range(self.retries + 1):
+            start, end, done = segment
+            if start + done > end:
+                return
+            headers = {"Range": f"bytes={start + done}-{end}"}
+            try:
+                with self.session.get(plan["url"], headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise requests.HTTPError(f"Expected 206 for a range request, got {response.status_code}")
+                    fd = os.open(part_path, os.O_WRONLY)
+                    try:
+                        written_since_save = 0
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            if not chunk:
+                                continue
+                            os.pwrite(fd, chunk, start + segment[2])
+                            segment[2] += len(chunk)
+                            self._count(len(chunk))
+                            written_since_save += len(chunk)
+                            if written_since_save >= 16 * self.chunk_size:
+                                self._save_plan(plan, state_path)
+                                written_since_save = 0
+                    finally:
+                        os.close(fd)
+                return
+            except requests.RequestException as e:
+                self._save_plan(plan, state_path)
+                expired: bool = _status(e) in _EXPIRED_STATUS
+                if attempt == self.retries or not (expired or _is_retryable(e)):
+                    raise
+                if expired:
+                    logger.warning(f"Segment {index}: download URL expired; resolving {plan['source_url']} again")
+                    self._resolve(plan)
+                    continue
+                logger.warning(f"Segment {index} interrupted ({e}); resuming (attempt {attempt + 1}/{self.retries})")
+                time.sleep(min(2 ** attempt, 30))
+
+    def _download_segmented(self, plan: dict, part_path: Path, state_path: Path) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=len(plan["segments"]), thread_name_prefix="download") as executor:
+                futures = [
+                    executor.submit(self._download_segment, plan, index, part_path, state_path)
+                    for index in range(len(plan["segments"]))
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            self._save_plan(plan, state_path)
+        state_path.unlink()
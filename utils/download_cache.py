@@ -0,0 +1,250 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+from utils.materialize import materialize
+
+logger = logging.getLogger("pipeline.download_cache")
+
+def default_cache_dir() -> str:
+    return os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pipeline", "downloads"))
+
+def default_max_bytes() -> int:
+    return int(float(os.getenv("DOWNLOAD_CACHE_MAX_GB", "50")) * (1 << 30))
+
+def cache_key(handler: str, *identity: object) -> str:
+    """Readable, filesystem-safe key for a dataset version, e.g. kaggle-owner_dataset-v1-<hash>"""
+    parts = [handler, *(str(part) for part in identity)]
+    digest = hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:12]
+    slug = "-".join("".join(c if c.isalnum() or c in "._" else "_" for c in part) for part in parts)
+    return f"{slug[:80]}-{digest}"
+
+def _tree_size(path: Path) -> tuple[int, int]:
+    """(bytes, files) under path, or of path itself when it is a file"""
+    if path.is_file():
+        return path.stat().st_size, 1
+    size, files = 0, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            size += os.lstat(os.path.join(root, name)).st_size
+            files += 1
+    return size, files
+
+class DownloadCache:
+    """Downloaded datasets kept outside bronze, shared by every run and checkout on the machine
+
+    Each entry is a directory <root>/entries/<key>/ filled by a download
+    callback and copied into bronze as hardlinks, so a cached dataset costs
+    its disk space once. Inserts are built in <root>/tmp/<key>/ and renamed
+    into place, and a per-key flock serializes builders across processes:
+    a second run asking for the same key waits and then gets a hit. Readers
+    hold the lock shared while linking, so eviction never removes an entry
+    mid-link. Past max_bytes the least recently used entries are deleted.
+    """
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        for sub in ("entries", "tmp", "locks"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                files INTEGER NOT NULL,
+                fetch_seconds REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    _shared: Dict[str, "DownloadCache"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, root: str, max_bytes: int) -> "DownloadCache":
+        """Process-wide instance for root"""
+        key = os.path.abspath(root)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(root, max_bytes)
+            return cls._shared[key]
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / "entries" / key
+
+    @contextmanager
+    def _key_lock(self, key: str, exclusive: bool, blocking: bool = True) -> Iterator[bool]:
+        """flock on the key's lock file; yields False when non-blocking and someone else holds it"""
+        fd = os.open(self.root / "locks" / f"{key}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(fd, flags)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    def _row(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT size_bytes, files, fetch_seconds FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def _index(self, key: str, fetch_seconds: float) -> tuple:
+        size, files = _tree_size(self._entry_path(key))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, size_bytes, files, fetch_seconds, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, size, files, fetch_seconds, now, now),
+            )
+            self._conn.commit()
+        return size, files, fetch_seconds
+
+    def _link_into(self, key: str, destination: Path) -> Dict[str, int]:
+        """Recreate the entry's tree under destination, one hardlink (or copy across filesystems) per file"""
+        entry = self._entry_path(key)
+        strategies: Dict[str, int] = {}
+        for root, _, names in os.walk(entry):
+            target_dir = destination / Path(root).relative_to(entry)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            for name in names:
+                target = target_dir / name
+                if target.exists():
+                    target.unlink()
+                used = materialize(Path(root) / name, target, "hardlink").strategy
+                strategies[used] = strategies.get(used, 0) + 1
+        return strategies
+
+    def fetch(self, key: str, destination: Path, download: Callable[[Path], None]) -> dict:
+        """Put the entry for key under destination, calling download(directory) first on a miss
+
+        download must write everything into the directory it is given. Returns
+        hit/miss stats for SourceMetrics.
+        """
+        destination = Path(destination)
+        start: float = time.perf_counter()
+        hit = True
+        with self._key_lock(key, exclusive=False):
+            row = self._row(key) if self._entry_path(key).exists() else None
+            if row is not None:
+                self._touch(key)
+                strategies = self._link_into(key, destination)
+        if row is None:
+            with self._key_lock(key, exclusive=True):
+                # Another process may have inserted it while we waited for the lock
+                if self._entry_path(key).exists():
+                    row = self._row(key) or self._index(key, 0.0)
+                else:
+                    hit = False
+                    row = self._insert(key, download)
+                self._touch(key)
+                strategies = self._link_into(key, destination)
+            self.evict(keep=key)
+        size, files, fetch_seconds = row
+        stats = {
+            "key": key,
+            "hit": hit,
+            "bytes": size,
+            "files": files,
+            "link_strategies": strategies,
+            "seconds": round(time.perf_counter() - start, 3),
+            "estimated_seconds_saved": round(fetch_seconds, 3) if hit else 0.0,
+        }
+        logger.info(f"Download cache {'hit' if hit else 'miss'} for {key}: {stats}")
+        return stats
+
+    def _insert(self, key: str, download: Callable[[Path], None]) -> tuple:
+        """Run download into tmp/<key> and rename it into entries/; called under the key's exclusive lock"""
+        # Fixed per key, not per attempt, so an interrupted download's .part files are resumed
+        building = self.root / "tmp" / key
+        building.mkdir(parents=True, exist_ok=True)
+        start: float = time.perf_counter()
+        download(building)
+        fetch_seconds = time.perf_counter() - start
+        if not any(building.iterdir()):
+            # Never cache an empty entry: every later fetch would be a "hit" with no files
+            building.rmdir()
+            raise RuntimeError(f"Download for {key} produced no files")
+        os.rename(building, self._entry_path(key))
+        return self._index(key, fetch_seconds)
+
+    def usage(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def evict(self, keep: Optional[str] = None) -> dict:
+        """Delete least recently used entries until the cache fits max_bytes
+
+        Entries being linked or built by anyone (their lock is held) are
+        skipped, as is keep.
+        """
+        evicted, freed = 0, 0
+        with self._lock:
+            rows = self._conn.execute("SELECT key, size_bytes FROM entries ORDER BY last_used").fetchall()
+        total = sum(size for _, size in rows)
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            with self._key_lock(key, exclusive=True, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                # Rename first so a half-deleted tree is never mistaken for an entry
+                doomed = self.root / "tmp" / f"{key}.evicting.{os.getpid()}"
+                if self._entry_path(key).exists():
+                    os.rename(self._entry_path(key), doomed)
+                with self._lock:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
+            evicted += 1
+            freed += size
+            logger.info(f"Evicted {key} from the download cache ({size} bytes)")
+        return {"evicted": evicted, "bytes_freed": freed}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the shared download cache")
+    parser.add_argument("--dir", default=default_cache_dir())
+    parser.add_argument("--max-gb", type=float, help="override DOWNLOAD_CACHE_MAX_GB for this command")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("usage", help="entries and bytes used")
+    subparsers.add_parser("evict", help="delete least recently used entries down to the budget")
+    args = parser.parse_args()
+    max_bytes = int(args.max_gb * (1 << 30)) if args.max_gb is not None else default_max_bytes()
+    cache = DownloadCache(args.dir, max_bytes)
+    if args.command == "evict":
+        print(json.dumps(cache.evict(), indent=2))
+    print(json.dumps(cache.usage(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from utils.scan import ImageScan
+
+# Params that only change how a filter runs, not what it decides
+EXECUTION_ONLY_PARAMS: frozenset = frozenset({
+    "workers", "chunk_size", "start_method", "stream_batch_size",
+    "memory_budget_mb", "oversized",
+})
+
+def params_fingerprint(params: dict, ignore: Iterable[str] = EXECUTION_ONLY_PARAMS) -> str:
+    """Stable hash of a filter's params, used to invalidate cached verdicts"""
+    relevant = {key: value for key, value in params.items() if key not in set(ignore)}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def _file_key(stats: os.stat_result) -> tuple[int, int, int]:
+    return stats.st_size, stats.st_mtime_ns, stats.st_ino
+
+class FingerprintIndex:
+    """Persistent SQLite index of scan results and filter verdicts
+
+    Rows are keyed by path and only trusted while (size, mtime_ns, inode)
+    still match the file on disk, so edited or replaced files are rescanned
+    automatically. Verdicts are additionally keyed by the filter's params
+    fingerprint.
+
+    Writes are committed in batches, so handlers in the same process must
+    share one instance (see shared()) instead of competing for the write lock.
+    """
+    _SCAN_COLUMNS: tuple = (
+        "sha256", "size_bytes", "format", "width", "height", "decoded",
+        "corrupted", "contrast", "laplacian_variance", "reduction",
+    )
+
+    def __init__(self, db_path: str = ".checkpoints/fingerprints.sqlite", commit_every: int = 500):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._pending_writes: int = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scans (
+                path TEXT PRIMARY KEY,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                plan TEXT,
+                sha256 TEXT, size_bytes INTEGER, format TEXT, width INTEGER, height INTEGER,
+                decoded INTEGER, corrupted INTEGER, contrast REAL, laplacian_variance REAL, reduction INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS verdicts (
+                path TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                filter_name TEXT NOT NULL,
+                params TEXT NOT NULL,
+                verdict INTEGER NOT NULL,
+                PRIMARY KEY (path, filter_name, params)
+            );
+        """)
+
+    _shared: Dict[str, "FingerprintIndex"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, db_path: str) -> "FingerprintIndex":
+        """Process-wide instance for db_path"""
+        key = os.path.abspath(db_path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(db_path)
+            return cls._shared[key]
+
+    def lookup(self, image_path: Path, stats: os.stat_result, plan: Optional[str] = None) -> Optional[ImageScan]:
+        """Return the stored scan if the file is unchanged
+
+        Quality metrics are only returned when they were measured with the
+        same plan fingerprint; otherwise the header-level record comes back
+        with decoded=False so the caller measures again.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT plan, {', '.join(self._SCAN_COLUMNS)} FROM scans "
+                "WHERE path = ? AND file_size = ? AND mtime_ns = ? AND inode = ?",
+                (str(image_path), *_file_key(stats)),
+            ).fetchone()
+        if row is None:
+            return None
+        stored_plan, values = row[0], dict(zip(self._SCAN_COLUMNS, row[1:]))
+        scan = ImageScan(path=str(image_path), **values)
+        scan.decoded, scan.corrupted = bool(scan.decoded), bool(scan.corrupted)
+        if scan.decoded and stored_plan != plan:
+            scan.decoded, scan.corrupted = False, False
+            scan.contrast, scan.laplacian_variance, scan.reduction = None, None, 1
+        return scan
+
+    def store(self, scan: ImageScan, stats: os.stat_result, plan: Optional[str] = None) -> None:
+        key = _file_key(stats)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT file_size, mtime_ns, inode FROM scans WHERE path = ?", (scan.path,)
+            ).fetchone()
+            if previous is not None and tuple(previous) != key:
+                self._conn.execute("DELETE FROM verdicts WHERE path = ?", (scan.path,))
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO scans (path, file_size, mtime_ns, inode, plan, {', '.join(self._SCAN_COLUMNS)}) "
+                f"VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(self._SCAN_COLUMNS))})",
+                (scan.path, *key, plan if scan.decoded else None, *(getattr(scan, column) for column in self._SCAN_COLUMNS)),
+            )
+            self._written()
+
+    def get_verdict(self, image_path: Path, stats: os.stat_result, filter_name: str, params: str) -> Optional[bool]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT verdict FROM verdicts WHERE path = ? AND file_size = ? AND mtime_ns = ? AND inode = ? "
+                "AND filter_name = ? AND params = ?",
+                (str(image_path), *_file_key(stats), filter_name, params),
+            ).fetchone()
+        return None if row is None else bool(row[0])
+
+    def store_verdict(self, image_path: Path, stats: os.stat_result, filter_name: str, params: str, verdict: bool) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (path, file_size, mtime_ns, inode, filter_name, params, verdict) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(image_path), *_file_key(stats), filter_name, params, int(verdict)),
+            )
+            self._written()
+
+    def _written(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
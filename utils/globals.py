@@ -1,6 +1,14 @@
 from pathlib import Path
 from models.config import Config, load_config_from_dict
 
-CONFIG: Config = load_config_from_dict()
 SOURCES_TEMP_FOLDERS: dict[str, Path] = {}
+_config: Config | None = None
 
+def __getattr__(name: str):
+    # CONFIG is parsed on first access rather than as an import side effect
+    global _config
+    if name == "CONFIG":
+        if _config is None:
+            _config = load_config_from_dict()
+        return _config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,262 @@
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tarfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from utils.manifest import iter_silver_records
+
+logger = logging.getLogger("pipeline.gold")
+
+SPLITS: tuple = ("train", "val")
+
+def _sort_key(seed: int, image_id: str) -> str:
+    return hashlib.sha256(f"{seed}:{image_id}".encode()).hexdigest()
+
+def assign_split(seed: int, image_id: str, val_fraction: float) -> str:
+    """Deterministic split from the id alone, so an image never changes side between exports"""
+    bucket = int(hashlib.sha256(f"split:{seed}:{image_id}".encode()).hexdigest()[:8], 16) / 0x100000000
+    return "val" if bucket < val_fraction else "train"
+
+class _ShardWriter:
+    """Writes <split>-<n>.tar shards, starting a new one at max_bytes or max_count samples"""
+    def __init__(self, directory: Path, split: str, first_number: int, max_bytes: int, max_count: int):
+        self.directory = directory
+        self.split = split
+        self.number = first_number - 1
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+        self._tar: Optional[tarfile.TarFile] = None
+        self._tmp_path: Optional[Path] = None
+        self._bytes: int = 0
+        self._count: int = 0
+        self.finished: List[dict] = []
+
+    @property
+    def shard_name(self) -> str:
+        return f"{self.split}/{self.split}-{self.number:06d}.tar"
+
+    def _open(self) -> None:
+        self.number += 1
+        (self.directory / self.split).mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.directory / f"{self.shard_name}.tmp"
+        # USTAR keeps every header at 512 bytes, so data offsets are predictable
+        self._tar = tarfile.open(self._tmp_path, 'w', format=tarfile.USTAR_FORMAT)
+        self._bytes = 0
+        self._count = 0
+
+    def _add(self, name: str, data: bytes, mtime: float) -> int:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(mtime)
+        offset: int = self._tar.offset
+        self._tar.addfile(info, io.BytesIO(data))
+        return offset + tarfile.BLOCKSIZE
+
+    def write(self, record: dict, image_path: Path) -> dict:
+        """Add one sample (<id>.<ext> and <id>.json) and return its index entry"""
+        image_bytes: bytes = image_path.read_bytes()
+        metadata_bytes: bytes = json.dumps(record, sort_keys=True).encode()
+        size = len(image_bytes) + len(metadata_bytes) + 4 * tarfile.BLOCKSIZE
+        if self._tar is not None and (self._bytes + size > self.max_bytes or self._count >= self.max_count):
+            self.close()
+        if self._tar is None:
+            self._open()
+        extension: str = image_path.suffix.lower().lstrip(".") or "bin"
+        mtime: float = time.time()
+        image_offset = self._add(f"{record['id']}.{extension}", image_bytes, mtime)
+        self._add(f"{record['id']}.json", metadata_bytes, mtime)
+        self._bytes += size
+        self._count += 1
+        return {
+            "id": record["id"], "split": self.split, "shard": self.shard_name,
+            "offset": image_offset, "size": len(image_bytes), "extension": extension,
+        }
+
+    def close(self) -> None:
+        if self._tar is None:
+            return
+        self._tar.close()
+        os.replace(self._tmp_path, self.directory / self.shard_name)
+        self.finished.append({"shard": self.shard_name, "split": self.split, "samples": self._count,
+                              "bytes": (self.directory / self.shard_name).stat().st_size})
+        self._tar = None
+
+    def abort(self) -> None:
+        """Drop the shard being written; its samples were never indexed"""
+        if self._tar is None:
+            return
+        self._tar.close()
+        self._tmp_path.unlink(missing_ok=True)
+        self._tar = None
+
+class GoldExporter:
+    """Pack silver images and their metadata into WebDataset-style tar shards
+
+    Each sample is <id>.<ext> plus <id>.json in a <split>/<split>-<n>.tar
+    shard. gold/index.jsonl maps every id to its shard and the byte offset
+    of its image inside the tar, so a sample can be read without scanning.
+    gold/manifest.json records the shards and the export parameters.
+
+    Exports are append-only: ids already in the index are skipped and new
+    ones go to new shards, so existing shards never change. Samples are
+    ordered by a seeded hash of their id, which shuffles them
+    deterministically within each export; the split is a seeded hash too.
+    Changing seed or val_fraction needs rebuild=True.
+    """
+    def __init__(self, silver_dir: str, gold_dir: str, metadata_subfolder: str = "metadata",
+                 shard_max_bytes: int = 1 << 30, shard_max_count: int = 10000,
+                 val_fraction: float = 0.1, seed: int = 0):
+        self.silver_dir = Path(silver_dir)
+        self.gold_dir = Path(gold_dir)
+        self.metadata_dir = self.silver_dir / metadata_subfolder
+        self.shard_max_bytes = shard_max_bytes
+        self.shard_max_count = shard_max_count
+        self.val_fraction = val_fraction
+        self.seed = seed
+        self.index_path = self.gold_dir / "index.jsonl"
+        self.manifest_path = self.gold_dir / "manifest.json"
+
+    def _params(self) -> dict:
+        return {"seed": self.seed, "val_fraction": self.val_fraction, "format": "webdataset-tar"}
+
+    def _load_manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {"params": self._params(), "shards": []}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _load_index(self) -> list[dict]:
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _recover_shards(self, manifest: dict, index: list[dict]) -> None:
+        """List shards the index points to but the manifest doesn't (a crash between the two writes)"""
+        listed: set[str] = {shard["shard"] for shard in manifest["shards"]}
+        missing: Dict[str, dict] = {}
+        for entry in index:
+            if entry["shard"] not in listed:
+                shard = missing.setdefault(entry["shard"], {"shard": entry["shard"], "split": entry["split"], "samples": 0})
+                shard["samples"] += 1
+        for shard in missing.values():
+            shard["bytes"] = (self.gold_dir / shard["shard"]).stat().st_size
+            logger.warning(f"Gold shard {shard['shard']} is indexed but was missing from the manifest; adding it")
+            manifest["shards"].append(shard)
+
+    def _next_numbers(self, manifest: dict) -> Dict[str, int]:
+        """First unused shard number per split, from the manifest and the files on disk
+
+        A shard written by an interrupted export may be on disk without being
+        listed; its number is skipped so the file is never overwritten.
+        """
+        next_number: Dict[str, int] = {split: 0 for split in SPLITS}
+        names: list[str] = [shard["shard"] for shard in manifest["shards"]]
+        for split in SPLITS:
+            names.extend(f"{split}/{path.name}" for path in (self.gold_dir / split).glob(f"{split}-*.tar"))
+        for name in names:
+            split: str = name.split("/", 1)[0]
+            next_number[split] = max(next_number[split], int(name[-10:-4]) + 1)
+        return next_number
+
+    def _pending(self, exported: set[str]) -> Iterator[dict]:
+        for record in iter_silver_records(str(self.metadata_dir)):
+            if record["id"] not in exported and (self.silver_dir / record["name"]).exists():
+                yield record
+
+    def _commit(self, manifest: dict, writers: Dict[str, _ShardWriter], entries: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Index the entries of finished shards and list those shards in the manifest"""
+        new_shards: list[dict] = [shard for writer in writers.values() for shard in writer.finished]
+        finished: set[str] = {shard["shard"] for shard in new_shards}
+        entries = [entry for entry in entries if entry["shard"] in finished]
+        # The index is appended only after every shard it points to is in place
+        if entries:
+            with open(self.index_path, 'a') as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        manifest["shards"].extend(new_shards)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        return entries, new_shards
+
+    def export(self, rebuild: bool = False) -> dict:
+        """Append silver images not exported yet; returns counts for the pipeline report"""
+        start: float = time.perf_counter()
+        if rebuild and self.gold_dir.exists():
+            shutil.rmtree(self.gold_dir)
+        manifest: dict = self._load_manifest()
+        if manifest["params"] != self._params():
+            raise ValueError(
+                f"Gold export at {self.gold_dir} was built with {manifest['params']}; "
+                f"rebuild it to use {self._params()}"
+            )
+        index: list[dict] = self._load_index()
+        self._recover_shards(manifest, index)
+        exported: set[str] = {entry["id"] for entry in index}
+        pending: list[dict] = sorted(self._pending(exported), key=lambda record: _sort_key(self.seed, record["id"]))
+
+        next_number: Dict[str, int] = self._next_numbers(manifest)
+        writers: Dict[str, _ShardWriter] = {
+            split: _ShardWriter(self.gold_dir, split, next_number[split], self.shard_max_bytes, self.shard_max_count)
+            for split in SPLITS
+        }
+        self.gold_dir.mkdir(parents=True, exist_ok=True)
+        entries: list[dict] = []
+        try:
+            for record in pending:
+                split: str = assign_split(self.seed, record["id"], self.val_fraction)
+                entries.append(writers[split].write(record, self.silver_dir / record["name"]))
+        except BaseException:
+            # A half-written shard is deleted, not promoted; shards finished before the failure are kept and indexed
+            for writer in writers.values():
+                writer.abort()
+            self._commit(manifest, writers, entries)
+            raise
+        for writer in writers.values():
+            writer.close()
+        entries, new_shards = self._commit(manifest, writers, entries)
+
+        stats = {
+            "gold_dir": str(self.gold_dir),
+            "samples_added": len(entries),
+            "samples_total": len(exported) + len(entries),
+            "samples_added_per_split": {split: sum(1 for entry in entries if entry["split"] == split) for split in SPLITS},
+            "shards_added": len(new_shards),
+            "shards_total": len(manifest["shards"]),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logger.info(f"Gold export: {stats}")
+        return stats
+
+def read_sample(gold_dir: str, entry: dict) -> bytes:
+    """Image bytes of one index.jsonl entry, read straight from its offset in the shard"""
+    with open(Path(gold_dir) / entry["shard"], 'rb') as f:
+        f.seek(entry["offset"])
+        return f.read(entry["size"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the silver layer as WebDataset-style tar shards")
+    parser.add_argument("--silver-dir", default=os.getenv("SILVER_DIR", "./silver"))
+    parser.add_argument("--gold-dir", default=os.getenv("GOLD_DIR", "./gold"))
+    parser.add_argument("--shard-max-mb", type=int, default=1024)
+    parser.add_argument("--shard-max-count", type=int, default=10000)
+    parser.add_argument("--val-fraction", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rebuild", action="store_true", help="delete the existing export and start over")
+    args = parser.parse_args()
+    exporter = GoldExporter(
+        args.silver_dir, args.gold_dir, os.getenv("METADATA_SUBFOLDER", "metadata"),
+        shard_max_bytes=args.shard_max_mb << 20, shard_max_count=args.shard_max_count,
+        val_fraction=args.val_fraction, seed=args.seed,
+    )
+    print(json.dumps(exporter.export(rebuild=args.rebuild), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 from pathlib import Path
-from PIL import Image
 import os
 import warnings
+from utils.scan import ImageScan
 from utils.stout import _suppress_output
 
 def image_info(image_path: Path) -> dict:
     """Extract metadata from image file"""
     try:
+        from PIL import Image
         warnings.filterwarnings('ignore', category=UserWarning, module='PIL')
         with _suppress_output():
             with Image.open(image_path) as img:
@@ -22,4 +23,15 @@ def image_info(image_path: Path) -> dict:
         "width": width,
         "format": image_path.suffix.replace('.', '').upper(),
     }
-    return metadata
\ No newline at end of file
+    return metadata
+
+def image_info_from_scan(image_path: Path, scan: ImageScan) -> dict:
+    """Same fields as image_info, built from a scan record instead of reopening the file"""
+    return {
+        "size_bytes": scan.size_bytes,
+        "source_image_name": image_path.name,
+        "source_image_path": str(image_path.relative_to(os.getenv("BRONZE_DIR", "./bronze"))),
+        "height": scan.height,
+        "width": scan.width,
+        "format": scan.format,
+    }
@@ -0,0 +1,129 @@
+import cProfile
+import os
+import resource
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+def _io_counters() -> tuple[int, int]:
+    """(rchar, wchar) of this process from /proc/self/io; zeros where unavailable"""
+    try:
+        with open("/proc/self/io", 'r') as f:
+            values = dict(line.split(":", 1) for line in f)
+        return int(values["rchar"]), int(values["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def peak_rss_mb() -> float:
+    """Process high-water RSS (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return round(peak * scale / (1 << 20), 1)
+
+class StageTimer:
+    """Measure one stage: wall time, CPU time, bytes read/written and throughput
+
+    CPU time is the calling thread's plus any child processes reaped during
+    the stage (process pools). Byte counters and peak RSS come from the
+    whole process, so with several sources running concurrently they
+    include the other sources' activity.
+    """
+    def __init__(self, name: str, on_exit: Optional[Callable[[str, dict], None]] = None):
+        self.name = name
+        self.items: int = 0
+        self.on_exit = on_exit
+        self.result: dict = {}
+
+    def __enter__(self) -> "StageTimer":
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        self._children = _children_cpu()
+        self._read, self._written = _io_counters()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu + _children_cpu() - self._children
+        read, written = _io_counters()
+        self.result = {
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "bytes_read": read - self._read,
+            "bytes_written": written - self._written,
+            "items": self.items,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if self.on_exit is not None:
+            self.on_exit(self.name, self.result)
+
+def merge_stage(stages: Dict[str, dict], name: str, result: dict) -> None:
+    """Accumulate a stage measurement (stages like silver batches run many times)"""
+    totals = stages.setdefault(name, {
+        "wall_seconds": 0.0, "cpu_seconds": 0.0, "bytes_read": 0, "bytes_written": 0,
+        "items": 0, "calls": 0, "peak_rss_mb": 0.0,
+    })
+    for key in ("wall_seconds", "cpu_seconds", "bytes_read", "bytes_written", "items"):
+        totals[key] += result.get(key, 0)
+    totals["calls"] += 1
+    totals["peak_rss_mb"] = max(totals["peak_rss_mb"], result.get("peak_rss_mb", 0.0))
+    totals["wall_seconds"] = round(totals["wall_seconds"], 4)
+    totals["cpu_seconds"] = round(totals["cpu_seconds"], 4)
+    totals["images_per_second"] = round(totals["items"] / totals["wall_seconds"], 2) if totals["wall_seconds"] else None
+
+class Profiler:
+    """Opt-in per-source profiling, selected with PIPELINE_PROFILE=cprofile|tracemalloc|all
+
+    Results are written under .checkpoints/profiles/ and moved next to the
+    JSON report by PipelineReport.save().
+    """
+    def __init__(self, name: str, mode: Optional[str] = None, output_dir: str = ".checkpoints/profiles"):
+        self.name = name
+        self.mode = (mode if mode is not None else os.getenv("PIPELINE_PROFILE", "")).lower()
+        self.output_dir = Path(output_dir)
+        self._profile: Optional[cProfile.Profile] = None
+        self._started_tracemalloc: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("cprofile", "tracemalloc", "all")
+
+    def start(self) -> None:
+        if self.mode in ("cprofile", "all"):
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler is active (since 3.12, one per process): skip this one
+                self._profile = None
+        if self.mode in ("tracemalloc", "all") and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracemalloc = True
+
+    def stop(self) -> Dict[str, str]:
+        """Stop profiling and return {kind: file path} of what was written"""
+        files: Dict[str, str] = {}
+        if not self.enabled:
+            return files
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self._profile is not None:
+            self._profile.disable()
+            path = self.output_dir / f"{self.name}.prof"
+            self._profile.dump_stats(str(path))
+            files["cprofile"] = str(path)
+        if tracemalloc.is_tracing() and self.mode in ("tracemalloc", "all"):
+            snapshot = tracemalloc.take_snapshot()
+            path = self.output_dir / f"{self.name}.tracemalloc.txt"
+            current, peak = tracemalloc.get_traced_memory()
+            with open(path, 'w') as f:
+                f.write(f"current={current} peak={peak}\n")
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+            files["tracemalloc"] = str(path)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        return files
@@ -0,0 +1,99 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+IMAGE_EXTENSIONS: frozenset = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff'})
+
+@dataclass
+class InventoryEntry:
+    path: Path
+    # DirEntry.stat() result; None when the listing came from the inventory manifest
+    stat: Optional[os.stat_result] = None
+
+def _matches(name: str, extensions: Optional[frozenset]) -> bool:
+    return extensions is None or os.path.splitext(name)[1].lower() in extensions
+
+def _list_directory(directory: str, extensions: Optional[frozenset]) -> tuple[List[str], List[InventoryEntry]]:
+    """One os.scandir() call: subdirectories and matching files (with their cached stat)"""
+    subdirs: List[str] = []
+    files: List[InventoryEntry] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file() and _matches(entry.name, extensions):
+                files.append(InventoryEntry(Path(entry.path), entry.stat()))
+    return subdirs, files
+
+def walk_files(root: Path, extensions: Optional[Iterable[str]] = None) -> List[InventoryEntry]:
+    """Single-pass recursive listing; extensions are matched case-insensitively"""
+    extensions = frozenset(ext.lower() for ext in extensions) if extensions is not None else None
+    found: List[InventoryEntry] = []
+    stack: List[str] = [str(root)]
+    while stack:
+        subdirs, files = _list_directory(stack.pop(), extensions)
+        found.extend(files)
+        stack.extend(subdirs)
+    found.sort(key=lambda entry: str(entry.path))
+    return found
+
+class Inventory:
+    """Incremental version of walk_files backed by a JSON manifest
+
+    The manifest keeps each directory's mtime_ns with its subdirectories and
+    matching file names. Directories whose mtime is unchanged are not listed
+    again. A directory's mtime only moves when entries are added, removed or
+    renamed, so entries reused from the manifest carry no stat: callers that
+    need size/mtime (e.g. the fingerprint index) stat those files themselves.
+    """
+    def __init__(self, root: Path, manifest_path: Path, extensions: Optional[Iterable[str]] = IMAGE_EXTENSIONS):
+        self.root = Path(root)
+        self.manifest_path = Path(manifest_path)
+        self.extensions = frozenset(ext.lower() for ext in extensions) if extensions is not None else None
+        self.rescanned_dirs: int = 0
+        self.reused_dirs: int = 0
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("extensions") != sorted(self.extensions or []):
+            return {}
+        return manifest.get("directories", {})
+
+    def _save_manifest(self, directories: Dict[str, dict]) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"extensions": sorted(self.extensions or []), "directories": directories}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def scan(self) -> List[InventoryEntry]:
+        previous: Dict[str, dict] = self._load_manifest()
+        current: Dict[str, dict] = {}
+        found: List[InventoryEntry] = []
+        stack: List[str] = [str(self.root)]
+        while stack:
+            directory = stack.pop()
+            mtime_ns: int = os.stat(directory).st_mtime_ns
+            cached: Optional[dict] = previous.get(directory)
+            if cached is not None and cached["mtime_ns"] == mtime_ns:
+                subdirs = cached["subdirs"]
+                files = [InventoryEntry(Path(directory) / name) for name in cached["files"]]
+                self.reused_dirs += 1
+            else:
+                subdirs, files = _list_directory(directory, self.extensions)
+                self.rescanned_dirs += 1
+            current[directory] = {
+                "mtime_ns": mtime_ns,
+                "subdirs": subdirs,
+                "files": [entry.path.name for entry in files],
+            }
+            found.extend(files)
+            stack.extend(subdirs)
+        self._save_manifest(current)
+        found.sort(key=lambda entry: str(entry.path))
+        return found
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+@dataclass
+class JournalEntry:
+    verdict: bool
+    silver_id: str = None
+    committed: bool = False
+
+class ProgressJournal:
+    """Per-image progress of the silver stage, so a crashed run resumes where it stopped
+
+    Backed by SQLite in WAL mode with synchronous=FULL, committing (and so
+    fsyncing) once every `batch_size` records rather than per image.
+    Verdicts only hold for the config that made them, so the journal is
+    bound to a fingerprint of it and starts over when that changes.
+    """
+    def __init__(self, source_id: str, checkpoint_dir: str = ".checkpoints", batch_size: int = 500):
+        Path(checkpoint_dir).mkdir(exist_ok=True)
+        self.db_path = Path(checkpoint_dir) / f"{source_id}.journal.sqlite"
+        self.batch_size = batch_size
+        self._pending: int = 0
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "path TEXT PRIMARY KEY, verdict INTEGER NOT NULL, silver_id TEXT, committed INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        return self._conn
+
+    def bind(self, fingerprint: str) -> bool:
+        """Tie the journal to a filter/output config; returns True if progress from another config was dropped"""
+        dropped: bool = False
+        if self.db_path.exists():
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is not None and row[0] == fingerprint:
+                return False
+            dropped = self.conn.execute("SELECT 1 FROM images LIMIT 1").fetchone() is not None
+            self.reset()
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        self.conn.commit()
+        return dropped
+
+    def load(self) -> Dict[str, JournalEntry]:
+        if not self.db_path.exists():
+            return {}
+        rows = self.conn.execute("SELECT path, verdict, silver_id, committed FROM images").fetchall()
+        return {
+            path: JournalEntry(verdict=bool(verdict), silver_id=silver_id, committed=bool(committed))
+            for path, verdict, silver_id, committed in rows
+        }
+
+    def record_verdicts(self, paths: Iterable[str], verdict: bool) -> None:
+        """Store a filter-chain verdict; never downgrades an image that is already committed"""
+        rows = [(path, int(verdict)) for path in paths]
+        self.conn.executemany(
+            "INSERT INTO images (path, verdict) VALUES (?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET verdict = excluded.verdict WHERE committed = 0",
+            rows,
+        )
+        self._written(len(rows))
+
+    def record_commits(self, commits: Iterable[Tuple[str, str]]) -> None:
+        """Mark (path, silver_id) pairs whose metadata and image are in silver"""
+        rows = list(commits)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO images (path, verdict, silver_id, committed) VALUES (?, 1, ?, 1)",
+            rows,
+        )
+        self._written(len(rows))
+
+    def _written(self, count: int) -> None:
+        self._pending += count
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+        self._pending = 0
+
+    def reset(self) -> None:
+        """Forget all progress (e.g. bronze was downloaded again)"""
+        self.compact()
+
+    def compact(self) -> None:
+        """Drop the journal once the run is confirmed successful; silver itself is the record now"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._pending = 0
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.db_path}{suffix}")
+            if path.exists():
+                os.remove(path)
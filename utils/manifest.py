@@ -0,0 +1,269 @@
+import argparse
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("pipeline.manifest")
+
+def _pyarrow() -> Optional[tuple]:
+    """(pyarrow, pyarrow.parquet) imported on first Parquet use, or None when not installed"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    return pa, pq
+
+MANIFEST_FORMATS: tuple = ("jsonl", "parquet")
+
+class SilverManifestWriter:
+    """Append silver metadata records to sharded JSON Lines or Parquet files
+
+    Each source writes its own shards (<source_id>-<n>.jsonl|parquet) plus
+    an append-only <source_id>.index.jsonl mapping every image id to its
+    shard and offset (byte offset for JSON Lines, row number for Parquet).
+    Ids already in the index are skipped, so re-runs don't duplicate rows.
+    A row only counts once its index entry is written: rows a crash left
+    in a shard without one are cut off when the writer opens, and readers
+    skip them.
+    """
+    def __init__(self, manifest_dir: str, source_id: str, shard_size: int = 10000, format: str = "jsonl"):
+        if format not in MANIFEST_FORMATS:
+            raise ValueError(f"Unknown manifest format: {format}")
+        if format == "parquet" and _pyarrow() is None:
+            logger.warning("pyarrow is not installed; writing the silver manifest as JSON Lines")
+            format = "jsonl"
+        self.manifest_dir = Path(manifest_dir)
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        self.source_id = source_id
+        self.shard_size = shard_size
+        self.format = format
+        self.index_path = self.manifest_dir / f"{source_id}.index.jsonl"
+        self._known_ids: set[str] = set()
+        self._shard_rows: Dict[str, int] = {}
+        # End of the last indexed row per JSON Lines shard
+        self._shard_end: Dict[str, int] = {}
+        self._load_index()
+        self._drop_unindexed_rows()
+        self._shard_number: int = self._last_shard_number()
+        self._buffer: List[dict] = []
+
+    def _load_index(self) -> None:
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, 'r') as f:
+            for line in f:
+                entry = json.loads(line)
+                self._known_ids.add(entry["id"])
+                self._shard_rows[entry["shard"]] = self._shard_rows.get(entry["shard"], 0) + 1
+                self._shard_end[entry["shard"]] = max(self._shard_end.get(entry["shard"], 0), entry["offset"] + entry["length"])
+
+    def _drop_unindexed_rows(self) -> None:
+        """Cut rows written after the last index append (a crash between the two) out of this source's shards"""
+        pattern = re.compile(rf"{re.escape(self.source_id)}-\d+\.{self.format}")
+        for path in self.manifest_dir.iterdir():
+            if not pattern.fullmatch(path.name):
+                continue
+            if self.format == "parquet" or path.name not in self._shard_end:
+                if path.name not in self._shard_rows:
+                    logger.warning(f"Removing manifest shard {path.name}: none of its rows were indexed")
+                    path.unlink()
+            elif path.stat().st_size > self._shard_end[path.name]:
+                logger.warning(f"Truncating unindexed rows at the end of manifest shard {path.name}")
+                os.truncate(path, self._shard_end[path.name])
+
+    def _shard_name(self, number: int) -> str:
+        return f"{self.source_id}-{number:05d}.{self.format}"
+
+    def _last_shard_number(self) -> int:
+        numbers = [
+            int(shard.rsplit("-", 1)[1].split(".")[0])
+            for shard in self._shard_rows if shard.endswith(f".{self.format}")
+        ]
+        return max(numbers, default=0)
+
+    def _current_jsonl_shard(self) -> str:
+        shard = self._shard_name(self._shard_number)
+        if self._shard_rows.get(shard, 0) >= self.shard_size:
+            self._shard_number += 1
+            shard = self._shard_name(self._shard_number)
+        return shard
+
+    def write(self, records: List[dict]) -> int:
+        """Append records (SilverMetadata.model_dump() dicts); returns how many were new"""
+        new_records = [record for record in records if record["id"] not in self._known_ids]
+        self._known_ids.update(record["id"] for record in new_records)
+        if self.format == "jsonl":
+            self._write_jsonl(new_records)
+        else:
+            self._buffer.extend(new_records)
+            while len(self._buffer) >= self.shard_size:
+                self._flush_parquet(self._buffer[:self.shard_size])
+                self._buffer = self._buffer[self.shard_size:]
+        return len(new_records)
+
+    def _write_jsonl(self, records: List[dict]) -> None:
+        index_lines: List[str] = []
+        position = 0
+        while position < len(records):
+            shard = self._current_jsonl_shard()
+            room = self.shard_size - self._shard_rows.get(shard, 0)
+            chunk = records[position:position + room]
+            with open(self.manifest_dir / shard, 'ab') as f:
+                for record in chunk:
+                    line = (json.dumps(record, default=str) + "\n").encode()
+                    offset = f.tell()
+                    f.write(line)
+                    index_lines.append(json.dumps({"id": record["id"], "shard": shard, "offset": offset, "length": len(line)}))
+            self._shard_rows[shard] = self._shard_rows.get(shard, 0) + len(chunk)
+            position += len(chunk)
+        self._append_index(index_lines)
+
+    def _flush_parquet(self, records: List[dict]) -> None:
+        if not records:
+            return
+        self._shard_number += 1
+        shard = self._shard_name(self._shard_number)
+        rows = [{**record, "filters_params": json.dumps(record.get("filters_params", {}))} for record in records]
+        pa, pq = _pyarrow()
+        pq.write_table(pa.Table.from_pylist(rows), self.manifest_dir / shard)
+        self._shard_rows[shard] = len(records)
+        self._append_index([
+            json.dumps({"id": record["id"], "shard": shard, "offset": row, "length": 1})
+            for row, record in enumerate(records)
+        ])
+
+    def _append_index(self, index_lines: List[str]) -> None:
+        if not index_lines:
+            return
+        with open(self.index_path, 'a') as f:
+            f.write("\n".join(index_lines) + "\n")
+
+    def buffered_ids(self) -> set[str]:
+        """Ids accepted by write() but not on disk yet (Parquet rows wait for a full shard)"""
+        return {record["id"] for record in self._buffer}
+
+    def close(self) -> None:
+        if self.format == "parquet":
+            self._flush_parquet(self._buffer)
+            self._buffer = []
+
+class SilverManifest:
+    """Read side of the manifest: id lookups, full iteration and the legacy export"""
+    def __init__(self, manifest_dir: str):
+        self.manifest_dir = Path(manifest_dir)
+        self._index: Optional[Dict[str, Tuple[str, int, int]]] = None
+
+    @property
+    def index(self) -> Dict[str, Tuple[str, int, int]]:
+        if self._index is None:
+            self._index = {}
+            for index_path in sorted(self.manifest_dir.glob("*.index.jsonl")):
+                with open(index_path, 'r') as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        self._index[entry["id"]] = (entry["shard"], entry["offset"], entry["length"])
+        return self._index
+
+    def get(self, image_id: str) -> Optional[dict]:
+        location = self.index.get(image_id)
+        if location is None:
+            return None
+        shard, offset, length = location
+        if shard.endswith(".parquet"):
+            return self._parquet_row(shard, offset)
+        with open(self.manifest_dir / shard, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def _parquet_row(self, shard: str, row: int) -> dict:
+        _, pq = _pyarrow()
+        table = pq.read_table(self.manifest_dir / shard)
+        return self._from_parquet(table.slice(row, 1).to_pylist()[0])
+
+    def _from_parquet(self, record: dict) -> dict:
+        return {**record, "filters_params": json.loads(record["filters_params"])}
+
+    def __iter__(self) -> Iterator[dict]:
+        """Every indexed record; rows without an index entry (left by a crash) are skipped"""
+        index = self.index
+        for shard in sorted(self.manifest_dir.glob("*.jsonl")):
+            if shard.name.endswith(".index.jsonl"):
+                continue
+            with open(shard, 'rb') as f:
+                offset = 0
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # a line cut short by a crash; never indexed
+                    if index.get(record["id"], (None, None))[:2] == (shard.name, offset):
+                        yield record
+                    offset += len(line)
+        for shard in sorted(self.manifest_dir.glob("*.parquet")):
+            _, pq = _pyarrow()
+            for row, record in enumerate(pq.read_table(shard).to_pylist()):
+                if index.get(record["id"], (None, None))[:2] == (shard.name, row):
+                    yield self._from_parquet(record)
+
+    def export_legacy(self, output_dir: str) -> int:
+        """Write the old one-file-per-image layout (<id>.json, indent=4) for existing consumers"""
+        os.makedirs(output_dir, exist_ok=True)
+        count = 0
+        for record in self:
+            with open(os.path.join(output_dir, f"{record['id']}.json"), 'w') as f:
+                json.dump(record, f, indent=4)
+            count += 1
+        return count
+
+def iter_silver_records(metadata_dir: str) -> Iterator[dict]:
+    """Every silver record, whichever layout wrote it: per-image <id>.json files and/or the manifest
+
+    An id present in both is yielded once (the per-image file wins).
+    """
+    seen: set[str] = set()
+    metadata_path = Path(metadata_dir)
+    if metadata_path.exists():
+        with os.scandir(metadata_path) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_file() and entry.name.endswith(".json"))
+        for name in names:
+            with open(metadata_path / name, 'r') as f:
+                record = json.load(f)
+            seen.add(record["id"])
+            yield record
+    manifest_dir = metadata_path / "manifest"
+    if manifest_dir.exists():
+        for record in SilverManifest(str(manifest_dir)):
+            if record["id"] not in seen:
+                seen.add(record["id"])
+                yield record
+
+def default_manifest_dir() -> str:
+    silver_dir: str = os.getenv("SILVER_DIR", "./silver")
+    metadata_subfolder: str = os.getenv("METADATA_SUBFOLDER", "metadata")
+    return os.path.join(silver_dir, metadata_subfolder, "manifest")
+
+def main():
+    parser = argparse.ArgumentParser(description="Silver metadata manifest tools")
+    parser.add_argument("--manifest-dir", default=default_manifest_dir())
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export-legacy", help="write one <id>.json per image")
+    export.add_argument("output_dir")
+    show = subparsers.add_parser("get", help="print the record of one image id")
+    show.add_argument("image_id")
+    args = parser.parse_args()
+
+    manifest = SilverManifest(args.manifest_dir)
+    if args.command == "export-legacy":
+        print(f"Exported {manifest.export_legacy(args.output_dir)} records to {args.output_dir}")
+    else:
+        record = manifest.get(args.image_id)
+        if record is None:
+            raise SystemExit(f"{args.image_id} not found")
+        print(json.dumps(record, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from utils.perceptual_hash import hamming_distances
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+class NearDuplicateIndex:
+    """Persistent multi-index hash (MIH) over 64-bit perceptual hashes
+
+    Each hash is split into `segments` substrings that are indexed
+    separately. Two hashes within distance r differ by at most r // segments
+    bits in at least one substring (pigeonhole), so a query only enumerates
+    that many bit flips per substring and checks exact distances on the
+    candidates it finds. Buckets are B-tree indexed in SQLite, which keeps
+    lookups fast well past millions of hashes and lets dedup work across
+    sources and runs.
+    """
+    def __init__(self, db_path: str, segments: int = 4, commit_every: int = 1000):
+        if 64 % segments:
+            raise ValueError("segments must divide 64")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.segments = segments
+        self.segment_bits = 64 // segments
+        self.commit_every = commit_every
+        self._pending: int = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS hashes (
+                id INTEGER PRIMARY KEY,
+                content_id TEXT UNIQUE NOT NULL,
+                hash INTEGER NOT NULL,
+                source_id TEXT,
+                path TEXT
+            );
+            CREATE TABLE IF NOT EXISTS buckets_{segments} (
+                segment INTEGER NOT NULL,
+                key INTEGER NOT NULL,
+                hash_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_buckets_{segments} ON buckets_{segments} (segment, key);
+        """)
+        self._backfill_buckets()
+
+    def _backfill_buckets(self) -> None:
+        """Index hashes added while a different segment count was configured"""
+        rows = self._conn.execute(
+            f"SELECT id, hash FROM hashes WHERE id NOT IN (SELECT DISTINCT hash_id FROM buckets_{self.segments})"
+        ).fetchall()
+        for hash_id, value in rows:
+            self._conn.executemany(
+                f"INSERT INTO buckets_{self.segments} (segment, key, hash_id) VALUES (?, ?, ?)",
+                [(segment, key, hash_id) for segment, key in enumerate(self._segment_keys(_to_unsigned(value)))],
+            )
+        self._conn.commit()
+
+    _shared: Dict[Tuple[str, int], "NearDuplicateIndex"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, db_path: str, segments: int = 4) -> "NearDuplicateIndex":
+        """Process-wide instance, so concurrent sources see each other's hashes"""
+        key = (os.path.abspath(db_path), segments)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(db_path, segments)
+            return cls._shared[key]
+
+    def _segment_keys(self, value: int) -> List[int]:
+        mask = (1 << self.segment_bits) - 1
+        return [(value >> (self.segment_bits * segment)) & mask for segment in range(self.segments)]
+
+    def _neighbours(self, key: int, radius: int) -> List[int]:
+        keys = [key]
+        for flips in range(1, radius + 1):
+            for bits in combinations(range(self.segment_bits), flips):
+                flipped = key
+                for bit in bits:
+                    flipped ^= 1 << bit
+                keys.append(flipped)
+        return keys
+
+    def query(self, value: int, max_distance: int) -> Optional[Tuple[str, str, int]]:
+        """Closest indexed (content_id, path, distance) within max_distance, if any"""
+        radius = max_distance // self.segments
+        candidate_ids: set = set()
+        with self._lock:
+            for segment, key in enumerate(self._segment_keys(value)):
+                keys = self._neighbours(key, radius)
+                placeholders = ", ".join("?" * len(keys))
+                rows = self._conn.execute(
+                    f"SELECT hash_id FROM buckets_{self.segments} WHERE segment = ? AND key IN ({placeholders})",
+                    (segment, *keys),
+                ).fetchall()
+                candidate_ids.update(row[0] for row in rows)
+            if not candidate_ids:
+                return None
+            placeholders = ", ".join("?" * len(candidate_ids))
+            rows = self._conn.execute(
+                f"SELECT content_id, path, hash FROM hashes WHERE id IN ({placeholders})", tuple(candidate_ids)
+            ).fetchall()
+        hashes = np.array([_to_unsigned(row[2]) for row in rows], dtype=np.uint64)
+        distances = hamming_distances(value, hashes)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return rows[best][0], rows[best][1], int(distances[best])
+
+    def add(self, content_id: str, value: int, source_id: str, path: str) -> None:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO hashes (content_id, hash, source_id, path) VALUES (?, ?, ?, ?)",
+                (content_id, _to_signed(value), source_id, path),
+            )
+            if cursor.rowcount == 0:
+                return
+            self._conn.executemany(
+                f"INSERT INTO buckets_{self.segments} (segment, key, hash_id) VALUES (?, ?, ?)",
+                [(segment, key, cursor.lastrowid) for segment, key in enumerate(self._segment_keys(value))],
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
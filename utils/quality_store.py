@@ -0,0 +1,298 @@
+import argparse
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+logger = logging.getLogger("pipeline.quality_store")
+
+THRESHOLD_KEYS: tuple = ("min_height", "min_width", "min_contrast", "min_laplacian_sharpness")
+# Rejection reasons in cascade order; code 0 means the image passes
+REASONS: tuple = ("passed", "corrupted", "size", "contrast", "sharpness")
+METRICS: tuple = ("height", "width", "contrast", "laplacian_variance")
+# Segment files written by save() before they are folded back into the main .npz
+COMPACT_AFTER_SEGMENTS: int = 16
+
+def default_store_path() -> str:
+    return os.getenv("QUALITY_METRICS_PATH", ".checkpoints/quality_metrics.npz")
+
+class QualityMetricStore:
+    """Raw ExcludeLowQuality measurements, one row per content hash, in a compressed .npz
+
+    Columns: sha256, source (code into a small table of source ids),
+    height/width (-1 when unknown), contrast/laplacian_variance (NaN when
+    not measured) and corrupted. With every metric stored, any threshold
+    set can be evaluated as a NumPy mask over the columns instead of
+    decoding the images again. A hash seen again replaces its row.
+
+    save() only writes the rows queued since the last save, as a small
+    uncompressed segment in <path>.segments/; loading applies the segments
+    in order on top of the main file. Every COMPACT_AFTER_SEGMENTS saves
+    the main file is rewritten with all rows and the segments are removed,
+    so saving after every batch doesn't rewrite the whole store each time.
+    """
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, tuple] = {}
+        self._load()
+
+    _shared: Dict[str, "QualityMetricStore"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path: str) -> "QualityMetricStore":
+        """Process-wide instance for path, so concurrent sources don't overwrite each other's rows"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(path)
+            return cls._shared[key]
+
+    def _load(self) -> None:
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as data:
+                self.sha256: np.ndarray = data["sha256"]
+                self.sources: List[str] = [str(source) for source in data["sources"]]
+                self.source_code: np.ndarray = data["source_code"]
+                self.height: np.ndarray = data["height"]
+                self.width: np.ndarray = data["width"]
+                self.contrast: np.ndarray = data["contrast"]
+                self.laplacian_variance: np.ndarray = data["laplacian_variance"]
+                self.corrupted: np.ndarray = data["corrupted"]
+        else:
+            self.sha256 = np.empty(0, dtype="S64")
+            self.sources = []
+            self.source_code = np.empty(0, dtype=np.int32)
+            self.height = np.empty(0, dtype=np.int32)
+            self.width = np.empty(0, dtype=np.int32)
+            self.contrast = np.empty(0, dtype=np.float64)
+            self.laplacian_variance = np.empty(0, dtype=np.float64)
+            self.corrupted = np.empty(0, dtype=bool)
+        self._rows: Dict[bytes, int] = {sha: row for row, sha in enumerate(self.sha256.tolist())}
+        for segment in self._segments():
+            with np.load(segment, allow_pickle=False) as data:
+                self._merge({
+                    sha.decode(): row for sha, *row in zip(
+                        data["sha256"].tolist(), data["source"].tolist(), *(data[name].tolist() for name in (*METRICS, "corrupted"))
+                    )
+                })
+
+    def _segment_dir(self) -> Path:
+        return self.path.with_name(self.path.name + ".segments")
+
+    def _segments(self) -> List[Path]:
+        """Segment files in the order they were written"""
+        if not self._segment_dir().is_dir():
+            return []
+        return sorted(self._segment_dir().glob("*.npz"), key=lambda segment: int(segment.stem))
+
+    def __len__(self) -> int:
+        return len(self.sha256)
+
+    def add(self, sha256: str, source_id: str, height: Optional[int], width: Optional[int],
+            contrast: Optional[float], laplacian_variance: Optional[float], corrupted: bool) -> None:
+        """Queue one measurement; it is visible to lookups after save()"""
+        with self._lock:
+            self._pending[sha256] = (source_id, height, width, contrast, laplacian_variance, corrupted)
+
+    def lookup(self, sha256: str) -> Optional[int]:
+        """Row of a hash saved by an earlier save(), or None"""
+        return self._rows.get(sha256.encode())
+
+    def _merge(self, pending: Dict[str, tuple]) -> tuple[int, int]:
+        """Fold measurements into the in-memory columns; returns (appended, replaced) row counts"""
+        columns = {name: getattr(self, name) for name in ("sha256", "source_code", *METRICS, "corrupted")}
+        codes: Dict[str, int] = {source: code for code, source in enumerate(self.sources)}
+        replaced: int = 0
+        appended: List[tuple] = []
+        for sha, (source_id, height, width, contrast, laplacian, corrupted) in pending.items():
+            code = codes.setdefault(source_id, len(codes))
+            row = (
+                code, -1 if height is None else height, -1 if width is None else width,
+                np.nan if contrast is None else contrast, np.nan if laplacian is None else laplacian, corrupted,
+            )
+            existing = self._rows.get(sha.encode())
+            if existing is None:
+                appended.append((sha, *row))
+            else:
+                replaced += 1
+                for name, value in zip(("source_code", *METRICS, "corrupted"), row):
+                    columns[name][existing] = value
+        if appended:
+            new = list(zip(*appended))
+            for name, values in zip(("sha256", "source_code", *METRICS, "corrupted"), new):
+                columns[name] = np.concatenate([columns[name], np.asarray(values, dtype=columns[name].dtype)])
+        self.sources = list(codes)
+        for name, values in columns.items():
+            setattr(self, name, values)
+        if appended:
+            first: int = len(self.sha256) - len(appended)
+            self._rows.update((row[0].encode(), first + offset) for offset, row in enumerate(appended))
+        return len(appended), replaced
+
+    def _write(self, path: Path, compressed: bool, **columns: np.ndarray) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            (np.savez_compressed if compressed else np.savez)(f, **columns)
+        os.replace(tmp_path, path)
+
+    def save(self) -> int:
+        """Merge queued measurements into the columns and append them to the store as one segment"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            appended, replaced = self._merge(pending)
+            segments: List[Path] = self._segments()
+            number: int = int(segments[-1].stem) + 1 if segments else 0
+            rows = list(pending.values())
+            self._write(
+                self._segment_dir() / f"{number:06d}.npz", compressed=False,
+                sha256=np.asarray(list(pending), dtype="S64"),
+                source=np.asarray([row[0] for row in rows], dtype=str),
+                height=np.asarray([-1 if row[1] is None else row[1] for row in rows], dtype=np.int32),
+                width=np.asarray([-1 if row[2] is None else row[2] for row in rows], dtype=np.int32),
+                contrast=np.asarray([np.nan if row[3] is None else row[3] for row in rows], dtype=np.float64),
+                laplacian_variance=np.asarray([np.nan if row[4] is None else row[4] for row in rows], dtype=np.float64),
+                corrupted=np.asarray([row[5] for row in rows], dtype=bool),
+            )
+            if len(segments) + 1 >= COMPACT_AFTER_SEGMENTS:
+                self._compact()
+        logger.debug(f"Saved {appended} new and {replaced} updated quality rows to {self.path}")
+        return len(pending)
+
+    def _compact(self) -> None:
+        """Rewrite the main file with every row, then drop the segments it now holds"""
+        segments: List[Path] = self._segments()
+        self._write(
+            self.path, compressed=True, sources=np.asarray(self.sources, dtype=str),
+            **{name: getattr(self, name) for name in ("sha256", "source_code", *METRICS, "corrupted")},
+        )
+        for segment in segments:
+            segment.unlink()
+
+    def compact(self) -> None:
+        """Fold all segments into the main .npz now"""
+        with self._lock:
+            if self._segments():
+                self._compact()
+
+    def reasons(self, thresholds: dict, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rejection code per row (index into REASONS), same order of checks as ExcludeLowQuality"""
+        select = slice(None) if rows is None else rows
+        height, width = self.height[select], self.width[select]
+        # NaN compares False, so an unmeasured metric fails its check like it does in the filter
+        with np.errstate(invalid="ignore"):
+            checks = (
+                self.corrupted[select],
+                (height < thresholds.get("min_height", 0)) | (width < thresholds.get("min_width", 0)),
+                ~(self.contrast[select] >= thresholds.get("min_contrast", 0)),
+                ~(self.laplacian_variance[select] >= thresholds.get("min_laplacian_sharpness", 0)),
+            )
+        codes = np.zeros(len(height), dtype=np.int8)
+        # Later checks only apply where every earlier one passed, so assign from last to first
+        for code, failed in reversed(list(enumerate(checks, start=1))):
+            codes[failed] = code
+        return codes
+
+    def evaluate(self, thresholds: dict) -> dict:
+        """Pass and rejection counts overall and per source for one threshold set"""
+        codes = self.reasons(thresholds)
+
+        def counts(selected: np.ndarray) -> dict:
+            per_reason = np.bincount(selected, minlength=len(REASONS))
+            return {"total": int(len(selected)), **{reason: int(count) for reason, count in zip(REASONS, per_reason)}}
+
+        return {
+            "thresholds": {key: thresholds.get(key, 0) for key in THRESHOLD_KEYS},
+            **counts(codes),
+            "per_source": {source: counts(codes[self.source_code == code]) for code, source in enumerate(self.sources)},
+        }
+
+    def histograms(self, bins: int = 20, source_id: Optional[str] = None) -> dict:
+        """Histogram of each metric over the measured rows; Laplacian variance on log-spaced bins"""
+        select = np.ones(len(self), dtype=bool) if source_id is None else self.source_code == self.sources.index(source_id)
+        select &= ~self.corrupted
+        result: dict = {}
+        for metric in METRICS:
+            values = getattr(self, metric)[select].astype(np.float64)
+            values = values[np.isfinite(values) & (values >= 0)]
+            if len(values) == 0:
+                result[metric] = {"count": 0}
+                continue
+            positive = values[values > 0]
+            if metric == "laplacian_variance" and len(positive) and positive.max() > positive.min():
+                # Sharpness spans orders of magnitude; linear bins would put nearly everything in the first one
+                edges = np.concatenate([[0.0], np.geomspace(positive.min(), positive.max(), bins)])
+            else:
+                edges = np.histogram_bin_edges(values, bins=bins)
+            counts, edges = np.histogram(values, bins=edges)
+            result[metric] = {
+                "count": int(len(values)),
+                "percentiles": {f"p{p}": round(float(v), 3) for p, v in zip((5, 25, 50, 75, 95), np.percentile(values, (5, 25, 50, 75, 95)))},
+                "edges": [round(float(edge), 3) for edge in edges],
+                "counts": counts.tolist(),
+            }
+        return result
+
+    def what_if(self, candidates: Iterable[dict], bins: int = 20) -> dict:
+        """Report for candidate threshold sets: pass counts per source plus metric histograms"""
+        return {
+            "store": str(self.path),
+            "images": len(self),
+            "sources": list(self.sources),
+            "candidates": [self.evaluate(thresholds) for thresholds in candidates],
+            "histograms": {
+                "all": self.histograms(bins),
+                **{source: self.histograms(bins, source) for source in self.sources},
+            },
+        }
+
+def _parse_candidate(text: str) -> dict:
+    """"min_contrast=20,min_laplacian_sharpness=40" -> dict; thresholds not given are 0"""
+    thresholds: dict = {}
+    for part in filter(None, text.split(",")):
+        key, _, value = part.partition("=")
+        if key not in THRESHOLD_KEYS:
+            raise argparse.ArgumentTypeError(f"Unknown threshold {key!r}; expected one of {', '.join(THRESHOLD_KEYS)}")
+        thresholds[key] = float(value)
+    return thresholds
+
+def _print_summary(report: dict) -> None:
+    print(f"{report['images']} images in {report['store']}")
+    for candidate in report["candidates"]:
+        thresholds = ", ".join(f"{key}={value:g}" for key, value in candidate["thresholds"].items())
+        print(f"\n{thresholds}: {candidate['passed']}/{candidate['total']} pass "
+              f"(corrupted {candidate['corrupted']}, size {candidate['size']}, "
+              f"contrast {candidate['contrast']}, sharpness {candidate['sharpness']})")
+        for source, counts in candidate["per_source"].items():
+            print(f"  {source:<40} {counts['passed']:>8}/{counts['total']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate ExcludeLowQuality thresholds against stored metrics")
+    parser.add_argument("--store", default=default_store_path())
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    what_if = subparsers.add_parser("what-if", help="pass counts and histograms for candidate thresholds")
+    what_if.add_argument("--candidate", type=_parse_candidate, action="append", required=True,
+                         help="e.g. min_height=256,min_width=256,min_contrast=20,min_laplacian_sharpness=40; repeatable")
+    what_if.add_argument("--bins", type=int, default=20)
+    what_if.add_argument("--output", help="write the full JSON report (with histograms) here")
+    args = parser.parse_args()
+
+    store = QualityMetricStore(args.store)
+    if not len(store):
+        raise SystemExit(f"No quality metrics at {args.store}; run ExcludeLowQuality with record_metrics: true first")
+    report: dict = store.what_if(args.candidate, args.bins)
+    _print_summary(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from models.config import Remote
+from utils.inventory import IMAGE_EXTENSIONS
+
+logger = logging.getLogger("pipeline.remote_sync")
+
+# Silver images are named <sha256>.<ext>; anything else in silver/ is not content-addressed
+_CONTENT_NAME = re.compile(r"^[0-9a-f]{64}\.[A-Za-z0-9]+$")
+
+def _s3_client(remote: Remote, max_connections: int) -> Any:
+    """boto3 S3 client for the remote; boto3 is only needed when syncing"""
+    try:
+        import boto3
+        from botocore.config import Config as BotoConfig
+    except ImportError as e:
+        raise RuntimeError("Remote sync needs boto3 (pip install boto3)") from e
+    session = boto3.session.Session(profile_name=remote.profile) if remote.profile else boto3.session.Session()
+    return session.client(
+        "s3",
+        endpoint_url=remote.endpoint_url,
+        config=BotoConfig(max_pool_connections=max_connections, retries={"max_attempts": 5, "mode": "adaptive"}),
+    )
+
+class RemoteManifest:
+    """Local SQLite record of the keys known to exist on one remote bucket/prefix
+
+    Lets a sync decide what to upload without listing the bucket. It only
+    grows from our own uploads, so refresh() re-lists the remote when it may
+    have been changed from elsewhere.
+    """
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                key TEXT PRIMARY KEY,
+                size INTEGER,
+                recorded_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def keys(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT key FROM objects")}
+
+    def add(self, entries: List[Tuple[str, int]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO objects (key, size, recorded_at) VALUES (?, ?, ?)",
+                [(key, size, now) for key, size in entries],
+            )
+            self._conn.commit()
+
+    def replace_all(self, entries: List[Tuple[str, int]]) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM objects")
+        self.add(entries)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class RemoteSync:
+    """Upload silver images the S3-compatible remote doesn't have yet
+
+    Objects are keyed <path>/<sha256>.<ext>, the silver file name, so an
+    object that exists remotely never needs to be compared or re-sent. Files
+    are uploaded in parallel on a bounded pool sharing one client, and
+    boto3's transfer manager splits large ones into multipart uploads.
+    """
+    def __init__(self, remote: Remote, silver_dir: str, manifest_path: Optional[str] = None,
+                 workers: int = 8, multipart_threshold: int = 8 << 20, multipart_chunksize: int = 8 << 20,
+                 client: Any = None):
+        self.remote = remote
+        self.silver_dir = Path(silver_dir)
+        self.prefix = (remote.path or "").strip("/")
+        self.workers = max(1, workers)
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        # Each file upload may use a few connections for its parts
+        self._parts_per_file = 4
+        self.client = client if client is not None else _s3_client(remote, self.workers * self._parts_per_file)
+        if manifest_path is None:
+            safe_prefix = re.sub(r"[^A-Za-z0-9_.-]", "_", self.prefix) or "root"
+            manifest_path = f".checkpoints/remote/{remote.bucket_name}__{safe_prefix}.sqlite"
+        self.manifest = RemoteManifest(manifest_path)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def _local_objects(self) -> Dict[str, Path]:
+        objects: Dict[str, Path] = {}
+        with os.scandir(self.silver_dir) as entries:
+            for entry in entries:
+                if (entry.is_file() and _CONTENT_NAME.match(entry.name)
+                        and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS):
+                    objects[self._key(entry.name)] = Path(entry.path)
+        return objects
+
+    def refresh(self) -> int:
+        """Re-list the remote prefix into the local manifest"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        listed: List[Tuple[str, int]] = []
+        prefix = f"{self.prefix}/" if self.prefix else ""
+        for page in paginator.paginate(Bucket=self.remote.bucket_name, Prefix=prefix):
+            listed.extend((item["Key"], item["Size"]) for item in page.get("Contents", []))
+        self.manifest.replace_all(listed)
+        logger.info(f"Listed {len(listed)} objects in s3://{self.remote.bucket_name}/{prefix}")
+        return len(listed)
+
+    def _upload(self, key: str, path: Path, transfer_config: Any) -> int:
+        content_id = path.stem
+        self.client.upload_file(
+            str(path), self.remote.bucket_name, key,
+            ExtraArgs={"Metadata": {"sha256": content_id}},
+            Config=transfer_config,
+        )
+        return path.stat().st_size
+
+    def _transfer_config(self) -> Any:
+        from boto3.s3.transfer import TransferConfig
+        return TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self._parts_per_file,
+            use_threads=True,
+        )
+
+    def sync(self, refresh: bool = False) -> dict:
+        """Upload what is missing remotely; returns counts for the pipeline report"""
+        start: float = time.perf_counter()
+        listed: bool = False
+        if refresh or len(self.manifest) == 0:
+            # First sync against this remote (or asked to): learn what is already there
+            self.refresh()
+            listed = True
+        local: Dict[str, Path] = self._local_objects()
+        known: set[str] = self.manifest.keys()
+        missing: Dict[str, Path] = {key: path for key, path in local.items() if key not in known}
+        pending: List[Tuple[str, int]] = []
+        uploaded: int = 0
+        bytes_uploaded: int = 0
+        failed: int = 0
+        transfer_config = self._transfer_config() if missing else None
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="s3-upload") as executor:
+            futures = {executor.submit(self._upload, key, path, transfer_config): key for key, path in missing.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    size = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Upload of {key} failed: {e}")
+                    continue
+                pending.append((key, size))
+                uploaded += 1
+                bytes_uploaded += size
+                if len(pending) >= 100:
+                    # Record progress as it goes, so an interrupted sync doesn't resend it
+                    self.manifest.add(pending)
+                    pending = []
+        self.manifest.add(pending)
+        stats = {
+            "remote": f"s3://{self.remote.bucket_name}/{self.prefix}",
+            "listed_remote": listed,
+            "local_objects": len(local),
+            "already_remote": len(local) - len(missing),
+            "uploaded": uploaded,
+            "bytes_uploaded": bytes_uploaded,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logger.info(f"Remote sync: {stats}")
+        return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload silver images missing from the configured remote")
+    parser.add_argument("--config", default=os.getenv("PIPELINE_CONFIG_PATH", "./configs/pipeline_config.yaml"))
+    parser.add_argument("--silver-dir", default=os.getenv("SILVER_DIR", "./silver"))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--refresh", action="store_true", help="re-list the remote before syncing")
+    args = parser.parse_args()
+    import yaml
+    with open(args.config, 'r') as f:
+        remote_config: Optional[dict] = (yaml.safe_load(f) or {}).get('remote')
+    if not remote_config:
+        raise SystemExit(f"No remote section in {args.config}")
+    sync = RemoteSync(Remote(**remote_config), args.silver_dir, workers=args.workers)
+    print(json.dumps(sync.sync(refresh=args.refresh), indent=2))
+
+if __name__ == "__main__":
+    main()
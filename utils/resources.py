@@ -0,0 +1,139 @@
+from functools import cache
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("pipeline.resources")
+
+# Peak bytes per decoded pixel in the quality cascade: the uint8 grayscale image,
+# the float64 temporary behind image.std() and the CV_64F Laplacian
+DECODE_BYTES_PER_PIXEL: int = 17
+# When the header can't be read, guess the pixel count from the file size (typical JPEG ratio)
+_FALLBACK_PIXELS_PER_BYTE: int = 4
+# cgroup v1 reports "no limit" as a huge page-aligned number
+_UNLIMITED: int = 1 << 60
+
+def _read(path: str) -> Optional[str]:
+    try:
+        return Path(path).read_text().strip()
+    except OSError:
+        return None
+
+def cpu_limit() -> float:
+    """CPUs this process may use: affinity mask, capped by a cgroup (v2 or v1) CPU quota"""
+    cpus: float = float(len(os.sched_getaffinity(0))) if hasattr(os, "sched_getaffinity") else float(os.cpu_count() or 1)
+    cpu_max: Optional[str] = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            cpus = min(cpus, int(quota) / int(period))
+    else:
+        quota, period = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if quota and period and int(quota) > 0:
+            cpus = min(cpus, int(quota) / int(period))
+    return cpus
+
+def memory_limit() -> Optional[int]:
+    """cgroup memory limit in bytes, or None when the cgroup doesn't set one"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value: Optional[str] = _read(path)
+        if value is not None and value != "max" and int(value) < _UNLIMITED:
+            return int(value)
+    return None
+
+def available_memory() -> Optional[int]:
+    """Bytes that can still be allocated: MemAvailable, capped by what the cgroup has left"""
+    available: Optional[int] = None
+    meminfo: Optional[str] = _read("/proc/meminfo")
+    if meminfo is not None:
+        for line in meminfo.splitlines():
+            if line.startswith("MemAvailable:"):
+                available = int(line.split()[1]) * 1024
+                break
+    limit: Optional[int] = memory_limit()
+    if limit is not None:
+        used: Optional[str] = _read("/sys/fs/cgroup/memory.current") or _read("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+        remaining = limit - int(used) if used else limit
+        available = remaining if available is None else min(available, remaining)
+    return available
+
+def default_workers() -> int:
+    """Process pool size for CPU-bound image work: the usable CPUs, rounded down, at least 1"""
+    return max(1, math.floor(cpu_limit()))
+
+@cache
+def _startup_budget() -> Optional[int]:
+    # Measured once, so every filter in the process gets the same (shared) budget
+    available: Optional[int] = available_memory()
+    return available // 2 if available else None
+
+def default_memory_budget() -> Optional[int]:
+    """PIPELINE_MEMORY_BUDGET_MB, else half of the memory available at first use; None when unknown"""
+    configured: Optional[str] = os.getenv("PIPELINE_MEMORY_BUDGET_MB")
+    if configured is not None:
+        return int(float(configured) * (1 << 20)) or None
+    return _startup_budget()
+
+def decode_bytes(width: Optional[int], height: Optional[int], size_bytes: int, reduction: int = 1) -> int:
+    """Estimated peak memory to scan one image: its encoded bytes plus the decoded working set"""
+    if width is None or height is None:
+        pixels: int = size_bytes * _FALLBACK_PIXELS_PER_BYTE // (reduction * reduction)
+    else:
+        pixels = math.ceil(width / reduction) * math.ceil(height / reduction)
+    return size_bytes + pixels * DECODE_BYTES_PER_PIXEL
+
+class MemoryBudget:
+    """Blocking admission against a byte budget shared by every task in flight
+
+    acquire() waits until the request fits next to what is already
+    reserved. A request larger than the whole budget is admitted once
+    nothing else is reserved, so it runs alone instead of deadlocking.
+    """
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._reserved: int = 0
+        self._condition = threading.Condition()
+        self.peak_reserved: int = 0
+
+    _shared: Optional["MemoryBudget"] = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, budget_bytes: int) -> "MemoryBudget":
+        """The process-wide budget, so sources filtered concurrently draw from the same memory
+
+        There is one pool per process: when sources ask for different sizes,
+        the smallest applies to all of them.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(budget_bytes)
+            elif budget_bytes < cls._shared.budget_bytes:
+                logger.info(f"Lowering the shared memory budget from {cls._shared.budget_bytes >> 20} "
+                            f"to {budget_bytes >> 20} MB")
+                cls._shared.resize(budget_bytes)
+            return cls._shared
+
+    def resize(self, budget_bytes: int) -> None:
+        with self._condition:
+            self.budget_bytes = budget_bytes
+            self._condition.notify_all()
+
+    def acquire(self, nbytes: int) -> tuple[float, int]:
+        """Reserve nbytes, blocking while they don't fit; returns (seconds waited, bytes now reserved)"""
+        start: float = time.perf_counter()
+        with self._condition:
+            self._condition.wait_for(lambda: self._reserved == 0 or self._reserved + nbytes <= self.budget_bytes)
+            self._reserved += nbytes
+            reserved: int = self._reserved
+            self.peak_reserved = max(self.peak_reserved, reserved)
+        return time.perf_counter() - start, reserved
+
+    def release(self, nbytes: int) -> None:
+        with self._condition:
+            self._reserved -= nbytes
+            self._condition.notify_all()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from models.config import Source
+from utils.fingerprint_index import params_fingerprint
+from utils.inventory import InventoryEntry
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def download_fingerprint(config: Source) -> str:
+    """What decides the bronze contents: where they come from and which version"""
+    return _digest({"handler": config.handler, "url": config.url, "version": config.version})
+
+def filter_fingerprints(config: Source) -> List[str]:
+    """One fingerprint per configured filter, ignoring execution-only params like workers"""
+    return [
+        _digest({"filter": name, "params": params_fingerprint(config.filters_params.get(name, {}))})
+        for name in config.filters
+    ]
+
+def output_fingerprint() -> str:
+    """Where and how silver is written; a source written elsewhere is not up to date"""
+    return _digest({
+        "silver_dir": os.path.abspath(os.getenv("SILVER_DIR", "./silver")),
+        "metadata_format": os.getenv("SILVER_METADATA_FORMAT", "files"),
+        "metadata_subfolder": os.getenv("METADATA_SUBFOLDER", "metadata"),
+    })
+
+def source_fingerprint(config: Source) -> str:
+    return _digest({
+        "download": download_fingerprint(config),
+        "filters": filter_fingerprints(config),
+        "output": output_fingerprint(),
+    })
+
+def chain_keys(bronze: str, filters: List[str]) -> List[str]:
+    """Cache key of each filter's output: the bronze contents plus every filter up to and including it"""
+    keys: List[str] = []
+    for index in range(len(filters)):
+        keys.append(_digest({"bronze": bronze, "filters": filters[:index + 1]}))
+    return keys
+
+def bronze_fingerprint(entries: Iterable[InventoryEntry]) -> str:
+    """Hash of (path, size, mtime_ns) for every bronze file"""
+    h = hashlib.sha256()
+    for entry in entries:
+        stats: os.stat_result = entry.stat if entry.stat is not None else entry.path.stat()
+        h.update(f"{entry.path}\0{stats.st_size}\0{stats.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+class RunState:
+    """Fingerprints of each source's last successful run, kept in one JSON file
+
+    Sources may finish concurrently, so updates re-read the file under a
+    process-wide lock and replace it atomically.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, path: str = ".checkpoints/run_state.json"):
+        self.path = Path(path)
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, source_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(source_id)
+
+    def record(self, source_id: str, entry: dict) -> None:
+        with self._lock:
+            state = self._load()
+            state[source_id] = {**entry, "completed_at": datetime.now().isoformat()}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+class FilterOutputCache:
+    """Per-source JSON files holding a filter's output paths, keyed by chain_keys()"""
+    def __init__(self, source_id: str, cache_dir: str = ".checkpoints/filter_cache"):
+        self.directory = Path(cache_dir) / source_id
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def store(self, key: str, entry: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path(key).with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, self._path(key))
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """Drop outputs of older runs; only the latest run's chain is reusable"""
+        if not self.directory.exists():
+            return
+        keep = set(keep)
+        for path in self.directory.glob("*.json"):
+            if path.stem not in keep:
+                path.unlink(missing_ok=True)
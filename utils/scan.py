@@ -0,0 +1,324 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
+from utils.stout import _suppress_output
+
+if TYPE_CHECKING:
+    import numpy as np
+    from utils.fingerprint_index import FingerprintIndex
+
+# cv2.imread/imdecode flags for a reduced grayscale decode. Only JPEG is scaled inside
+# the decoder (libjpeg's DCT scaling); PNG and others are decoded in full, then resized.
+# Kept by name: cv2, numpy and PIL are imported on first decode, not with this module.
+_REDUCED_GRAYSCALE_FLAGS: Dict[int, str] = {
+    1: "IMREAD_GRAYSCALE",
+    2: "IMREAD_REDUCED_GRAYSCALE_2",
+    4: "IMREAD_REDUCED_GRAYSCALE_4",
+    8: "IMREAD_REDUCED_GRAYSCALE_8",
+}
+# Laplacian variance grows as the image shrinks (edges get steeper per pixel). A reduced
+# measurement is divided by these to estimate the full-resolution value: the median
+# full/reduced ratio near the default threshold on benchmarks.corpus. Per image the
+# ratio varies (5th-95th percentile about 1.3-2.7 at 1/2, 2.7-10 at 1/4, 3.4-17 at 1/8),
+# which is what reduced_tolerance has to absorb. Contrast (std) moves by under 1%.
+LAPLACIAN_REDUCTION_SCALE: Dict[int, float] = {1: 1.0, 2: 1.9, 4: 5.3, 8: 10.0}
+
+@dataclass
+class ImageScan:
+    """Everything the silver stage needs to know about one image, taken from a single read"""
+    path: str
+    sha256: str
+    size_bytes: int
+    format: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    decoded: bool = False
+    corrupted: bool = False
+    contrast: Optional[float] = None
+    laplacian_variance: Optional[float] = None
+    # Downscale factor the metrics were measured at (1 = full resolution)
+    reduction: int = 1
+
+@dataclass(frozen=True)
+class QualityPlan:
+    """Thresholds and decode options for the cheap-first quality cascade
+
+    The cascade stops at the first failing check: header size, then
+    contrast, then Laplacian sharpness. With reduction > 1 the metrics are
+    measured on a 1/reduction decode, the Laplacian variance rescaled to a
+    full-resolution estimate (LAPLACIAN_REDUCTION_SCALE); any metric that
+    lands within `tolerance` (relative) of its threshold is measured again
+    at full resolution, so only clear-cut verdicts come from the reduced image.
+    """
+    min_height: int = 0
+    min_width: int = 0
+    min_contrast: float = 0
+    min_laplacian_sharpness: float = 0
+    reduction: int = 1
+    tolerance: float = 0.25
+
+    def __post_init__(self):
+        if self.reduction not in _REDUCED_GRAYSCALE_FLAGS:
+            raise ValueError(f"reduction must be one of {sorted(_REDUCED_GRAYSCALE_FLAGS)}, got {self.reduction}")
+
+    def fingerprint(self) -> str:
+        # Reduced measurements also depend on the Laplacian calibration
+        key: str = repr(self) if self.reduction == 1 else repr((self, LAPLACIAN_REDUCTION_SCALE[self.reduction]))
+        return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+    def has_min_size(self, width: int, height: int) -> bool:
+        return height >= self.min_height and width >= self.min_width
+
+    def is_borderline(self, value: float, threshold: float) -> bool:
+        return abs(value - threshold) <= self.tolerance * abs(threshold)
+
+def header_size(data: bytes) -> tuple[Optional[int], Optional[int]]:
+    """Read (width, height) from the image header without decoding pixels"""
+    try:
+        from PIL import Image
+        warnings.filterwarnings('ignore', category=UserWarning, module='PIL')
+        with _suppress_output():
+            with Image.open(io.BytesIO(data)) as img:
+                return img.size
+    except Exception:
+        return None, None
+
+def read_header_size(image_path: Path) -> tuple[Optional[int], Optional[int]]:
+    """(width, height) from the file's header; PIL reads only the first few KB"""
+    try:
+        from PIL import Image
+        warnings.filterwarnings('ignore', category=UserWarning, module='PIL')
+        with _suppress_output():
+            with Image.open(image_path) as img:
+                return img.size
+    except Exception:
+        return None, None
+
+def header_scan(image_path: Path, sha256: str, size_bytes: int, head: bytes) -> ImageScan:
+    """ImageScan for a file whose hash is already known, e.g. computed while it was written
+
+    head is the start of the file; if the header doesn't fit in it, width
+    and height are left as None.
+    """
+    width, height = header_size(head)
+    return ImageScan(
+        path=str(image_path),
+        sha256=sha256,
+        size_bytes=size_bytes,
+        format=Path(image_path).suffix.replace('.', '').upper(),
+        width=width,
+        height=height,
+    )
+
+def scan_image(image_path: Path, plan: Optional[QualityPlan] = None, sha256: Optional[str] = None,
+               data: Optional[bytes] = None) -> ImageScan:
+    """Read an image once and derive its hash, header info and (with a plan) quality metrics
+
+    A known sha256 (from an earlier scan of the same file) skips hashing;
+    data, the file's bytes if the caller already read them, skips the read.
+    """
+    image_path = Path(image_path)
+    if data is None:
+        data = image_path.read_bytes()
+    scan = header_scan(image_path, sha256 or hashlib.sha256(data).hexdigest(), len(data), data)
+    if plan is not None:
+        _measure_quality(scan, data, plan)
+    return scan
+
+def _decode_gray(data: bytes, reduction: int) -> Optional["np.ndarray"]:
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), getattr(cv2, _REDUCED_GRAYSCALE_FLAGS[reduction]))
+
+def _laplacian_variance(image: "np.ndarray", reduction: int = 1) -> float:
+    """Variance of the Laplacian, as estimated for the full-resolution image"""
+    import cv2
+    return float(cv2.Laplacian(image, cv2.CV_64F).var()) / LAPLACIAN_REDUCTION_SCALE[reduction]
+
+def _is_jpeg(data: bytes) -> bool:
+    return data[:3] == b"\xff\xd8\xff"
+
+def _shrink(image: "np.ndarray", reduction: int) -> "np.ndarray":
+    """What imdecode's IMREAD_REDUCED_* does for formats its decoder can't scale"""
+    import cv2
+    height, width = image.shape
+    return cv2.resize(image, (width // reduction, height // reduction), interpolation=cv2.INTER_LINEAR_EXACT)
+
+def _measure_quality(scan: ImageScan, data: bytes, plan: QualityPlan) -> None:
+    """Run the quality cascade on the already-read buffer, cheapest check first"""
+    scan.decoded = True
+    header_known: bool = scan.width is not None and scan.height is not None
+    if header_known and not plan.has_min_size(scan.width, scan.height):
+        # Rejected on the header alone; no pixels decoded
+        return
+    # Only libjpeg decodes straight to a smaller image. Anything else is decoded in full
+    # once and shrunk here, so a borderline value is re-measured without decoding again.
+    decoder_scales: bool = plan.reduction != 1 and _is_jpeg(data)
+    full: Optional["np.ndarray"] = None if decoder_scales else _decode_gray(data, 1)
+    image: Optional["np.ndarray"] = _decode_gray(data, plan.reduction) if decoder_scales else full
+    if image is None:
+        scan.corrupted = True
+        return
+    if not header_known:
+        if full is None:
+            full = _decode_gray(data, 1)
+        scan.height, scan.width = full.shape
+        if not plan.has_min_size(scan.width, scan.height):
+            return
+    if plan.reduction != 1 and image is full:
+        image = _shrink(full, plan.reduction)
+    scan.reduction = plan.reduction if image.shape != (scan.height, scan.width) else 1
+
+    def full_resolution() -> "np.ndarray":
+        nonlocal full
+        if full is None:
+            full = _decode_gray(data, 1)
+        scan.reduction = 1
+        return full
+
+    scan.contrast = float(image.std())
+    if scan.reduction != 1 and plan.is_borderline(scan.contrast, plan.min_contrast):
+        image = full_resolution()
+        scan.contrast = float(image.std())
+    if scan.contrast < plan.min_contrast:
+        return
+
+    scan.laplacian_variance = _laplacian_variance(image, scan.reduction)
+    if scan.reduction != 1 and plan.is_borderline(scan.laplacian_variance, plan.min_laplacian_sharpness):
+        image = full_resolution()
+        scan.contrast = float(image.std())
+        scan.laplacian_variance = _laplacian_variance(image)
+
+def scan_image_safe(image_path: Path, plan: Optional[QualityPlan] = None) -> tuple[ImageScan, int, float]:
+    """Process-pool entry point: scan one image and never raise
+
+    Returns the scan together with the worker pid and the seconds spent, so
+    the caller can attribute time to each worker. Unreadable files come back
+    as corrupted records instead of failing the whole batch.
+    """
+    start: float = time.perf_counter()
+    try:
+        scan = scan_image(image_path, plan)
+    except Exception:
+        image_path = Path(image_path)
+        scan = ImageScan(
+            path=str(image_path),
+            sha256="",
+            size_bytes=0,
+            format=image_path.suffix.replace('.', '').upper(),
+            decoded=True,
+            corrupted=True,
+        )
+    return scan, os.getpid(), time.perf_counter() - start
+
+def scan_images_safe(jobs: list[tuple[Path, Optional[QualityPlan]]]) -> list[tuple[ImageScan, int, float, float]]:
+    """Process-pool entry point for a chunk of (path, plan) jobs; adds the worker's peak RSS in MB"""
+    import resource
+    results = []
+    for image_path, plan in jobs:
+        scan, pid, seconds = scan_image_safe(image_path, plan)
+        # ru_maxrss is in KB on Linux
+        results.append((scan, pid, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+    return results
+
+class ScanCache:
+    """Thread-safe per-run cache of ImageScan records, shared by filters and metadata building
+
+    With a FingerprintIndex attached, records and filter verdicts also
+    persist across runs and are reused while the file's stat is unchanged.
+    """
+    def __init__(self, index: Optional["FingerprintIndex"] = None) -> None:
+        self._scans: Dict[str, ImageScan] = {}
+        self._stats: Dict[str, os.stat_result] = {}
+        self._lock = threading.Lock()
+        self.index = index
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "verdict_hits": 0, "verdict_misses": 0}
+
+    def _count(self, name: str, found: bool) -> None:
+        with self._lock:
+            self.counters[f"{name}_hits" if name else "hits"] += int(found)
+            self.counters[f"{name}_misses" if name else "misses"] += int(not found)
+
+    def stat(self, image_path: Path) -> os.stat_result:
+        key = str(image_path)
+        with self._lock:
+            stats = self._stats.get(key)
+        if stats is None:
+            stats = os.stat(key)
+            with self._lock:
+                self._stats[key] = stats
+        return stats
+
+    def prime_stat(self, image_path: Path, stats: os.stat_result) -> None:
+        """Seed the stat cache, e.g. from an os.scandir() walk"""
+        with self._lock:
+            self._stats[str(image_path)] = stats
+
+    def get(self, image_path: Path, plan: Optional[QualityPlan] = None, data: Optional[bytes] = None) -> ImageScan:
+        key = str(image_path)
+        with self._lock:
+            scan = self._scans.get(key)
+        if scan is None and self.index is not None:
+            scan = self.index.lookup(image_path, self.stat(image_path), plan.fingerprint() if plan else None)
+            self._count("", scan is not None)
+            if scan is not None:
+                with self._lock:
+                    self._scans[key] = scan
+        if scan is not None and (scan.decoded or plan is None):
+            return scan
+        scan = scan_image(image_path, plan, scan.sha256 if scan is not None else None, data)
+        self.put(scan, plan)
+        return scan
+
+    def peek(self, image_path: Path) -> Optional[ImageScan]:
+        with self._lock:
+            return self._scans.get(str(image_path))
+
+    def put(self, scan: ImageScan, plan: Optional[QualityPlan] = None) -> None:
+        with self._lock:
+            self._scans[scan.path] = scan
+        if self.index is not None and scan.sha256:
+            try:
+                stats = self.stat(scan.path)
+            except OSError:
+                return
+            self.index.store(scan, stats, plan.fingerprint() if plan else None)
+
+    def discard(self, image_path: Path) -> None:
+        """Drop a record from memory (the persistent index keeps it)"""
+        key = str(image_path)
+        with self._lock:
+            self._scans.pop(key, None)
+            self._stats.pop(key, None)
+
+    def verdict(self, image_path: Path, filter_name: str, params: str) -> Optional[bool]:
+        """Cached verdict of a filter for this file and params, if the index has one"""
+        if self.index is None:
+            return None
+        try:
+            verdict = self.index.get_verdict(image_path, self.stat(image_path), filter_name, params)
+        except OSError:
+            return None
+        self._count("verdict", verdict is not None)
+        return verdict
+
+    def record_verdict(self, image_path: Path, filter_name: str, params: str, verdict: bool) -> None:
+        if self.index is None:
+            return
+        try:
+            self.index.store_verdict(image_path, self.stat(image_path), filter_name, params, verdict)
+        except OSError:
+            return
+
+    def flush(self) -> None:
+        if self.index is not None:
+            self.index.flush()
+
+    def __len__(self) -> int:
+        return len(self._scans)
@@ -0,0 +1,99 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+from models.report import SourceMetrics
+
+if TYPE_CHECKING:
+    from sources.base_handler import BaseHandler
+
+logger = logging.getLogger("pipeline.scheduler")
+
+# Tells a silver worker there is nothing left to take
+_DONE = object()
+
+class HostLimiter:
+    """At most `limit` concurrent downloads per host"""
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.limit))
+        with semaphore:
+            yield
+
+class PipelinedScheduler:
+    """Two-stage scheduler: bronze (network) and silver (CPU) run on separate worker pools
+
+    Bronze workers download sources, at most per_host_limit per host, and
+    hand each finished source to the silver workers through a queue of
+    queue_size entries. When silver falls behind the queue fills up and
+    bronze workers block, so no more than bronze_workers + queue_size
+    sources sit downloaded but unprocessed on disk.
+    """
+    def __init__(self, bronze_workers: int = 2, silver_workers: int = 1, queue_size: int = 2, per_host_limit: int = 1):
+        self.bronze_workers = max(1, bronze_workers)
+        self.silver_workers = max(1, silver_workers)
+        self.queue_size = max(1, queue_size)
+        self.hosts = HostLimiter(per_host_limit)
+
+    def _bronze(self, index: int, handler: "BaseHandler", handoff: queue.Queue, results: List[Optional[SourceMetrics]]) -> None:
+        host: str = urlparse(handler.config.url).hostname or "local"
+        waited: float = time.perf_counter()
+        try:
+            with self.hosts.slot(host):
+                handler.metrics.scheduling["host_wait_seconds"] = round(time.perf_counter() - waited, 3)
+                images: Optional[List[Path]] = handler.run_bronze()
+        except Exception as e:
+            logger.error(f"✗ {handler.source_name} ({handler.config.id}) bronze: {e}")
+            return
+        if images is None:
+            logger.info(f"↷ {handler.source_name}: unchanged, skipped")
+            results[index] = handler.metrics
+            return
+        waited = time.perf_counter()
+        handoff.put((index, handler, images, time.monotonic()))
+        handler.metrics.scheduling["queue_put_wait_seconds"] = round(time.perf_counter() - waited, 3)
+
+    def _silver_worker(self, handoff: queue.Queue, results: List[Optional[SourceMetrics]]) -> None:
+        while True:
+            item = handoff.get()
+            if item is _DONE:
+                return
+            index, handler, images, queued_at = item
+            handler.metrics.scheduling["queued_seconds"] = round(time.monotonic() - queued_at, 3)
+            try:
+                results[index] = handler.run_silver(images)
+                logger.info(f"✓ {handler.source_name}: {handler.metrics.images_to_silver} images processed")
+            except Exception as e:
+                logger.error(f"✗ {handler.source_name} ({handler.config.id}) silver: {e}")
+
+    def run(self, handlers: List["BaseHandler"]) -> List[Optional[SourceMetrics]]:
+        """Run every handler; the result list keeps the input order, None where a source failed"""
+        results: List[Optional[SourceMetrics]] = [None] * len(handlers)
+        handoff: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        consumers = [
+            threading.Thread(target=self._silver_worker, args=(handoff, results), name=f"silver-{n}", daemon=True)
+            for n in range(self.silver_workers)
+        ]
+        for consumer in consumers:
+            consumer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.bronze_workers, thread_name_prefix="bronze") as executor:
+                for index, handler in enumerate(handlers):
+                    executor.submit(self._bronze, index, handler, handoff, results)
+        finally:
+            for _ in consumers:
+                handoff.put(_DONE)
+            for consumer in consumers:
+                consumer.join()
+        return results
@@ -1,8 +1,30 @@
 import io
-from contextlib import contextmanager, redirect_stdout, redirect_stderr
+import sys
+import threading
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_depth: int = 0
+_saved_streams: tuple = (None, None)
 
 @contextmanager
 def _suppress_output():
-    buf = io.StringIO()
-    with redirect_stdout(buf), redirect_stderr(buf):
-        yield
\ No newline at end of file
+    # redirect_stdout is not safe when several sources run in threads: nested
+    # enter/exit from different threads can leave sys.stdout pointing at a
+    # stale buffer. Redirect once for the outermost caller and restore when
+    # the last one leaves.
+    global _depth, _saved_streams
+    with _lock:
+        if _depth == 0:
+            _saved_streams = (sys.stdout, sys.stderr)
+            buf = io.StringIO()
+            sys.stdout, sys.stderr = buf, buf
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if _depth == 0:
+                sys.stdout, sys.stderr = _saved_streams
+                _saved_streams = (None, None)